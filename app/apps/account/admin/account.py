@@ -5,6 +5,7 @@ from django.db import transaction
 from django.http.request import HttpRequest
 from django.contrib.auth.admin import UserAdmin
 from app.vendors.base.model.admin import AdminBaseModel
+from app.vendors.tasks import delete_media_on_commit
 from django.utils.translation import gettext_lazy as _
 from app.apps.account.models.account import (
     set_account_permissions,
@@ -143,8 +144,9 @@ class AccountAdmin(UserAdmin, AdminBaseModel):
     def delete_queryset(self, request, queryset):
         with transaction.atomic():
             for obj in queryset:
-                obj.profile.photo.delete()
                 obj.delete()
+                # Media of account (profile photo) is deleted in background, after commit
+                delete_media_on_commit(obj.get_instance_media_path())
 
     actions = [
         *Account.actual_actions,
@@ -206,6 +206,10 @@ class Account(TimestampsMixin, SoftDeleteMixin, RolePermissionsMixin, AbstractBa
         if set_permissions:
             set_account_permissions(self, _models_roles_permissions)
     
+    def get_instance_media_path(self):
+        """Get path for instance in settings.MEDIA_ROOT directory"""
+        return f"{self.__class__.__name__.lower()}/{self.username}/"
+
     def delete(self, soft=False, **kwargs) -> None:
         """Delete or soft delete account."""
         if soft is True:
@@ -0,0 +1,19 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from app.vendors.utils.auth import AuthBackend
+from .factories import AccountFactory
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_auth_get_user_is_not_cached(locmem_cache):
+    account = AccountFactory()
+    backend = AuthBackend()
+    backend.get_user(account.pk)
+
+    # The account of session (with password hash) is not cached, every request gets it from DB
+    with CaptureQueriesContext(connection) as queries:
+        backend.get_user(account.pk)
+
+    assert len(queries) == 1, "Session user is got from cache"
@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
 
 
 class CompanyConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "app.apps.company"
+
+    def ready(self):
+        from app.vendors.mixins.view import register_context_provider
+        from app.apps.company.utils.context import get_company_ctx_data
+
+        # Views need the company of request (ContextDataMixin.company), so it has no default value,
+        # it is looked up on first access (pages which do not use the company do not query it)
+        register_context_provider("company", get_company_ctx_data, required=True, lazy=True)
+
+        # Warm-up of cache by server processes on the first request (DB is not queried in ready)
+        if settings.CACHE_WARM_UP["on_startup"]:
+            from app.vendors.utils.cache import start_process_cache_warm_up
+            request_started.connect(start_process_cache_warm_up, dispatch_uid="company_cache_warm_up")
@@ -0,0 +1,48 @@
+from app.vendors.base.metrics import cache_metrics
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Command for metrics of cache by key prefix (counters of all processes): hits, misses, sets, deletes,
+    size of set values and latency of gets, for tuning of cache timeouts, and sizes saved by the codec.
+    Arguments:
+        --clear: clear the counters after the report
+    """
+    help = "Show metrics of cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clear", action="store_true", help="clear the counters")
+
+    def handle(self, *args, **options):
+        metrics = cache_metrics.get()
+        if not metrics:
+            self.stdout.write("No metrics")
+
+        for prefix, counters in sorted(metrics.items()):
+            gets = counters["hits"] + counters["local_hits"] + counters["misses"]
+            mean = counters["latency_sum_us"] / gets if gets else 0
+            ratio = f"{counters['hit_ratio']:.2%}" if counters["hit_ratio"] is not None else "-"
+            self.stdout.write(self.style.SUCCESS(prefix))
+            self.stdout.write(
+                f"  gets: {gets}, hits: {counters['hits']}, local hits: {counters['local_hits']}, "
+                f"misses: {counters['misses']}, hit ratio: {ratio}"
+            )
+            self.stdout.write(
+                f"  sets: {counters['sets']}, deletes: {counters['deletes']}, "
+                f"set size: {counters['size']} bytes, mean set size: {counters['size'] // (counters['sets'] or 1)} bytes"
+            )
+            latency = ", ".join(f"<={bound} ms: {number}" for bound, number in counters["latency"].items())
+            self.stdout.write(f"  latency: mean {mean:.0f} us, {latency}")
+            codec = counters["codec"]
+            if codec["encodes"]:
+                by_packing = codec["saved_by_packing"] if codec["saved_by_packing"] is not None else "-"
+                self.stdout.write(
+                    f"  codec: encodes: {codec['encodes']}, pickled: {codec['pickled']} bytes, "
+                    f"encoded: {codec['encoded']} bytes, saved by compression: {codec['saved_by_compression']} bytes, "
+                    f"saved by packing (estimated): {by_packing} bytes"
+                )
+
+        if options.get("clear"):
+            cache_metrics.clear()
+            self.stdout.write("The counters are cleared")
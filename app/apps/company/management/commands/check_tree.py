@@ -0,0 +1,44 @@
+from django.apps import apps
+from app.vendors.mixins.model import TreeMixin
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+
+
+class Command(BaseCommand):
+    """
+    Command for check keys of trees (models with TreeMixin), for a periodic job.
+    Arguments:
+        --model: model label (<app_label>.<ModelName>), optional, default all tree models
+    """
+    help = "Check keys of trees"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", type=str, help="model label: <app_label>.<ModelName>")
+
+    def handle(self, *args, **options):
+        label = options.get("model")
+
+        if label:
+            try:
+                models = [apps.get_model(label)]
+            except (LookupError, ValueError) as exc:
+                raise CommandError(f"Model {label} is not found") from exc
+            if not issubclass(models[0], TreeMixin):
+                raise CommandError(f"Model {label} is not a tree model")
+        else:
+            models = [model for model in apps.get_models() if issubclass(model, TreeMixin)]
+
+        is_valid = True
+        for model in models:
+            errors = model.get_tree_errors()
+            if not errors:
+                self.stdout.write(self.style.SUCCESS(f"{model._meta.label}: valid"))
+                continue
+            is_valid = False
+            for node_id, message in errors:
+                self.stderr.write(f"{model._meta.label}: node {node_id}: {message}")
+
+        if not is_valid:
+            raise CommandError("Some trees are not valid")
@@ -0,0 +1,76 @@
+from pathlib import Path
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+from app.apps.company.models import Company
+from app.apps.account.models import Account
+from app.vendors.helpers import remove_directory
+from app.vendors.tasks import delete_media_paths
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Command for reconciliation of media: directories of deleted companies and accounts,
+    which are left in settings.MEDIA_ROOT (e.g. deletion task is failed), are deleted.
+    A directory is kept, if it is the directory of an existing instance, or a file stored
+    in a file field of any model is in it (e.g. files of company are left in the directory
+    of the previous alias after rename).
+    Arguments:
+        --dry-run: only list the directories
+        --now: delete the directories in the command, default by the background task (delete_media_paths)
+    """
+    help = "Delete media directories of deleted companies and accounts"
+
+    # Media directory: (model, field of name of directory of instance)
+    media_directories = {
+        "company": (Company, "alias"),
+        "account": (Account, "username"),
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="only list the directories")
+        parser.add_argument("--now", action="store_true", help="delete the directories in the command")
+
+    def handle(self, *args, **options):
+        paths = self.get_orphan_paths()
+        for path in paths:
+            self.stdout.write(path)
+
+        if not paths or options.get("dry_run"):
+            self.stdout.write(self.style.SUCCESS(f"Found {len(paths)} directories"))
+            return
+
+        if options.get("now"):
+            for path in paths:
+                remove_directory(Path(settings.MEDIA_ROOT) / path)
+            self.stdout.write(self.style.SUCCESS(f"Deleted {len(paths)} directories"))
+        else:
+            delete_media_paths.delay(paths)
+            self.stdout.write(self.style.SUCCESS(f"Sent deletion of {len(paths)} directories"))
+
+    def get_orphan_paths(self) -> list[str]:
+        """Get paths (relative to MEDIA_ROOT) of directories of instances, which do not exist and have no stored files"""
+        stored = self.get_stored_directories()
+        paths = []
+        for directory, (model, field_name) in self.media_directories.items():
+            root = Path(settings.MEDIA_ROOT) / directory
+            if not root.is_dir():
+                continue
+            names = {item.name for item in root.iterdir() if item.is_dir()} - stored.get(directory, set())
+            existing = set(model._base_manager.filter(**{f"{field_name}__in": names}).values_list(field_name, flat=True))
+            paths.extend(f"{directory}/{name}/" for name in sorted(names - existing))
+        return paths
+
+    def get_stored_directories(self) -> dict[str, set[str]]:
+        """Get names of directories with files stored in file fields of models: {media directory: {name}}"""
+        stored = {}
+        for model in apps.get_models():
+            field_names = [field.name for field in model._meta.concrete_fields if isinstance(field, models.FileField)]
+            for field_name in field_names:
+                values = model._base_manager.exclude(**{field_name: ""}).exclude(**{f"{field_name}__isnull": True})
+                for value in values.values_list(field_name, flat=True).iterator():
+                    parts = Path(value).parts
+                    if len(parts) > 2 and parts[0] in self.media_directories:
+                        stored.setdefault(parts[0], set()).add(parts[1])
+        return stored
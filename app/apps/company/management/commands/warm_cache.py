@@ -0,0 +1,60 @@
+import time
+from django.apps import apps
+from app.vendors.mixins.model import CacheMixin
+from app.vendors.utils.cache import (
+    get_cache_models,
+    warm_up_cache,
+)
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+
+
+class Command(BaseCommand):
+    """
+    Command for warm-up of cache of models with cache_queryset (CacheMixin), e.g. after deploy.
+    Keys are set in parallel, time and size of every key are reported.
+    Arguments:
+        --model: model label (<app_label>.<ModelName>), optional, default all models with CacheMixin
+        --workers: number of threads, optional, default settings.CACHE_WARM_UP["workers"]
+        --force: set new values of cached keys
+    """
+    help = "Warm up cache of models"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", type=str, help="model label: <app_label>.<ModelName>")
+        parser.add_argument("--workers", type=int, help="number of threads")
+        parser.add_argument("--force", action="store_true", help="set new values of cached keys")
+
+    def handle(self, *args, **options):
+        label = options.get("model")
+
+        if label:
+            try:
+                models = [apps.get_model(label)]
+            except (LookupError, ValueError) as exc:
+                raise CommandError(f"Model {label} is not found") from exc
+            if not issubclass(models[0], CacheMixin):
+                raise CommandError(f"Model {label} is not a cached model")
+        else:
+            models = get_cache_models()
+
+        time_start = time.perf_counter()
+        results = warm_up_cache(models, workers=options.get("workers"), force=options.get("force"))
+
+        is_valid = True
+        for result in results:
+            lang = f" [{result.lang}]" if result.lang else ""
+            if result.error:
+                is_valid = False
+                self.stderr.write(f"{result.model}{lang}: {result.key}: {result.error}")
+                continue
+            self.stdout.write(f"{result.model}{lang}: {result.key}: {result.seconds * 1000:.1f} ms, {result.size} bytes")
+
+        seconds = time.perf_counter() - time_start
+        size = sum(result.size for result in results)
+        self.stdout.write(self.style.SUCCESS(f"Warmed up {len(results)} keys: {seconds:.3f} s, {size} bytes"))
+
+        if not is_valid:
+            raise CommandError("Some keys are not warmed up")
@@ -1 +1,3 @@
-from .locale import set_language_middleware
\ No newline at end of file
+from .locale import set_language_middleware
+from .context import clear_context_data_middleware
+from .company import company_middleware
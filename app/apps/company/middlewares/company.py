@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.http.request import split_domain_port
+from django.urls import (
+    get_script_prefix,
+    set_script_prefix,
+)
+from app.apps.company.utils.alias import (
+    company_alias_index,
+    activate_company,
+    deactivate_company,
+)
+
+
+def company_middleware(get_response):
+    """
+    Set company of request (request.company_alias and get_company_alias), by host or path prefix.
+    Aliases are got from the in-process index (company_alias_index), a path prefix of alias is removed
+    from request.path_info and added to the script prefix (reverse adds it to urls).
+    If the company is not found, the company is settings.COMPANY_ALIAS.
+    """
+    def middleware(request):
+        host = split_domain_port(request.get_host())[0]
+        alias, path_info = company_alias_index.resolve(host, request.path_info)
+        script_prefix = get_script_prefix()
+        if alias is not None and path_info != request.path_info:
+            request.path_info = path_info
+            set_script_prefix(f"{script_prefix}{alias}/")
+        request.company_alias = alias or settings.COMPANY_ALIAS
+        token = activate_company(alias)
+        try:
+            return get_response(request)
+        finally:
+            deactivate_company(token)
+            set_script_prefix(script_prefix)
+
+    return middleware
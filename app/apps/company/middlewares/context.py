@@ -0,0 +1,26 @@
+import logging
+from django.conf import settings
+from app.vendors.base.context import ContexData
+
+
+app_logger = logging.getLogger("app")
+
+
+def clear_context_data_middleware(get_response):
+    """
+    Delete results of context providers memoized on request (ContexData), at the end of response.
+    In DEBUG mode, providers evaluated and not evaluated (lazy, unused) by the view are logged.
+    """
+    def middleware(request):
+        response = get_response(request)
+        if settings.DEBUG and hasattr(request, ContexData.request_attr):
+            report = ContexData.get_report(request)
+            view_name = request.resolver_match.view_name if request.resolver_match else request.path
+            app_logger.debug(
+                f"Context providers of {view_name}: evaluated {report['evaluated']}, "
+                f"not evaluated {report['not_evaluated']}"
+            )
+        ContexData.clear(request)
+        return response
+
+    return middleware
@@ -1,11 +1,25 @@
 from typing import Any
+from types import MappingProxyType
 from django.db import models
 from django.contrib import admin
 from django.conf import settings
-from app.vendors.base.model import BaseModel
+from app.vendors.base.model import (
+    BaseModel,
+    BaseQuerySet,
+)
 from django.db.models.signals import pre_delete
 from django.dispatch.dispatcher import receiver
-from app.vendors.helpers import remove_directory
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+from django.utils.functional import cached_property
+from app.vendors.base.cache import (
+    missing,
+    local_cache,
+    get_or_set_cache,
+)
+from app.vendors.helpers import get_keychains_table
+from app.vendors.tasks import delete_media_on_commit
+from app.apps.company.utils.alias import validate_alias
 from app.vendors.base.field import ExtImageField
 from django.utils.translation import gettext_lazy as _
 from django.db.models import (
@@ -35,6 +49,7 @@ class Company(NamesDescriptionsMixin, TimestampsMixin, RolePermissionsMixin, Cac
     alias = models.CharField(
         max_length=settings.LENGTH["alias"]["max"],
         unique=True,
+        validators=[validate_alias],
     )
     icon = ExtImageField(
         upload_to=get_company_images_save_url,
@@ -76,17 +91,66 @@ class Company(NamesDescriptionsMixin, TimestampsMixin, RolePermissionsMixin, Cac
     def __repr__(self):
         return f"{self.__class__.__name__}, alias: {self.alias}"
 
+    cache_by_language = True
+    cache_queries = True
+    rich_text_cache_key = "COMPANY_RICH_TEXT"
+
     @classmethod
     def cache_queryset(cls, **kwargs) -> Any:
-        """Query set for CacheMixin"""
+        """Query set for CacheMixin: company with translate of the current language (without rich_text)"""
         _alias = kwargs.get("alias", settings.COMPANY_ALIAS)
+        _lang = get_language() or settings.LANGUAGE_CODE
         return cls.objects.actual().filter(alias=_alias).prefetch_related(
-            Prefetch("trs", queryset=CompanyTranslate.objects.defer("rich_text"))
+            Prefetch("trs", queryset=CompanyTranslate.objects.filter(lang=_lang).defer("rich_text"))
         ).first()
 
+    @classmethod
+    def get_cache_tables(cls) -> list[str]:
+        """Get tables of cache_queryset: companies and translates"""
+        return [cls._meta.db_table, CompanyTranslate._meta.db_table]
+
+    def get_safe_rich_text(self) -> str:
+        """
+        Get rich_text of translate of the current language in mark_safe.
+        ------------------------------------------------------------------
+        It is cached apart from company, on demand. A company which is not saved
+        (e.g. the default company of an unknown alias) has empty rich_text.
+        """
+        if self._state.adding:
+            return mark_safe("")
+        key = self._get_versioned_key(self._get_cache_key(self.rich_text_cache_key, prefix=self.alias))
+        res = local_cache.get(key, missing)
+        if res is missing:
+            lang = get_language() or settings.LANGUAGE_CODE
+            res = get_or_set_cache(
+                key,
+                lambda: CompanyTranslate.objects.filter(
+                    company_id=self.pk, lang=lang
+                ).values_list("rich_text", flat=True).first() or "",
+                timeout=self.cache_timeout,
+            )
+            local_cache.set(key, res)
+        return mark_safe(res)
+
+    @classmethod
+    def get_cache_warm_up_kwargs(cls) -> list[dict]:
+        """Get parameters of get_from_cache for warm-up: actual companies"""
+        return [{"prefix": alias, "alias": alias} for alias in cls.objects.actual().values_list("alias", flat=True)]
+
+    @cached_property
+    def compiled_settings(self) -> MappingProxyType:
+        """Get settings merged with settings.COMPANY_SETTINGS, by keychains (compiled once per instance)"""
+        return get_keychains_table(self.settings, defaults=settings.COMPANY_SETTINGS)
+
+    def __getstate__(self):
+        # compiled_settings (MappingProxyType) is not pickled, it is compiled again on demand
+        state = super().__getstate__()
+        state.pop("compiled_settings", None)
+        return state
+
     def save(self, **kwargs):
         super().save(**kwargs)
-        self.delete_cache(prefix=self.alias)
+        self.__dict__.pop("compiled_settings", None)
 
     def get_instance_media_path(self):
         """Get path for instance in settings.MEDIA_ROOT directory"""
@@ -118,8 +182,8 @@ def company_delete(sender, instance, **kwargs):
     # instance.icon.delete(False)
     # instance.logo.delete(False)
     # instance.banner.delete(False)
-    media_dir = settings.MEDIA_ROOT / instance.get_instance_media_path()
-    remove_directory(media_dir)
+    # Media tree is deleted in background, after commit
+    delete_media_on_commit(instance.get_instance_media_path())
 
 
 class CompanyTranslate(LanguageRichTextMixin, MetaDataMixin, models.Model):
@@ -130,6 +194,10 @@ class CompanyTranslate(LanguageRichTextMixin, MetaDataMixin, models.Model):
         on_delete=models.CASCADE,
     )
 
+    objects = BaseQuerySet.as_manager()
+
+    cache_queries = True
+
     class Meta:
         verbose_name = _("Company translate")
         verbose_name_plural = _("Company translates")
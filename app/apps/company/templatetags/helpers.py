@@ -64,6 +64,8 @@ def company_settings_value(company, keychain: str):
     """
     Get value from company.settings by keychain.
     ---------------------------------------------
+    Settings of Company are compiled (compiled_settings: merged with settings.COMPANY_SETTINGS,
+    by keychains), other objects are got by keychain from settings dict.
     Parameters:
         company (Company): current page
         keychain (str): keychain, dot separator
@@ -72,7 +74,11 @@ def company_settings_value(company, keychain: str):
     """
     res = ""
     if company:
-        res = get_dict_value_by_keychain(company.settings, keychain)
+        compiled_settings = getattr(company, "compiled_settings", None)
+        if compiled_settings is not None:
+            res = compiled_settings.get(keychain, None)
+        else:
+            res = get_dict_value_by_keychain(company.settings, keychain)
 
     return res
 
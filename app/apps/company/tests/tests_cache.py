@@ -0,0 +1,278 @@
+import pickle
+import pytest
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.template import (
+    Context,
+    Template,
+)
+from django.test.utils import CaptureQueriesContext
+from app.vendors.base import cache as base_cache
+from app.vendors.utils import cache as cache_utils
+from app.apps.company.models import (
+    Company,
+    CompanyTranslate,
+)
+from app.vendors.base.metrics import CacheMetrics
+from app.vendors.caches import ShardedFileCache
+from app.vendors.base.codec import (
+    encode_value,
+    decode_value,
+    undecodable,
+)
+from app.vendors.base.cache import (
+    local_cache,
+    get_or_set_cache,
+    get_cache_entry,
+    get_read_through_key,
+    delete_cache_entries,
+)
+from app.apps.account.models import Account
+from app.apps.account.tests.factories import AccountFactory
+from .factories import (
+    CompanyFactory,
+    CompanyTranslateFactory,
+)
+
+
+@pytest.mark.models
+def test_get_or_set_cache(locmem_cache):
+    func = mock.Mock(return_value="value")
+
+    assert get_or_set_cache("TEST_KEY", func) == "value", "Read-through value error"
+    assert get_or_set_cache("TEST_KEY", func) == "value", "Cached value error"
+    assert func.call_count == 1, "Value is set twice"
+    assert get_cache_entry("TEST_KEY") == "value", "Cache entry error"
+
+    delete_cache_entries("TEST_KEY")
+    assert get_cache_entry("TEST_KEY") is None, "Cache entry is not deleted"
+
+
+@pytest.mark.models
+def test_get_or_set_cache_old_format(locmem_cache):
+    # A value cached as is (before entries with time of freshness) is not read as an entry
+    locmem_cache.set("TEST_KEY", "old value")
+
+    assert get_or_set_cache("TEST_KEY", lambda: "new value") == "new value", "Old format is read"
+
+
+@pytest.mark.models
+def test_get_or_set_cache_stale(locmem_cache):
+    get_or_set_cache("TEST_KEY", lambda: "old value", timeout=0, stale_timeout=60)
+    locmem_cache.add(f"{get_read_through_key('TEST_KEY')}_LOCK", 1)
+
+    assert get_or_set_cache("TEST_KEY", lambda: "new value") == "old value", "Stale value is not served"
+
+
+@pytest.mark.models
+def test_get_or_set_cache_keeps_lock_of_other_process(locmem_cache):
+    lock_key = f"{get_read_through_key('TEST_KEY')}_LOCK"
+    locmem_cache.add(lock_key, 1)
+
+    with mock.patch.object(base_cache, "_wait_cache", return_value=None):
+        assert get_or_set_cache("TEST_KEY", lambda: "value") == "value", "Value after wait timeout error"
+
+    assert locmem_cache.get(lock_key) == 1, "Lock of other process is deleted"
+
+
+@pytest.mark.models
+def test_sharded_file_cache(tmp_path):
+    file_cache = ShardedFileCache(tmp_path, {})
+
+    assert file_cache.add("TEST_LOCK", 1) is True, "Add of new key error"
+    assert file_cache.add("TEST_LOCK", 2) is False, "Existing key is added"
+    assert file_cache.add("TEST_EXPIRED", 1, timeout=-1) is True
+    assert file_cache.add("TEST_EXPIRED", 2) is True, "Expired key is not added"
+
+    file_cache.set_many({f"TEST_{i}": i for i in range(10)})
+    assert file_cache.get_many(["TEST_1", "TEST_9", "TEST_MISSING"]) == {"TEST_1": 1, "TEST_9": 9}, \
+        "Get many error"
+    assert file_cache.get_many(["TEST_LOCK", "TEST_EXPIRED"]) == {"TEST_LOCK": 1, "TEST_EXPIRED": 2}
+    assert file_cache._count + file_cache._delta == 12, "Number of entries error"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_codec_instance(locmem_cache):
+    translate = CompanyTranslateFactory(lang=settings.LANGUAGE_CODE)
+    company = Company.objects.prefetch_related("trs").get(pk=translate.company_id)
+
+    decoded = decode_value(encode_value(company))
+
+    assert decoded.pk == company.pk and decoded.alias == company.alias, "Decoded instance error"
+    assert [item.pk for item in decoded.trs.all()] == [translate.pk], "Decoded prefetched objects error"
+    assert decoded.trs.all()[0].company is decoded, "Decoded back reference error"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_codec_reverse_many_to_many(locmem_cache):
+    # The prefetched objects cache of reverse many-to-many is by related query name ("user"), not by accessor
+    group = Group.objects.create(name="test")
+    AccountFactory().groups.add(group)
+    groups = list(Group.objects.prefetch_related("user_set"))
+
+    decoded = decode_value(encode_value(groups))
+
+    assert [account.pk for account in decoded[0].user_set.all()] == [account.pk for account in group.user_set.all()], \
+        "Decoded prefetched reverse many-to-many error"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_codec_metrics(locmem_cache, settings):
+    settings.CACHE_CODEC = {**settings.CACHE_CODEC, "full_size_sample_rate": 1}
+    CompanyTranslateFactory(lang=settings.LANGUAGE_CODE)
+    companies = list(Company.objects.prefetch_related("trs"))
+    metrics = CacheMetrics()
+
+    with mock.patch("app.vendors.base.codec.cache_metrics", metrics), \
+            mock.patch.object(CacheMetrics, "_start_flush_thread"), \
+            mock.patch("app.vendors.base.codec.pickle.dumps", wraps=pickle.dumps) as dumps:
+        encoded = encode_value(companies, "TEST")
+    codec = metrics.get()["TEST"]["codec"]
+
+    assert dumps.call_count == 2, "Value is not pickled in full for the sample"
+    assert codec["encodes"] == 1 and codec["encoded"] == len(encoded), "Sizes of codec error"
+    assert codec["saved_by_packing"] > 0, "Size saved by packing is not counted"
+    assert decode_value(b"\xff\x00") is undecodable, "Unknown version is decoded"
+
+
+@pytest.mark.models
+def test_cache_warm_up_once_per_process():
+    with mock.patch.object(cache_utils, "_warm_up_pid", None), \
+            mock.patch.object(cache_utils, "start_cache_warm_up") as start_cache_warm_up:
+        cache_utils.start_process_cache_warm_up()
+        cache_utils.start_process_cache_warm_up()
+
+    assert start_cache_warm_up.call_count == 1, "Cache is warmed up twice by a process"
+
+
+@pytest.mark.models
+def test_cache_metrics(locmem_cache):
+    metrics, other_metrics = CacheMetrics(), CacheMetrics()
+    with mock.patch.object(CacheMetrics, "_start_flush_thread"), \
+            mock.patch.object(locmem_cache, "set", wraps=locmem_cache.set) as cache_set:
+        metrics.hit("TEST", 0.0001)
+        metrics.miss("TEST", 0.002)
+        metrics.set("TEST", 100)
+        other_metrics.hit("TEST", 0.0001, local=True)
+        assert cache_set.call_count == 0, "Counters are written by a request"
+        other_metrics.flush()
+
+    counters = metrics.get()["TEST"]
+
+    assert (counters["hits"], counters["local_hits"], counters["misses"]) == (1, 1, 1), "Counters of processes error"
+    assert counters["sets"] == 1 and counters["size"] == 100, "Counters of sets error"
+    assert counters["hit_ratio"] == round(2 / 3, 4), "Hit ratio error"
+    assert sum(counters["latency"].values()) == 3, "Latency histogram error"
+
+    metrics.clear()
+    with mock.patch.object(CacheMetrics, "_start_flush_thread"):
+        other_metrics.hit("TEST", 0.0001)
+    other_metrics.flush()
+
+    assert metrics.get().get("TEST", {}).get("local_hits", 0) == 0, "Counters before clear are written again"
+
+
+@pytest.mark.models
+def test_cache_metrics_of_stopped_process(locmem_cache):
+    metrics, stopped_metrics = CacheMetrics(), CacheMetrics()
+    with mock.patch.object(CacheMetrics, "_start_flush_thread"), \
+            mock.patch.object(locmem_cache, "set", wraps=locmem_cache.set) as cache_set:
+        metrics.hit("TEST", 0.0001)
+        stopped_metrics.hit("TEST", 0.0001)
+        metrics.flush()
+        stopped_metrics.flush()
+
+    timeouts = {call.args[0]: call.kwargs["timeout"] for call in cache_set.call_args_list}
+    process_key = stopped_metrics._get_process_key(stopped_metrics._process_id)
+    assert timeouts[process_key] == stopped_metrics.flush_interval * 3, "Key of process does not expire"
+
+    locmem_cache.delete(process_key)  # expired
+    assert metrics.get()["TEST"]["hits"] == 1, "Counters of processes error"
+    assert locmem_cache.get(f"{CacheMetrics.key}_PROCESSES") == [metrics._process_id], "Stopped process is kept"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_company_rich_text_on_demand(locmem_cache):
+    translate = CompanyTranslateFactory(lang=settings.LANGUAGE_CODE, rich_text="<p>About company</p>")
+    alias = translate.company.alias
+    Company.objects.filter(pk=translate.company_id).update(is_valid=True, is_blocked=False)
+    company = Company.get_from_cache(prefix=alias, alias=alias)
+
+    html = Template("{{ company.get_safe_rich_text }}").render(Context({"company": company}))
+
+    assert html == "<p>About company</p>", "Rich text of company is not rendered"
+    assert "rich_text" not in vars(company.trs.all()[0]), "Rich text is cached with company"
+    # The default company of an unknown alias has the id of a saved company
+    assert Company(id=translate.company_id, alias="unknown").get_safe_rich_text() == "", \
+        "Rich text of other company is rendered"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_company_cache_after_writes(locmem_cache, django_capture_on_commit_callbacks):
+    translate = CompanyTranslateFactory(lang=settings.LANGUAGE_CODE, rich_text="<p>Old</p>")
+    company = translate.company
+    Company.objects.filter(pk=company.pk).update(is_valid=True, is_blocked=False)
+    assert Company.get_from_cache(prefix=company.alias, alias=company.alias).get_safe_rich_text() == "<p>Old</p>"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        translate.rich_text = "<p>New</p>"
+        translate.save()
+    cached = Company.get_from_cache(prefix=company.alias, alias=company.alias)
+    assert cached.get_safe_rich_text() == "<p>New</p>", "Rich text is stale after save of translate"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Company.objects.filter(pk=company.pk).update(settings={"changed": True})
+    cached = Company.get_from_cache(prefix=company.alias, alias=company.alias)
+    assert cached.settings == {"changed": True}, "Company is stale after update"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        company.delete()
+    assert Company.get_from_cache(prefix=company.alias, alias=company.alias) is None, "Company is stale after delete"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_generations_of_opted_in_models(locmem_cache):
+    CompanyFactory()
+    AccountFactory()
+
+    keys = [key for key in locmem_cache._cache if "TABLE_GENERATION_" in key]
+    assert any(Company._meta.db_table in key for key in keys), "Generation of cached model is not changed"
+    assert not any(Account._meta.db_table in key for key in keys), "Generation of not cached model is changed"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_queryset_cached(locmem_cache, django_assert_num_queries):
+    company = CompanyFactory()
+    queryset = Company.objects.filter(pk=company.pk).values_list("alias", flat=True)
+
+    assert list(queryset.cached()) == [company.alias], "Cached results error"
+    with django_assert_num_queries(0):
+        assert list(queryset.cached()) == [company.alias], "Results are not cached"
+
+    Company.objects.filter(pk=company.pk).update(alias="changed")
+    assert list(queryset.cached()) == ["changed"], "Results are stale after write of table"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_queryset_or_cache(locmem_cache, django_assert_num_queries):
+    company = CompanyFactory()
+    queryset = Company.objects.filter(pk=company.pk)
+
+    assert [item.pk for item in queryset.or_cache("TEST_KEY")] == [company.pk], "Cached queryset error"
+    local_cache.clear()
+    with django_assert_num_queries(0):
+        items = list(queryset.or_cache("TEST_KEY"))
+        assert queryset.or_cache("TEST_KEY") is queryset.or_cache("TEST_KEY"), "Local cache is not used"
+
+    assert (items[0].pk, items[0].alias) == (company.pk, company.alias), "Instance from rows error"
+    assert items[0]._state.adding is False, "Instance from rows is not loaded from database"
@@ -0,0 +1,110 @@
+import pytest
+import threading
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory
+from app.vendors.base.context import (
+    ContexData,
+    LazyProvider,
+)
+from app.vendors.mixins.view import _context
+from app.apps.company.utils.alias import (
+    activate_company,
+    deactivate_company,
+)
+from .factories import CompanyFactory
+
+
+def _fail(**kwargs):
+    raise RuntimeError("provider error")
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_company_context_provider(locmem_cache):
+    CompanyFactory(alias="tenant", is_valid=True, is_blocked=False)
+    token = activate_company("tenant")
+    try:
+        data = _context.get_data()
+    finally:
+        deactivate_company(token)
+
+    assert data["company"].alias == "tenant", "Company of request is not in context"
+    assert _context.options["company"]["required"] is True, "Company provider is not required"
+    assert isinstance(_context["company"], LazyProvider), "Company provider is not lazy"
+
+
+@pytest.mark.models
+def test_context_provider_lazy():
+    calls = []
+    ctx_data = ContexData({})
+    ctx_data.register("menu", lambda **kwargs: calls.append(kwargs) or ["item"], lazy=True)
+    request = RequestFactory().get("/")
+
+    data = ctx_data.get_data(request, request_path="/")
+    assert calls == [], "Lazy provider is run before access"
+    assert ContexData.get_report(request) == {"evaluated": [], "not_evaluated": ["menu"]}, "Report error"
+
+    assert list(data["menu"]) == ["item"] and calls == [{"request_path": "/"}], "Lazy provider error"
+    assert ContexData.get_report(request) == {"evaluated": ["menu"], "not_evaluated": []}, "Report error"
+
+
+@pytest.mark.models
+def test_context_provider_default():
+    ctx_data = ContexData({})
+    ctx_data.register("menu", _fail, default=[])
+    ctx_data.register("title", lambda **kwargs: "title")
+
+    with mock.patch("app.vendors.base.context.app_logger") as logger:
+        data = async_to_sync(ctx_data.aget_data)()
+
+    assert data == {"menu": [], "title": "title"}, "Default of failed provider error"
+    assert logger.exception.called, "Error of provider is not logged"
+    with pytest.raises(RuntimeError):
+        ctx_data.get_data()
+
+
+@pytest.mark.models
+def test_context_provider_required():
+    ctx_data = ContexData({})
+    ctx_data.register("company", _fail, required=True)
+
+    with pytest.raises(RuntimeError):
+        async_to_sync(ctx_data.aget_data)()
+
+
+@pytest.mark.models
+def test_context_provider_hung():
+    release = threading.Event()
+    calls = []
+
+    def hung_provider(**kwargs):
+        calls.append(1)
+        release.wait(5)
+        return "late"
+
+    ctx_data = ContexData({})
+    ctx_data.register("slow", hung_provider, timeout=0.05, default="default")
+    try:
+        assert async_to_sync(ctx_data.aget_data)() == {"slow": "default"}, "Timed out provider error"
+        # The timed out call still runs in the pool, the provider is not run again
+        assert async_to_sync(ctx_data.aget_data)() == {"slow": "default"}, "Hung provider error"
+        assert len(calls) == 1, "Hung provider is run again"
+    finally:
+        release.set()
+
+
+@pytest.mark.models
+def test_context_provider_memo_by_kwargs():
+    calls = []
+    ctx_data = ContexData({"path": lambda **kwargs: calls.append(kwargs) or kwargs["request_path"]})
+    request = RequestFactory().get("/")
+
+    assert ctx_data.get_data(request, request_path="/a")["path"] == "/a"
+    assert async_to_sync(ctx_data.aget_data)(request, request_path="/a")["path"] == "/a"
+    assert len(calls) == 1, "Provider is run again for the same kwargs"
+
+    assert ctx_data.get_data(request, request_path="/b")["path"] == "/b", "Result of other kwargs is memoized"
+    ctx_data.get_data(request, request_path="/b", form={})
+    ctx_data.get_data(request, request_path="/b", form={})
+    assert len(calls) == 4, "Result of unhashable kwargs is memoized"
@@ -0,0 +1,77 @@
+import shutil
+import pytest
+from pathlib import Path
+from unittest import mock
+from django.conf import settings
+from django.db import transaction
+from django.test import override_settings
+from kombu.exceptions import OperationalError
+from app.vendors import tasks
+from app.apps.company.models import Company
+from app.apps.company.management.commands.clean_media import Command
+from .factories import CompanyFactory
+
+
+@pytest.fixture
+def media_root(tmp_path):
+    """Set settings.MEDIA_ROOT to a temporary directory, remove it after test"""
+    with override_settings(MEDIA_ROOT=tmp_path):
+        yield tmp_path
+    shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def _create_file(path: str) -> Path:
+    full_path = Path(settings.MEDIA_ROOT) / path
+    full_path.parent.mkdir(parents=True, exist_ok=True)
+    full_path.write_bytes(b"test")
+    return full_path
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_clean_media_keeps_stored_files_after_rename(locmem_cache, media_root):
+    company = CompanyFactory(alias="media-old")
+    _create_file("company/media-old/images/logo.png")
+    _create_file("company/media-orphan/images/logo.png")
+    Company.objects.filter(pk=company.pk).update(
+        alias="media-new", logo="company/media-old/images/logo.png"
+    )
+
+    paths = Command().get_orphan_paths()
+
+    assert "company/media-old/" not in paths, "Directory with stored files is orphan"
+    assert "company/media-orphan/" in paths, "Orphan directory is not found"
+
+
+@pytest.mark.models
+@pytest.mark.django_db(transaction=True)
+def test_delete_media_on_commit_broker_error(locmem_cache, media_root):
+    bump_version = mock.Mock()
+    with mock.patch.object(tasks.delete_media_paths, "delay", side_effect=OperationalError("broker is down")):
+        with transaction.atomic():
+            tasks.delete_media_on_commit("company/media-broker/")
+            transaction.on_commit(bump_version)
+
+    assert bump_version.called, "Callback after failed sending of media deletion is not run"
+
+
+@pytest.mark.models
+def test_delete_media_paths_out_of_media_root(media_root):
+    assert tasks.get_media_path("../outside") is None, "Path out of MEDIA_ROOT is allowed"
+    assert tasks.get_media_path("") is None, "MEDIA_ROOT is allowed"
+    assert tasks.get_media_path("company/alias/") is not None, "Path in MEDIA_ROOT is not allowed"
+
+
+@pytest.mark.models
+def test_delete_media_paths_by_batches(media_root):
+    for i in range(3):
+        _create_file(f"company/media-batch/{i}.txt")
+
+    with mock.patch.object(tasks.delete_media_paths, "apply_async") as apply_async, \
+            mock.patch.dict(settings.MEDIA_DELETION, batch_size=2):
+        deleted = tasks.delete_media_paths.run(["company/media-batch/"])
+
+    assert deleted == 2, "Batch size is not respected"
+    apply_async.assert_called_once_with(args=[["company/media-batch/"]])
+    tasks.delete_media_paths.run(["company/media-batch/"])
+    assert not (media_root / "company/media-batch").exists(), "Media tree is not deleted"
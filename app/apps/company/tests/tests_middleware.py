@@ -0,0 +1,71 @@
+import pytest
+from unittest import mock
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.core.exceptions import ValidationError
+from django.urls import get_script_prefix
+from app.apps.company.middlewares import company as company_module
+from app.apps.company.middlewares import company_middleware
+from app.apps.company.utils.alias import (
+    CompanyAliasIndex,
+    get_company_alias,
+    validate_alias,
+)
+from .factories import CompanyFactory
+
+
+def _get_response(request):
+    return HttpResponse(f"{request.company_alias} {get_company_alias()} {request.path_info} {get_script_prefix()}")
+
+
+@pytest.fixture
+def company_index(locmem_cache):
+    index = CompanyAliasIndex()
+    with mock.patch.object(company_module, "company_alias_index", index):
+        yield index
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_company_resolution_by_host(settings, company_index):
+    CompanyFactory(alias="tenant", is_valid=True, is_blocked=False)
+    settings.ALLOWED_HOSTS = ["*"]
+    middleware = company_middleware(_get_response)
+
+    response = middleware(RequestFactory().get("/page/", HTTP_HOST="tenant.example.com"))
+    assert response.content.decode() == "tenant tenant /page/ /", "Resolution by host error"
+
+    response = middleware(RequestFactory().get("/tenant/page/", HTTP_HOST="example.com"))
+    assert response.content.decode() == f"{settings.COMPANY_ALIAS} {settings.COMPANY_ALIAS} /tenant/page/ /", \
+        "Resolution by path without path mode"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_company_resolution_by_path(settings, company_index):
+    CompanyFactory(alias="tenant", is_valid=True, is_blocked=False)
+    settings.COMPANY_RESOLUTION = {**settings.COMPANY_RESOLUTION, "by": ("host", "path")}
+    middleware = company_middleware(_get_response)
+
+    response = middleware(RequestFactory().get("/tenant/page/"))
+    assert response.content.decode() == "tenant tenant /page/ /tenant/", "Resolution by path error"
+    assert get_script_prefix() == "/", "Script prefix is left after request"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_company_resolution_reserved_path(settings, company_index):
+    # An alias equal to a route of project (e.g. saved before validation) does not hijack it
+    CompanyFactory(alias="admin", is_valid=True, is_blocked=False)
+    settings.COMPANY_RESOLUTION = {**settings.COMPANY_RESOLUTION, "by": ("path",)}
+
+    assert company_index.resolve("example.com", "/admin/login/") == (None, "/admin/login/"), \
+        "Reserved segment is resolved as alias"
+
+
+@pytest.mark.models
+def test_validate_alias():
+    with pytest.raises(ValidationError):
+        validate_alias("admin")
+
+    assert validate_alias("tenant") is None, "Alias validation error"
@@ -1,7 +1,11 @@
+import json
+import pickle
 import pytest
+from copy import deepcopy
 from faker import Faker
 from django.conf import settings
 from app.apps.company import models
+from app.apps.company.templatetags.helpers import company_settings_value
 from .factories import (
     CompanyFactory,
     CompanyTranslateFactory,
@@ -103,3 +107,29 @@ def test_company_translate_delete(lang_key):
 
     assert is_company_exist is False, "Delete company error"
     assert is_company_translate_exist is False, "Delete company translate error"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_company_compiled_settings():
+    company = CompanyFactory(settings={"theme": "dark", "extra": {"items": [1, 2]}})
+
+    assert company.compiled_settings["theme"] == "dark", "Compiled settings value error"
+    assert company.compiled_settings["layout"] == settings.COMPANY_SETTINGS["layout"], "Default settings error"
+    assert company.compiled_settings["extra.items"] == [1, 2], "Compiled settings keychain error"
+    assert company_settings_value(company, "extra") == {"items": [1, 2]}, "Filter value is not a dict"
+    assert json.dumps(company_settings_value(company, "languages")), "Filter value is not JSON serializable"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_company_compiled_settings_pickle():
+    company = CompanyFactory()
+    compiled_settings = company.compiled_settings
+
+    restored = pickle.loads(pickle.dumps(company))
+    copied = deepcopy(company)
+
+    assert "compiled_settings" not in restored.__dict__, "Compiled settings are pickled"
+    assert restored.compiled_settings == compiled_settings, "Compiled settings of unpickled company error"
+    assert copied.compiled_settings == compiled_settings, "Compiled settings of copied company error"
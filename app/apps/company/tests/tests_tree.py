@@ -0,0 +1,226 @@
+import pytest
+from unittest import mock
+from django.db import models
+from app.vendors.base.model import BaseModel
+from app.vendors.mixins.model import (
+    TreeMixin,
+    PathTreeMixin,
+    ClosureTreeMixin,
+    TreeClosureMixin,
+)
+from app.vendors.base.tree import get_tree_records
+
+
+class TreeNode(TreeMixin, BaseModel):
+    """Tree of tests (nested set with dense keys)"""
+
+    cache_queries = True
+
+    class Meta:
+        app_label = "company"
+
+
+class SparseTreeNode(TreeMixin, BaseModel):
+    """Tree of tests (nested set with sparse keys)"""
+
+    tree_key_gap = 64
+
+    class Meta:
+        app_label = "company"
+
+
+class WideGapTreeNode(TreeMixin, BaseModel):
+    """Tree of tests (nested set with a gap over the range of keys of SmallIntegerField)"""
+
+    tree_key_gap = 10_000
+
+    class Meta:
+        app_label = "company"
+
+
+class PathTreeNode(PathTreeMixin, BaseModel):
+    """Tree of tests (materialized path)"""
+
+    class Meta:
+        app_label = "company"
+
+
+class ClosureTreeNode(ClosureTreeMixin, BaseModel):
+    """Tree of tests (closure table)"""
+
+    tree_closure_model = "company.ClosureTreeLink"
+
+    class Meta:
+        app_label = "company"
+
+
+class ClosureTreeLink(TreeClosureMixin):
+    """Links of tree of tests"""
+
+    ancestor = models.ForeignKey(ClosureTreeNode, related_name="descendant_links", on_delete=models.CASCADE)
+    descendant = models.ForeignKey(ClosureTreeNode, related_name="ancestor_links", on_delete=models.CASCADE)
+
+    class Meta:
+        app_label = "company"
+
+
+_payload = {"is_valid": True, "is_blocked": False}
+
+
+def _get_nested(*children: dict) -> list[dict]:
+    return [{**_payload, **child} for child in children]
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+@pytest.mark.parametrize("model", [TreeNode, SparseTreeNode])
+def test_import_tree(model, locmem_cache):
+    nested = _get_nested({"children": _get_nested({}, {"children": _get_nested({})})}, {})
+
+    assert model.import_tree(get_tree_records(nested)) == 5, "Import tree error"
+    model.check_tree()
+
+    top = model.objects.get(parent__isnull=True, position=1)
+    assert model.import_tree([("a", None, None, _payload), ("b", "a", None, _payload)], parent=top) == 2
+    model.check_tree()
+    assert top.children.count() == 3, "Import into parent error"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_import_tree_parent_not_found(locmem_cache):
+    with pytest.raises(TreeNode.DoesNotExist):
+        TreeNode.import_tree([("a", None, None, _payload)], parent=999)
+
+    assert TreeNode.objects.exists() is False, "Tree is imported to the top level"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_import_tree_cycle(locmem_cache):
+    with pytest.raises(ValueError):
+        TreeNode.import_tree([("a", "b", None, _payload), ("b", "a", None, _payload)])
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_sparse_tree_keys_in_field_range(locmem_cache):
+    key_max = WideGapTreeNode.get_tree_key_max()
+    for position in (None, None, None, 1, None):
+        node = WideGapTreeNode(position=position, **_payload)
+        node.create_tree_node()
+        node.save()
+    top = WideGapTreeNode.objects.order_by("left").first()
+    for _i in range(3):
+        node = WideGapTreeNode(parent_id=top.id, **_payload)
+        node.create_tree_node()
+        node.save()
+
+    WideGapTreeNode.check_tree()
+    assert key_max == 32767, "Max key of SmallIntegerField error"
+    assert max(WideGapTreeNode.objects.values_list("right", flat=True)) <= key_max, "Keys are over the field range"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_sparse_tree_rebuild_in_field_range(locmem_cache):
+    SparseTreeNode.import_tree(get_tree_records(_get_nested({}, {}, {})))
+
+    with mock.patch.object(SparseTreeNode, "get_tree_key_max", return_value=100):
+        SparseTreeNode.rebuild_tree()
+        with pytest.raises(ValueError):
+            SparseTreeNode.import_tree([(key, None, None, _payload) for key in range(50)])
+
+    SparseTreeNode.check_tree()
+    assert max(SparseTreeNode.objects.values_list("right", flat=True)) <= 100, "Keys are over the max key"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_tree_snapshot(locmem_cache, django_assert_num_queries, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        TreeNode.import_tree(get_tree_records(_get_nested({"children": _get_nested({}, {})}, {})))
+    first, second = TreeNode.objects.filter(parent__isnull=True).order_by("position")
+    lower = [node.pk for node in first.lower]
+    parents = [node.pk for node in TreeNode.objects.get(pk=lower[-1]).parents]
+    snapshot = TreeNode.get_tree_snapshot()
+
+    with django_assert_num_queries(0):
+        assert TreeNode.get_tree_snapshot() is snapshot, "Snapshot is not kept by version of tree"
+        assert [node.pk for node in snapshot.lower(first)] == lower, "Lower nodes error"
+        assert [node.pk for node in snapshot.parents(lower[-1])] == parents, "Parents error"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        TreeNode.move_tree_nodes([(second, first, 1)])
+    TreeNode.check_tree()
+
+    snapshot = TreeNode.get_tree_snapshot()
+    assert len(snapshot) == 4, "Snapshot size error"
+    assert snapshot.get_lower(first.pk)[0].pk == second.pk, "Snapshot is not changed by mutation of tree"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_move_tree_nodes_into_own_branch(locmem_cache):
+    TreeNode.import_tree(get_tree_records(_get_nested({"children": _get_nested({})})))
+    top = TreeNode.objects.get(parent__isnull=True)
+
+    with pytest.raises(ValueError):
+        TreeNode.move_tree_nodes([(top, top.children.get(), None)])
+
+    TreeNode.check_tree()
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+@pytest.mark.parametrize("model", [TreeNode, SparseTreeNode])
+def test_move_tree_nodes_keeps_other_keys(model, locmem_cache):
+    model.import_tree(get_tree_records(_get_nested({"children": _get_nested({}, {}, {})}, {"children": _get_nested({})})))
+    first, second = model.objects.filter(parent__isnull=True).order_by("position")
+    lower = list(first.children.order_by("position"))
+    keys = {pk: keys for pk, *keys in model.objects.values_list("id", "left", "right")}
+
+    with pytest.raises(ValueError):
+        model.move_tree_nodes([(first, lower[0], None)])
+    model.move_tree_nodes([(lower[2], first, 1), (lower[0], lower[1], None)])
+
+    model.check_tree()
+    assert [node.pk for node in first.children.order_by("position")] == [lower[2].pk, lower[1].pk]
+    assert lower[1].children.get().pk == lower[0].pk, "Node is not moved into new parent"
+    changed = {pk for pk, *new_keys in model.objects.values_list("id", "left", "right") if keys[pk] != new_keys}
+    expected = {lower[2].pk, lower[0].pk} if model.is_sparse_tree() else {node.pk for node in lower}
+    assert changed == expected, "Keys out of moved branches are changed"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+def test_cached_tree_query_after_move(locmem_cache):
+    TreeNode.import_tree(get_tree_records(_get_nested({}, {})))
+    first, second = TreeNode.objects.filter(parent__isnull=True).order_by("position")
+    queryset = TreeNode.objects.order_by("left").values_list("id", flat=True)
+    assert list(queryset.cached()) == [first.pk, second.pk]
+
+    TreeNode.move_tree_nodes([(second, None, 1)])
+
+    assert list(queryset.cached()) == [second.pk, first.pk], "Cached query is stale after move of nodes"
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+@pytest.mark.parametrize("model", [SparseTreeNode, PathTreeNode, ClosureTreeNode])
+def test_tree_storages_depth_first(model, locmem_cache):
+    names = {}
+    # (name, parent name, position): "b" is inserted before "a", "a2" before "a1"
+    for name, parent, position in [("a", None, None), ("b", None, 1), ("a1", "a", None), ("a2", "a", 1),
+                                   ("a11", "a1", None), ("b1", "b", None)]:
+        node = model(parent_id=names[parent].pk if parent else None, position=position, **_payload)
+        node.create_tree_node()
+        node.save()
+        names[name] = node
+    ids = {node.pk: name for name, node in names.items()}
+    top = model.objects.get(pk=names["a"].pk)
+
+    assert [ids[node.pk] for node in model.get_all()] == ["b", "b1", "a", "a2", "a1", "a11"], "Order of tree error"
+    assert [ids[node.pk] for node in top.lower] == ["a2", "a1", "a11"], "Order of lower nodes error"
+    assert [ids[node.pk] for node in top.get_with_lower(by_depth=1)] == ["a", "a2", "a1"]
+    assert [ids[node.pk] for node in model.objects.get(pk=names["a1"].pk).branch] == ["a", "a1", "a11"]
@@ -0,0 +1,113 @@
+import time
+import threading
+from contextvars import ContextVar
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+from app.vendors.base.model.queryset import get_table_generations
+
+
+# Alias of company of the current request (set by company_middleware)
+_company_alias: ContextVar[str | None] = ContextVar("company_alias", default=None)
+
+
+def get_company_alias() -> str:
+    """Get alias of company of the current request, default settings.COMPANY_ALIAS"""
+    return _company_alias.get() or settings.COMPANY_ALIAS
+
+
+def activate_company(alias: str | None) -> object:
+    """Set alias of company of the current request, returns token for deactivate_company"""
+    return _company_alias.set(alias)
+
+
+def deactivate_company(token: object) -> None:
+    """Reset alias of company of the current request"""
+    _company_alias.reset(token)
+
+
+def is_alias_reserved(alias: str) -> bool:
+    """Get alias is a reserved first segment of path (settings.COMPANY_RESOLUTION["reserved"])"""
+    return alias.lower() in settings.COMPANY_RESOLUTION["reserved"]
+
+
+def validate_alias(value: str) -> None:
+    """Validate alias of company: it is not a reserved first segment of path"""
+    if is_alias_reserved(value):
+        raise ValidationError(_("Alias is reserved: %(alias)s"), params={"alias": value})
+
+
+class CompanyAliasIndex:
+    """
+    In-process index of aliases of actual companies: {alias: company id}.
+    ---------------------------------------------------------------------
+    The index is loaded once per process, and reloaded, when the generation of table of companies
+    is changed (by every write of companies, see BaseQuerySet.cached). The generation is checked at most once per
+    check_interval, so requests do not hit the DB or the cache.
+    Parameters:
+        check_interval (float | None): interval of checks of version, seconds,
+            default settings.COMPANY_RESOLUTION["check_interval"]
+    Methods:
+        get (alias): get id of company or None
+        resolve (host, path): get alias of company by host (subdomain) or path prefix
+    """
+
+    def __init__(self, check_interval: float | None = None):
+        self.check_interval = check_interval or settings.COMPANY_RESOLUTION["check_interval"]
+        self._index = None
+        self._version = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, alias: str) -> int | None:
+        """Get id of actual company by alias"""
+        return self._get_index().get(alias, None)
+
+    def resolve(self, host: str, path: str) -> tuple[str | None, str]:
+        """
+        Get alias of company by host or path prefix (settings.COMPANY_RESOLUTION["by"]).
+        --------------------------------------------------------------------------------
+        Host: the first label of host is alias (<alias>.example.com), or the host is alias.
+        Path prefix: the first segment of path is alias (/<alias>/...), it is removed from path,
+        reserved segments (settings.COMPANY_RESOLUTION["reserved"], e.g. admin) are not aliases.
+        Parameters:
+            host (str): host of request (without port)
+            path (str): path of request
+        Returns:
+            (tuple[str | None, str]): alias or None (not found), path without the prefix of alias
+        """
+        index = self._get_index()
+        by = settings.COMPANY_RESOLUTION["by"]
+        if "host" in by:
+            for alias in (host, host.split(".", 1)[0]):
+                if alias in index:
+                    return alias, path
+        if "path" in by:
+            alias = path.lstrip("/").split("/", 1)[0]
+            if alias in index and not is_alias_reserved(alias):
+                return alias, path[len(alias) + 1:] or "/"
+        return None, path
+
+    def _get_index(self) -> dict[str, int]:
+        """Get index, reload it, if the generation is changed (checked at most once per check_interval)"""
+        now = time.monotonic()
+        if self._index is not None and now - self._checked < self.check_interval:
+            return self._index
+        with self._lock:
+            if self._index is None or now - self._checked >= self.check_interval:
+                version = get_table_generations([apps.get_model("company", "Company")._meta.db_table])[0]
+                if self._index is None or version != self._version:
+                    self._index = self._load()
+                    self._version = version
+                self._checked = now
+        return self._index
+
+    @staticmethod
+    def _load() -> dict[str, int]:
+        """Load aliases of actual companies from DB (cached, so processes reload the index by one query)"""
+        company_model = apps.get_model("company", "Company")
+        return dict(company_model.objects.actual().values_list("alias", "id").cached())
+
+
+company_alias_index = CompanyAliasIndex()
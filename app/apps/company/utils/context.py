@@ -1,18 +1,20 @@
 from django.conf import settings
 from app.apps.company.models import Company
+from app.apps.company.utils.alias import get_company_alias
 
 
 def get_company_ctx_data(**kwargs: any) -> Company | dict:
     """
-    Get Company instance from db or cache.
+    Get Company instance of request (company_middleware) from db or cache.
     (If it is not exist return default company obj with default settings).
     """
-    company = Company.get_from_cache(prefix=settings.COMPANY_ALIAS, alias=settings.COMPANY_ALIAS)
+    alias = get_company_alias()
+    company = Company.get_from_cache(prefix=alias, alias=alias)
     if company is None:
         # Default data of company
         company = Company(
             id=1,
-            alias=settings.COMPANY_ALIAS,
+            alias=alias,
             settings=settings.COMPANY_SETTINGS,
         )
     return company
\ No newline at end of file
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from django.core.exceptions import PermissionDenied
+from app.vendors.base.metrics import cache_metrics
+
+
+@require_GET
+def cache_metrics_view(request):
+    """Get metrics of cache by key prefix (JSON), for staff users or by bearer token of settings.CACHE_METRICS"""
+    token = settings.CACHE_METRICS["token"]
+    is_token = bool(token) and request.headers.get("Authorization", "") == f"Bearer {token}"
+    if not is_token and not request.user.is_staff:
+        raise PermissionDenied
+    return JsonResponse(cache_metrics.get())
@@ -10,4 +10,5 @@ app = Celery("app")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.conf.task_routes = settings.TASK_ROUTER
 app.conf.broker_transport_options = settings.BROKER_TRANSPORT_OPTIONS
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+app.autodiscover_tasks(["app.vendors"])
\ No newline at end of file
@@ -6,6 +6,14 @@ THEMES = ["light", "dark"]
 
 COMPANY_ALIAS = "co"
 
+# Resolution of company of request (company_middleware): by host (<alias>.example.com) and/or path prefix (/<alias>/),
+# add "path" to "by" to resolve by path prefix, the first segments of urls of the project are reserved (not aliases)
+COMPANY_RESOLUTION = {
+    "by": ("host",),
+    "reserved": ("admin", "i18n", "ckeditor5", "metrics", "media", "static", "__debug__"),
+    "check_interval": 1,  # interval of checks of version of the in-process alias index, seconds
+}
+
 COMPANY_SETTINGS = {
     "theme": "light",
     "layout": "layouts/top.html",
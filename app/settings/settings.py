@@ -61,7 +61,9 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     # apps
+    "app.apps.company.middlewares.company_middleware",
     "app.apps.company.middlewares.set_language_middleware",
+    "app.apps.company.middlewares.clear_context_data_middleware",
 ]
 if DEBUG:
     MIDDLEWARE.append(
@@ -171,7 +173,19 @@ LOGIN_REDIRECT_URL = "company:protect_dashboard"
 
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "BACKEND": "app.vendors.caches.ShardedFileCache",
         "LOCATION": BASE_DIR / "cache",
-    }
+        "OPTIONS": {
+            "MAX_ENTRIES": 100_000,
+        },
+    },
+    # Memory-mapped file shared by workers of host, for read-mostly data
+    "shared": {
+        "BACKEND": "app.vendors.caches.MmapCache",
+        "LOCATION": BASE_DIR / "cache" / "shared.mmap",
+        "OPTIONS": {
+            "SLOTS": 4096,
+            "SIZE": 16 * 1024 * 1024,
+        },
+    },
 }
\ No newline at end of file
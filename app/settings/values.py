@@ -1,4 +1,5 @@
 import string
+from decouple import config
 
 
 EMPTY_VALUE = "_"
@@ -32,6 +33,58 @@ CACHE_TIME = {
 
 CACHE_TIME_DEFAULT = CACHE_TIME["day"] * 100
 
+# Read-through cache (CacheMixin.get_from_cache), times in seconds
+CACHE_READ_THROUGH = {
+    "timeout": CACHE_TIME_DEFAULT,  # time of freshness of value
+    "jitter": 0.1,  # part of timeout, time of freshness is randomly reduced by
+    "stale_timeout": 60 * 5,  # time of serving stale value, while one process sets a new value
+    "lock_timeout": 10,  # max time of setting value
+    "negative_timeout": 60,  # time of freshness of None (object is not found)
+    "wait_interval": 0.05,  # interval of checks of cache, while other process sets value
+}
+
+# In-process LRU cache in front of the shared cache (CacheMixin, BaseQuerySet.or_cache)
+CACHE_LOCAL = {
+    "max_size": 1000,  # max number of entries per process
+    "timeout": 60,  # TTL of entries, seconds
+    "check_interval": 0.3,  # interval of checks of the shared version (coherence of processes), seconds
+}
+
+# Codec of cached values (CacheMixin, BaseQuerySet.or_cache, BaseQuerySet.cached)
+CACHE_CODEC = {
+    "compress_threshold": 1024,  # pickled values over the size (bytes) are compressed with zlib
+    "compress_level": 6,  # level of zlib compression
+    "full_size_sample_rate": 0.01,  # part of values pickled in full too, for the size saved by packing (metrics)
+}
+
+# Warm-up of cache (CacheMixin models): command warm_cache (e.g. after deploy) and on startup of server process
+CACHE_WARM_UP = {
+    "on_startup": False,  # warm up in a background thread on the first request of every server process
+    "workers": 4,  # number of threads
+}
+
+# Metrics of cache (CacheMixin, BaseQuerySet.or_cache, BaseQuerySet.cached) by key prefix:
+# command cache_metrics and endpoint /metrics/cache/
+CACHE_METRICS = {
+    "enabled": True,
+    "buckets": (0.1, 0.5, 1, 5, 10, 50, 100, 500),  # upper bounds of latency histogram, milliseconds
+    "flush_interval": 10,  # interval of writing counters of process to the shared cache (background thread), seconds
+    "token": config("CACHE_METRICS_TOKEN", default=None),  # bearer token of the endpoint (staff without token)
+}
+
+# Providers of context data of views (ContexData, ContextDataMixin)
+CONTEXT_PROVIDERS = {
+    "concurrent": config("CONTEXT_PROVIDERS_CONCURRENT", default=False, cast=bool),  # run providers together
+    "timeout": 2,  # max time of provider (in concurrent mode), seconds
+    "workers": 8,  # number of threads of sync providers (in concurrent mode)
+}
+
+# Deletion of media trees in background (app.vendors.tasks.delete_media_paths)
+MEDIA_DELETION = {
+    "batch_size": 1000,  # max number of files deleted by a run of task
+    "max_retries": 5,  # retries of task on errors of file system
+}
+
 USER_AGE = {"min": 4, "max": 111}
 BIRTHDAY_TIMEDELTA_YEARS = 100
 DATE_FORMAT = "%Y-%m-%d"
@@ -112,3 +165,5 @@ SVG = {
         "</svg>"
     )
 }
+
+TREE_BATCH_SIZE = 1000  # rows per query for bulk writes of tree keys
@@ -6,6 +6,7 @@ from django.urls import (
     include,
     re_path,
 )
+from app.apps.company.views.metrics import cache_metrics_view
 
 
 urlpatterns = [
@@ -13,6 +14,7 @@ urlpatterns = [
 
     re_path(r"^i18n/", include("django.conf.urls.i18n")),
     path("ckeditor5/", include("django_ckeditor_5.urls"), name="ck_editor_5_upload_file"),
+    path("metrics/cache/", cache_metrics_view, name="cache_metrics"),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
 
@@ -0,0 +1,202 @@
+import time
+import random
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from app.vendors.helpers import get_unique_str
+from typing import (
+    Any,
+    Callable,
+)
+
+
+# Sentinel of a miss of local cache (None is a cached value)
+missing = object()
+
+# Version of format of entries of get_or_set_cache (value, time of freshness), it is a part of key,
+# so entries of other formats (e.g. values cached as is) are not read
+READ_THROUGH_VERSION = 2
+
+
+class LocalCache:
+    """
+    In-process LRU cache with TTL of entries, in front of the shared cache (settings.CACHES).
+    ----------------------------------------------------------------------------------------
+    Processes are coherent by a version key in the shared cache: it is changed on every invalidation
+    (delete), and the local entries are cleared when the version is changed. The version is checked
+    at most once per check_interval, so an invalidated value can be served for check_interval by other processes.
+    Values are shared by threads of process (not copied), they must be treated as read-only.
+    Parameters:
+        max_size (int | None): max number of entries, default settings.CACHE_LOCAL["max_size"]
+        timeout (int | None): TTL of entries, seconds, default settings.CACHE_LOCAL["timeout"]
+        check_interval (float | None): interval of checks of version, seconds,
+            default settings.CACHE_LOCAL["check_interval"]
+    Methods:
+        get (key, default=None): get value of key or default (missing is a sentinel of a miss)
+        set (key, value): set value of key
+        delete (key): delete key in all processes (with the shared version)
+        delete_many (keys): delete keys in all processes (with one change of the shared version)
+        clear (): clear entries of process
+    """
+
+    version_key = "LOCAL_CACHE_VERSION"
+
+    def __init__(self, max_size: int | None = None, timeout: int | None = None, check_interval: float | None = None):
+        options = settings.CACHE_LOCAL
+        self.max_size = max_size or options["max_size"]
+        self.timeout = timeout or options["timeout"]
+        self.check_interval = check_interval or options["check_interval"]
+        self._entries = OrderedDict()  # {key: (value, expires)}
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked = 0.0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get value of key or default"""
+        self._check_version()
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is None:
+                return default
+            if entry[1] < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: Any) -> None:
+        """Set value of key, the least recently used entry is evicted over max_size"""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """Delete key, and change the shared version, so other processes clear the local entries"""
+        self.delete_many([key])
+
+    def delete_many(self, keys: list[str]) -> None:
+        """Delete keys, and change the shared version once"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        cache.set(self.version_key, get_unique_str(), timeout=None)
+
+    def clear(self) -> None:
+        """Clear entries of process"""
+        with self._lock:
+            self._entries.clear()
+
+    def _check_version(self) -> None:
+        """Clear entries, if the shared version is changed (checked at most once per check_interval)"""
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        version = cache.get(self.version_key, None)
+        if version != self._version:
+            self.clear()
+            self._version = version
+
+
+local_cache = LocalCache()
+
+
+def get_or_set_cache(
+    key: str,
+    func: Callable[[], Any],
+    timeout: int | None = None,
+    jitter: float | None = None,
+    stale_timeout: int | None = None,
+    lock_timeout: int | None = None,
+    negative_timeout: int | None = None,
+) -> Any:
+    """
+    Get value from cache, or set value of func (a read-through cache).
+    -------------------------------------------------------------------
+    A value is cached with time of freshness, so after the time the stale value is served,
+    while one process (which holds the lock) sets a new value (single flight).
+    On a miss, processes without the lock wait for the value (until the lock is expired).
+    None of func is cached for negative_timeout (e.g. an object is not found).
+    Defaults of parameters are in settings.CACHE_READ_THROUGH.
+    Parameters:
+        key (str): cache key
+        func (Callable[[], Any]): function of value
+        timeout (int | None): time of freshness of value, seconds
+        jitter (float | None): part of timeout, the time of freshness is randomly reduced by,
+            so keys cached together are not expired together
+        stale_timeout (int | None): time of serving stale value after time of freshness, seconds
+        lock_timeout (int | None): max time of setting value by func, seconds
+        negative_timeout (int | None): time of freshness of None, seconds
+    Returns:
+        (Any): value
+    """
+    options = settings.CACHE_READ_THROUGH
+    lock_timeout = lock_timeout or options["lock_timeout"]
+    entry_key = get_read_through_key(key)
+    lock_key = f"{entry_key}_LOCK"
+
+    entry = cache.get(entry_key, None)
+    if entry is not None and not _is_stale(entry):
+        return entry[0]
+
+    locked = cache.add(lock_key, 1, timeout=lock_timeout)
+    if not locked:
+        if entry is not None:
+            # The stale value is served, while the lock holder sets a new value
+            return entry[0]
+        entry = _wait_cache(entry_key, lock_key, lock_timeout)
+        if entry is not None:
+            return entry[0]
+
+    try:
+        value = func()
+        if value is None:
+            fresh_timeout = options["negative_timeout"] if negative_timeout is None else negative_timeout
+        else:
+            fresh_timeout = options["timeout"] if timeout is None else timeout
+            part = options["jitter"] if jitter is None else jitter
+            fresh_timeout = int(fresh_timeout * (1 - random.random() * part))
+        stale_timeout = options["stale_timeout"] if stale_timeout is None else stale_timeout
+        cache.set(entry_key, (value, time.time() + fresh_timeout), timeout=fresh_timeout + stale_timeout)
+    finally:
+        # The lock of another process is not deleted (the value is set after a timeout of waiting)
+        if locked:
+            cache.delete(lock_key)
+    return value
+
+
+def get_read_through_key(key: str) -> str:
+    """Get key of entry of get_or_set_cache in the shared cache"""
+    return f"{key}_RT{READ_THROUGH_VERSION}"
+
+
+def get_cache_entry(key: str) -> Any:
+    """Get value of entry of get_or_set_cache (fresh or stale), None if it is not cached"""
+    entry = cache.get(get_read_through_key(key), None)
+    return entry[0] if entry is not None else None
+
+
+def delete_cache_entries(*keys: str) -> None:
+    """Delete entries of get_or_set_cache"""
+    cache.delete_many([get_read_through_key(key) for key in keys])
+
+
+def _is_stale(entry: tuple) -> bool:
+    """Get time of freshness of cache entry is expired"""
+    return entry[1] < time.time()
+
+
+def _wait_cache(key: str, lock_key: str, lock_timeout: int) -> tuple | None:
+    """Wait for cache entry, while the lock is held (at most lock_timeout)"""
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(settings.CACHE_READ_THROUGH["wait_interval"])
+        entry = cache.get(key, None)
+        if entry is not None:
+            return entry
+        if cache.get(lock_key, None) is None:
+            break
+    return None
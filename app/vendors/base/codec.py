@@ -0,0 +1,171 @@
+import zlib
+import pickle
+import random
+import functools
+from django.conf import settings
+from django.db import models
+from django.db.models.fields.files import FieldFile
+from app.vendors.base.metrics import cache_metrics
+from typing import Any
+
+
+# Version of format of encoded values (the first byte), values of unknown versions are misses
+CODEC_VERSION = 1
+_flag_compressed = 1
+
+# Sentinel of a value, which can not be decoded (unknown version)
+undecodable = object()
+
+
+class PackedInstance(tuple):
+    """Model instance in a compact form: (number, model, db, attnames, values, related)"""
+
+    __slots__ = ()
+
+
+class PackedReference(tuple):
+    """Reference to an instance packed before (e.g. a back reference of prefetched objects): (number,)"""
+
+    __slots__ = ()
+
+
+def encode_value(value: Any, prefix: str = "") -> bytes | None:
+    """
+    Get value encoded for cache: version byte, flags byte, pickled (and compressed) compact value.
+    ----------------------------------------------------------------------------------------------
+    Model instances are packed to values of concrete (loaded) fields, prefetched and
+    select_related objects (without _state and other attributes of instance).
+    Pickled data is compressed with zlib, if it is over settings.CACHE_CODEC["compress_threshold"].
+    None is not encoded (negative caching).
+    Sizes are counted by key prefix (cache_metrics.encode): packed and pickled, encoded, and for a sample
+    of values (settings.CACHE_CODEC["full_size_sample_rate"]) the size of value pickled in full, without packing.
+    Parameters:
+        value (Any): value
+        prefix (str): key prefix for metrics of sizes, if empty sizes are not counted
+    Returns:
+        (bytes | None): encoded value
+    """
+    if value is None:
+        return None
+    options = settings.CACHE_CODEC
+    data = pickle.dumps(_pack(value, {}), pickle.HIGHEST_PROTOCOL)
+    pickled_size = len(data)
+    flags = 0
+    if len(data) > options["compress_threshold"]:
+        data = zlib.compress(data, options["compress_level"])
+        flags |= _flag_compressed
+    encoded = bytes((CODEC_VERSION, flags)) + data
+    if prefix:
+        full_size = _get_full_size(value) if random.random() < options["full_size_sample_rate"] else None
+        cache_metrics.encode(prefix, pickled_size, len(encoded), full_size)
+    return encoded
+
+
+def decode_value(encoded: Any) -> Any:
+    """
+    Get value from encoded value (encode_value).
+    --------------------------------------------
+    Values cached before the codec (not bytes) are returned as is.
+    Parameters:
+        encoded (Any): encoded value
+    Returns:
+        (Any): value, or undecodable if version of format is unknown
+    """
+    if not isinstance(encoded, bytes):
+        return encoded
+    if len(encoded) < 2 or encoded[0] != CODEC_VERSION:
+        return undecodable
+    data = encoded[2:]
+    if encoded[1] & _flag_compressed:
+        data = zlib.decompress(data)
+    return _unpack(pickle.loads(data), {})
+
+
+def get_key_prefix(key: str) -> str:
+    """Get prefix of cache key (before the first "_") for stats of sizes"""
+    return key.split("_", 1)[0]
+
+
+def _get_full_size(value: Any) -> int | None:
+    """Get size of value pickled in full (without packing), None if value is not picklable"""
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return None
+
+
+def _pack(value: Any, memo: dict) -> Any:
+    """Get value with model instances packed (in lists and tuples), memo is {id of instance: number}"""
+    if isinstance(value, models.Model):
+        if id(value) in memo:
+            return PackedReference((memo[id(value)],))
+        return _pack_instance(value, memo)
+    if type(value) in (list, tuple):
+        return type(value)(_pack(item, memo) for item in value)
+    return value
+
+
+def _unpack(value: Any, memo: dict) -> Any:
+    """Get value with model instances unpacked, memo is {number: instance}"""
+    if type(value) is PackedInstance:
+        return _unpack_instance(value, memo)
+    if type(value) is PackedReference:
+        return memo[value[0]]
+    if type(value) in (list, tuple):
+        return type(value)(_unpack(item, memo) for item in value)
+    return value
+
+
+def _pack_instance(instance: models.Model, memo: dict) -> PackedInstance:
+    """Get instance packed: values of concrete fields, and packed related objects"""
+    number = memo[id(instance)] = len(memo)
+    attnames, values = [], []
+    for field in instance._meta.concrete_fields:
+        if field.attname in instance.__dict__:
+            value = instance.__dict__[field.attname]
+            attnames.append(field.attname)
+            values.append(value.name if isinstance(value, FieldFile) else value)
+
+    related = {}
+    for name, related_instance in instance._state.fields_cache.items():
+        related[("fields", name)] = _pack(related_instance, memo)
+    for name, queryset in getattr(instance, "_prefetched_objects_cache", {}).items():
+        related[("prefetched", name)] = [_pack(item, memo) for item in queryset]
+    return PackedInstance((number, type(instance), instance._state.db, tuple(attnames), tuple(values), related))
+
+
+def _unpack_instance(packed: PackedInstance, memo: dict) -> models.Model:
+    """Get instance from packed instance"""
+    number, model, db, attnames, values, related = packed
+    instance = memo[number] = model.from_db(db, attnames, values)
+    for (kind, name), value in related.items():
+        if kind == "fields":
+            instance._state.fields_cache[name] = _unpack(value, memo)
+            continue
+        queryset = getattr(instance, _get_prefetch_accessors(model)[name]).get_queryset()
+        queryset._result_cache = [_unpack(item, memo) for item in value]
+        queryset._prefetch_done = True
+        instance.__dict__.setdefault("_prefetched_objects_cache", {})[name] = queryset
+    return instance
+
+
+@functools.cache
+def _get_prefetch_accessors(model: type) -> dict[str, str]:
+    """
+    Get accessors of related managers of model by names of their prefetched objects caches.
+    The name of cache is not always the accessor (e.g. reverse many-to-many without related_name).
+    """
+    res = {}
+    for field in model._meta.get_fields():
+        if not (field.one_to_many or field.many_to_many):
+            continue
+        if field.auto_created and not field.concrete:
+            # Reverse relations
+            accessor = field.get_accessor_name()
+            cache_name = field.field.related_query_name() if field.many_to_many else field.cache_name
+        else:
+            # Many-to-many fields and generic relations
+            accessor = cache_name = field.name
+        if accessor:
+            res[cache_name] = accessor
+    return res
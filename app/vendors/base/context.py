@@ -1,20 +1,208 @@
-from typing import Callable
+import asyncio
+import inspect
+import logging
+import contextvars
+from typing import (
+    Any,
+    Callable,
+)
 from collections import UserDict
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from asgiref.sync import async_to_sync
+from django.http import HttpRequest
+from django.db import close_old_connections
+from django.utils.functional import (
+    empty,
+    SimpleLazyObject,
+)
+
+
+app_logger = logging.getLogger("app")
+
+# Pool of threads of sync providers of async get_data (ContexData.aget_data)
+_executor = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get pool of threads of sync providers, size is settings.CONTEXT_PROVIDERS["workers"]"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.CONTEXT_PROVIDERS["workers"],
+            thread_name_prefix="context",
+        )
+    return _executor
+
+
+class LazyProvider:
+    """
+    Lazy provider of context data: the context holds a proxy, the provider runs on first access to the value
+    (e.g. in a template), the value is memoized by the proxy. Context variables (e.g. company of request)
+    are copied on creation of the proxy, so the provider gets them, even if the value is accessed later.
+    Using: ContexData({"menu": LazyProvider(get_menu_ctx_data)})
+    """
+
+    def __init__(self, provider: Callable):
+        self.provider = provider
+
+    def __call__(self, **kwargs) -> SimpleLazyObject:
+        context = contextvars.copy_context()
+        return SimpleLazyObject(lambda: context.run(_run, self.provider, kwargs))
 
 
 class ContexData(UserDict):
     """
     Get data for view get_contex_data
     self is: dict[str, Callable]
+    Results of providers are memoized on request (request_attr) by provider name and kwargs,
+    so every provider runs at most once per request for the same kwargs (results for unhashable kwargs
+    are not memoized). Providers wrapped with LazyProvider run on first access.
+    An error of a provider is raised by get_data. In async get_data (aget_data) a provider over its timeout
+    (or failed) gets its default value, or the error is raised, if the provider is required.
     """
 
+    request_attr = "_context_data"
+
     def __init__(self, data: dict[str, Callable]):
         super().__init__(data)
+        self.options = {}  # {key: {"timeout": float, "default": Any, "required": bool}}
+        self._hung = {}  # {key: future of a sync provider, which is timed out and still runs in the pool}
 
-    def get_data(self, **kwargs) -> dict:
-        """Get data updated with data from kwargs"""
-        result_ctx_data = {key: get_ctx_data(**kwargs) for key, get_ctx_data in self.items()}
+    def register(
+        self,
+        key: str,
+        provider: Callable,
+        timeout: float | None = None,
+        default: Any = None,
+        required: bool = False,
+        lazy: bool = False,
+    ) -> None:
+        """
+        Register provider with options of async get_data (aget_data).
+        --------------------------------------------------------------
+        Parameters:
+            key (str): name of provider (key of context)
+            provider (Callable): function (or async function) of data, with kwargs of get_context_data
+            timeout (float | None): max time of provider, seconds, default settings.CONTEXT_PROVIDERS["timeout"]
+            default (Any): value of context, if the provider is timed out or failed, default None
+            required (bool): an error (or timeout) of provider is raised, the default is not used, default False
+            lazy (bool): the provider is wrapped with LazyProvider, it runs on first access to the value
+                (an error is raised on access), default False
+        """
+        self[key] = LazyProvider(provider) if lazy else provider
+        self.options[key] = {"timeout": timeout, "default": default, "required": required}
+
+    def get_data(self, request: HttpRequest | None = None, **kwargs) -> dict:
+        """Get data updated with data from kwargs (memoized on request, if it is given)"""
+        if request is None:
+            return {key: _run(get_ctx_data, kwargs) for key, get_ctx_data in self.items()}
+
+        memo = request.__dict__.setdefault(self.request_attr, {})
+        result_ctx_data = {}
+        for key, get_ctx_data in self.items():
+            memo_key = _get_memo_key(key, kwargs)
+            if memo_key is None:
+                result_ctx_data[key] = _run(get_ctx_data, kwargs)
+                continue
+            if memo_key not in memo:
+                memo[memo_key] = _run(get_ctx_data, kwargs)
+            result_ctx_data[key] = memo[memo_key]
 
         return result_ctx_data
 
+    async def aget_data(self, request: HttpRequest | None = None, **kwargs) -> dict:
+        """
+        Get data updated with data from kwargs, providers run concurrently.
+        --------------------------------------------------------------------
+        Async providers are gathered, sync providers run in a bounded pool of threads (get_executor),
+        lazy providers are not run. A provider over its timeout (or failed) gets its default value,
+        the error of a required provider is raised. A sync provider can not be stopped: while a timed out
+        call still runs in the pool, the provider is not run again (it gets the default), so hung providers
+        do not fill the pool. Results are memoized on request, if it is given.
+        """
+        memo = request.__dict__.setdefault(self.request_attr, {}) if request is not None else {}
+        memo_keys = {key: _get_memo_key(key, kwargs) for key in self}
+        keys = [key for key, memo_key in memo_keys.items() if memo_key is None or memo_key not in memo]
+        values = dict(zip(keys, await asyncio.gather(*(self._arun(key, **kwargs) for key in keys))))
+        memo.update((memo_keys[key], value) for key, value in values.items() if memo_keys[key] is not None)
+        return {key: values[key] if key in values else memo[memo_key] for key, memo_key in memo_keys.items()}
+
+    async def _arun(self, key: str, **kwargs) -> Any:
+        """Run provider of key with timeout, get default value, if it is timed out or failed (and not required)"""
+        provider = self[key]
+        options = self.options.get(key, {})
+        timeout = options.get("timeout") or settings.CONTEXT_PROVIDERS["timeout"]
+        required = options.get("required", False)
+        if isinstance(provider, LazyProvider):
+            return provider(**kwargs)
+
+        future = None
+        if inspect.iscoroutinefunction(provider):
+            awaitable = provider(**kwargs)
+        else:
+            hung = self._hung.get(key, None)
+            if hung is not None and not hung.done():
+                if required:
+                    raise TimeoutError(f"Context provider {key} is still running after a timeout")
+                app_logger.warning(f"Context provider {key} is skipped: a timed out call is still running")
+                return options.get("default")
+            # Context variables (e.g. company of request) are copied into the thread
+            context = contextvars.copy_context()
+            future = get_executor().submit(context.run, _run_sync, provider, kwargs)
+            awaitable = asyncio.wrap_future(future)
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except TimeoutError:
+            if future is not None:
+                self._hung[key] = future
+            if required:
+                raise
+            app_logger.warning(f"Context provider {key} is timed out ({timeout} s)")
+        except Exception:
+            if required:
+                raise
+            app_logger.exception(f"Context provider {key} is failed")
+        return options.get("default")
+
+    @classmethod
+    def get_report(cls, request: HttpRequest) -> dict[str, list[str]]:
+        """Get names of providers of request: {"evaluated": [...], "not_evaluated": [...]} (lazy, not accessed)"""
+        evaluated = {}
+        for (key, _), value in request.__dict__.get(cls.request_attr, {}).items():
+            is_evaluated = not isinstance(value, SimpleLazyObject) or value._wrapped is not empty
+            evaluated[key] = evaluated.get(key, False) or is_evaluated
+        return {
+            "evaluated": [key for key, is_evaluated in evaluated.items() if is_evaluated],
+            "not_evaluated": [key for key, is_evaluated in evaluated.items() if not is_evaluated],
+        }
+
+    @classmethod
+    def clear(cls, request: HttpRequest) -> None:
+        """Delete results of providers memoized on request"""
+        request.__dict__.pop(cls.request_attr, None)
+
+
+def _get_memo_key(key: str, kwargs: dict) -> tuple | None:
+    """Get key of result of provider memoized on request: name of provider and kwargs, None if kwargs are unhashable"""
+    memo_key = key, tuple(sorted(kwargs.items()))
+    try:
+        hash(memo_key)
+    except TypeError:
+        return None
+    return memo_key
+
+
+def _run(provider: Callable, kwargs: dict) -> Any:
+    """Run provider (sync or async) in sync code"""
+    if inspect.iscoroutinefunction(provider):
+        return async_to_sync(provider)(**kwargs)
+    return provider(**kwargs)
+
 
+def _run_sync(provider: Callable, kwargs: dict) -> Any:
+    """Run sync provider in a thread of pool, connections of the thread are closed by CONN_MAX_AGE"""
+    try:
+        return provider(**kwargs)
+    finally:
+        close_old_connections()
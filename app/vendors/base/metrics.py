@@ -0,0 +1,228 @@
+import os
+import time
+import bisect
+import threading
+from django.conf import settings
+from django.core.cache import cache
+from app.vendors.helpers import get_unique_str
+
+
+# Sentinel of epoch of process before the first flush
+_no_epoch = object()
+
+
+class CacheMetrics:
+    """
+    Counters of cache by key prefix: hits, local hits, misses, sets, deletes, size of set values and latency of gets.
+    ---------------------------------------------------------------------------------------------------------------
+    Counters are added in process. A background thread of process writes the counters of process to its own key
+    of the shared cache (settings.CACHES) once per flush interval, so requests do not write counters, and counters
+    are not lost by concurrent updates (a key has one writer). get sums the counters of all processes.
+    A key of process expires after a few flush intervals without flushes (the process is stopped),
+    ids of processes without keys are dropped from the list of processes.
+    Latency is a histogram: number of gets by buckets (upper bounds in milliseconds, the last is +inf)
+    and sum of latency.
+    Sizes of the codec (encode_value): packed and pickled, encoded (compressed), and of a sample of values
+    pickled in full, so the size saved by packing of instances is estimated by the sample.
+    Options are in settings.CACHE_METRICS.
+    Methods:
+        hit (prefix, seconds, local=False): add a hit of get
+        miss (prefix, seconds): add a miss of get
+        set (prefix, size): add a set of value of size (bytes)
+        delete (prefix): add a delete
+        encode (prefix, pickled_size, size, full_size=None): add an encode of value by the codec
+        flush (): write counters of process to the shared cache
+        get (): get counters of all processes by prefix
+        clear (): clear counters of all processes
+    """
+
+    key = "CACHE_METRICS"
+    counters = ("hits", "local_hits", "misses", "sets", "deletes", "size", "latency_sum_us")
+
+    def __init__(self):
+        options = settings.CACHE_METRICS
+        self.enabled = options["enabled"]
+        self.buckets = tuple(options["buckets"])
+        self.flush_interval = options["flush_interval"]
+        self._counters = {}  # {prefix: {counter: value}} of process
+        self._is_changed = False
+        self._epoch = _no_epoch  # version of clear of counters, which counters of process are counted from
+        self._lock = threading.Lock()
+        self._pid = None  # process of the flush thread and of process_id
+        self._process_id = None
+
+    def hit(self, prefix: str, seconds: float, local: bool = False) -> None:
+        """Add a hit of get"""
+        self._add(prefix, "local_hits" if local else "hits", seconds=seconds)
+
+    def miss(self, prefix: str, seconds: float) -> None:
+        """Add a miss of get"""
+        self._add(prefix, "misses", seconds=seconds)
+
+    def set(self, prefix: str, size: int) -> None:
+        """Add a set of value of size"""
+        self._add(prefix, "sets", size=size)
+
+    def delete(self, prefix: str) -> None:
+        """Add a delete"""
+        self._add(prefix, "deletes")
+
+    def encode(self, prefix: str, pickled_size: int, size: int, full_size: int | None = None) -> None:
+        """Add an encode of value: sizes packed and pickled, encoded and pickled in full (for a sample of values)"""
+        sample = {"samples": 1, "sampled_full": full_size, "sampled_pickled": pickled_size} if full_size else {}
+        self._add(prefix, "encodes", pickled=pickled_size, encoded=size, **sample)
+
+    def flush(self) -> None:
+        """Write counters of process to the key of process in the shared cache"""
+        with self._lock:
+            is_changed, self._is_changed = self._is_changed, False
+            process_id = self._process_id
+        if not is_changed:
+            if process_id is not None:
+                # The key of process is kept while the process is running
+                cache.touch(self._get_process_key(process_id), self._get_process_timeout())
+            return
+        epoch = cache.get(f"{self.key}_EPOCH", None)
+        with self._lock:
+            if epoch != self._epoch:
+                if self._epoch is not _no_epoch:
+                    # Counters are cleared (clear) by a process, counters of process before it are dropped
+                    self._counters = {}
+                self._epoch = epoch
+            counters = {prefix: dict(values) for prefix, values in self._counters.items()}
+            process_id = self._get_process_id()
+        cache.set(self._get_process_key(process_id), counters, timeout=self._get_process_timeout())
+        # Processes of counters, a lost update is repaired by the next flush
+        processes = cache.get(f"{self.key}_PROCESSES", ())
+        if process_id not in processes:
+            processes = [*self._get_live_processes(processes), process_id]
+            cache.set(f"{self.key}_PROCESSES", processes, timeout=None)
+
+    def get(self) -> dict:
+        """
+        Get counters of all processes by prefix.
+        ----------------------------------------
+        Returns:
+            (dict): {prefix: {counter: value, "hit_ratio": float, "latency": {bucket: number}, "codec": {size: bytes}}}
+        """
+        self.flush()
+        processes = cache.get(f"{self.key}_PROCESSES", ())
+        values = cache.get_many([self._get_process_key(process_id) for process_id in processes])
+        if len(values) < len(processes):
+            # Keys of stopped processes are expired
+            cache.set(
+                f"{self.key}_PROCESSES",
+                [process_id for process_id in processes if self._get_process_key(process_id) in values],
+                timeout=None,
+            )
+        totals = {}
+        for counters in values.values():
+            for prefix, values in counters.items():
+                prefix_totals = totals.setdefault(prefix, {})
+                for name, value in values.items():
+                    prefix_totals[name] = prefix_totals.get(name, 0) + value
+
+        res = {}
+        for prefix in sorted(totals):
+            counters = totals[prefix]
+            gets = sum(counters.get(name, 0) for name in ("hits", "local_hits", "misses"))
+            res[prefix] = {name: counters.get(name, 0) for name in self.counters}
+            res[prefix]["hit_ratio"] = round((gets - counters.get("misses", 0)) / gets, 4) if gets else None
+            res[prefix]["latency"] = {
+                str(bound): counters.get(self._get_bucket_name(i), 0)
+                for i, bound in enumerate(self.buckets + ("inf",))
+            }
+            res[prefix]["codec"] = self._get_codec_sizes(counters)
+        return res
+
+    def clear(self) -> None:
+        """Clear counters of all processes (other processes drop their counters by the next flush)"""
+        epoch = get_unique_str()
+        cache.set(f"{self.key}_EPOCH", epoch, timeout=None)
+        with self._lock:
+            self._counters = {}
+            self._is_changed = False
+            self._epoch = epoch
+        processes = cache.get(f"{self.key}_PROCESSES", ())
+        cache.delete_many([self._get_process_key(process_id) for process_id in processes])
+        cache.delete(f"{self.key}_PROCESSES")
+
+    def _add(self, prefix: str, name: str, seconds: float | None = None, **sizes: int) -> None:
+        """Add an event to counters of process, and sizes to counters of sizes"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start_flush_thread()
+            counters = self._counters.setdefault(prefix, {})
+            counters[name] = counters.get(name, 0) + 1
+            if seconds is not None:
+                bucket = self._get_bucket_name(bisect.bisect_left(self.buckets, seconds * 1000))
+                counters[bucket] = counters.get(bucket, 0) + 1
+                counters["latency_sum_us"] = counters.get("latency_sum_us", 0) + int(seconds * 1_000_000)
+            for size_name, size in sizes.items():
+                counters[size_name] = counters.get(size_name, 0) + size
+            self._is_changed = True
+
+    def _start_flush_thread(self) -> None:
+        """Start the flush thread of process (after fork counters of the parent process are not counted again)"""
+        if self._pid is not None:
+            self._counters = {}
+        self._pid = os.getpid()
+        self._process_id = None
+        threading.Thread(target=self._flush_periodically, name="cache-metrics", daemon=True).start()
+
+    def _flush_periodically(self) -> None:
+        """Flush counters once per flush interval (target of the flush thread)"""
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                # A failure of the shared cache does not stop counting, the counters are written by the next flush
+                with self._lock:
+                    self._is_changed = True
+
+    def _get_process_id(self) -> str:
+        """Get unique id of process (pid is reused by other processes, e.g. of other hosts)"""
+        if self._process_id is None:
+            self._process_id = f"{os.getpid()}_{get_unique_str(8)}"
+        return self._process_id
+
+    def _get_process_key(self, process_id: str) -> str:
+        """Get key of counters of process"""
+        return f"{self.key}_{process_id}"
+
+    def _get_process_timeout(self) -> int:
+        """Get timeout of key of process: a few flush intervals, the key of a stopped process expires"""
+        return self.flush_interval * 3
+
+    def _get_live_processes(self, processes: list) -> list:
+        """Get processes which keys are not expired"""
+        values = cache.get_many([self._get_process_key(process_id) for process_id in processes])
+        return [process_id for process_id in processes if self._get_process_key(process_id) in values]
+
+    @staticmethod
+    def _get_codec_sizes(counters: dict) -> dict:
+        """Get sizes of the codec: encodes, pickled, encoded, saved by compression, saved by packing (estimated)"""
+        pickled, encoded = counters.get("pickled", 0), counters.get("encoded", 0)
+        sampled_pickled = counters.get("sampled_pickled", 0)
+        return {
+            "encodes": counters.get("encodes", 0),
+            "pickled": pickled,
+            "encoded": encoded,
+            "saved_by_compression": pickled - encoded,
+            "saved_by_packing": (
+                round(pickled * counters.get("sampled_full", 0) / sampled_pickled) - pickled
+                if sampled_pickled else None
+            ),
+        }
+
+    @staticmethod
+    def _get_bucket_name(index: int) -> str:
+        """Get name of counter of latency bucket"""
+        return f"latency_{index}"
+
+
+cache_metrics = CacheMetrics()
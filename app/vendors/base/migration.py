@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.db import (
+    models,
+    migrations,
+    transaction,
+)
+from typing import (
+    Any,
+    Callable,
+)
+
+
+def get_widen_columns_operations(
+    model_label: str,
+    fields: dict[str, models.Field],
+    chunk_size: int | None = None,
+) -> list:
+    """
+    Get migration operations, which convert columns of an existing table in place (e.g. SmallIntegerField
+    to BigIntegerField), without a long lock of the table.
+    -----------------------------------------------------------------------------------------------------
+    For every field: a temporary column is added, values are copied in chunks by ranges of primary key
+    (a transaction per chunk), then in one short transaction, with writes of the table locked,
+    rows changed during the copy are copied again, the old column is dropped and the temporary column is renamed.
+    The chunked copy needs transactional DDL (PostgreSQL), on other databases the column is altered
+    by one ALTER TABLE (the database locks the table for the time of it).
+    Indexes of the old columns are dropped with them, so the operations of indexes go after these operations.
+    The migration is not atomic (atomic = False), so chunks are committed one by one. Example:
+        class Migration(migrations.Migration):
+            atomic = False
+            operations = get_widen_columns_operations("catalog.Category", {
+                "left": models.BigIntegerField(blank=True, null=True),
+                "right": models.BigIntegerField(blank=True, null=True),
+            })
+    Parameters:
+        model_label (str): <app_label>.<ModelName>
+        fields (dict[str, models.Field]): new fields by name
+        chunk_size (int | None): rows per chunk, default settings.TREE_BATCH_SIZE
+    Returns:
+        (list): migration operations
+    """
+    _, model_name = model_label.split(".")
+    return [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(_get_widen_columns_code(model_label, fields, chunk_size)),
+            ],
+            state_operations=[
+                migrations.AlterField(model_name=model_name.lower(), name=name, field=field)
+                for name, field in fields.items()
+            ],
+        ),
+    ]
+
+
+def _get_widen_columns_code(model_label: str, fields: dict[str, models.Field], chunk_size: int | None) -> Callable:
+    """Get code of RunPython operation, which converts columns of the model"""
+
+    def widen_columns(apps: Any, schema_editor: Any) -> None:
+        model = apps.get_model(model_label)
+        for name, field in fields.items():
+            widen_column(schema_editor, model, name, field, chunk_size)
+
+    return widen_columns
+
+
+def widen_column(
+    schema_editor: Any,
+    model: type,
+    name: str,
+    field: models.Field,
+    chunk_size: int | None = None,
+) -> None:
+    """
+    Convert a column of an existing table in place, in chunks (see get_widen_columns_operations).
+    ---------------------------------------------------------------------------------------------
+    Parameters:
+        schema_editor (BaseDatabaseSchemaEditor): schema editor of migration
+        model (type): model (of migration state) with the old field
+        name (str): name of field
+        field (models.Field): new field
+        chunk_size (int | None): rows per chunk, default settings.TREE_BATCH_SIZE
+    """
+    connection = schema_editor.connection
+    quote_name = connection.ops.quote_name
+    chunk_size = chunk_size or settings.TREE_BATCH_SIZE
+
+    old_field = model._meta.get_field(name)
+    new_field = field.clone()
+    new_field.set_attributes_from_name(name)
+    new_field.model = model
+
+    if connection.vendor != "postgresql":
+        # Integer columns of SQLite are 64-bit already, and a table is remade by alter_field.
+        # DDL of other databases commits the transaction, so writes after the catch-up could not be locked out
+        schema_editor.alter_field(model, old_field, new_field)
+        return
+
+    temp_field = field.clone()
+    temp_field.null = True
+    temp_field.set_attributes_from_name(f"{old_field.column}_wide")
+    temp_field.model = model
+    schema_editor.add_field(model, temp_field)
+
+    table = quote_name(model._meta.db_table)
+    pk = quote_name(model._meta.pk.column)
+    old_column, temp_column = quote_name(old_field.column), quote_name(temp_field.column)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT MIN({pk}), MAX({pk}) FROM {table}")
+        min_pk, max_pk = cursor.fetchone()
+
+    if min_pk is not None:
+        for start in range(min_pk, max_pk + 1, chunk_size):
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {table} SET {temp_column} = {old_column} WHERE {pk} >= %s AND {pk} < %s",
+                    [start, start + chunk_size],
+                )
+
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            # Writes wait until commit (reads are not blocked),
+            # so a write is not committed between the catch-up and the drop
+            cursor.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+            # Rows changed during the copy
+            cursor.execute(
+                f"UPDATE {table} SET {temp_column} = {old_column} "
+                f"WHERE {temp_column} <> {old_column} "
+                f"OR ({temp_column} IS NULL AND {old_column} IS NOT NULL) "
+                f"OR ({temp_column} IS NOT NULL AND {old_column} IS NULL)"
+            )
+        schema_editor.remove_field(model, old_field)
+        schema_editor.alter_field(model, temp_field, new_field)
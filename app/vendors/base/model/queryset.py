@@ -1,10 +1,41 @@
+import time
 import logging
+from hashlib import md5
 from typing import Literal
-from django.db import models
+from django.db import (
+    models,
+    transaction,
+)
+from django.dispatch import receiver
+from django.core.exceptions import EmptyResultSet
+from django.db.models.utils import create_namedtuple_class
+from django.db.models.query import (
+    ModelIterable,
+    ValuesIterable,
+    NamedValuesListIterable,
+)
+from django.db.models.signals import (
+    post_save,
+    post_delete,
+    m2m_changed,
+    class_prepared,
+)
 from django.urls import reverse
 from django.contrib import admin
 from django.conf import settings
 from django.core.cache import cache
+from app.vendors.base.cache import (
+    missing,
+    local_cache,
+)
+from app.vendors.base.metrics import cache_metrics
+from app.vendors.base.codec import (
+    undecodable,
+    encode_value,
+    decode_value,
+    get_key_prefix,
+)
+from app.vendors.helpers import get_unique_str
 from django.utils.html import format_html
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
@@ -19,9 +50,100 @@ from django.core.paginator import (
 app_logger = logging.getLogger("app")
 type CacheQuerysetKey = Literal["queryset", "get", "first"]
 
+# Tables of models with cached queries (cache_queries), generations of which are changed by writes
+_cached_tables = set()
+
 
 class BaseQuerySet(models.QuerySet):
-    """Base queryset for models"""
+    """
+    Base queryset for models
+    Methods:
+        cached (timeout: int | None): get queryset, results of which are cached
+            by SQL, parameters and generations of tables (changed on every write of tables)
+    Models opt in to cached queries by attribute cache_queries = True,
+    generations are changed only for tables of these models.
+    """
+
+    _query_cache_timeout = missing
+
+    def cached(self, timeout: int | None = settings.CACHE_TIME_DEFAULT):
+        """
+        Get queryset, results of which are cached (opt-in).
+        ----------------------------------------------------
+        Key of results is SQL and parameters of query, and generations of tables of query (with joined tables),
+        a generation is changed by post_save, post_delete, m2m_changed signals and by update, delete,
+        bulk_create, bulk_update of queryset, so results are never stale after a write of the tables.
+        Only queries of tables of models with cache_queries = True are cached, other queries are executed.
+        Tables of subqueries (e.g. filter by pk__in=queryset) are not in the key.
+        Prefetched objects are got by their querysets (not cached, if their querysets are not cached).
+        Parameters:
+            timeout (int | None): cache timeout, default settings.CACHE_TIME_DEFAULT
+        Returns:
+            (BaseQuerySet): queryset
+        """
+        clone = self._chain()
+        clone._query_cache_timeout = timeout
+        return clone
+
+    def update(self, **kwargs):
+        res = super().update(**kwargs)
+        bump_table_generation(self.model._meta.db_table)
+        return res
+
+    def delete(self):
+        res = super().delete()
+        bump_table_generation(self.model._meta.db_table)
+        return res
+
+    def bulk_create(self, *args, **kwargs):
+        res = super().bulk_create(*args, **kwargs)
+        bump_table_generation(self.model._meta.db_table)
+        return res
+
+    def bulk_update(self, *args, **kwargs):
+        res = super().bulk_update(*args, **kwargs)
+        bump_table_generation(self.model._meta.db_table)
+        return res
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._query_cache_timeout = self._query_cache_timeout
+        return clone
+
+    def _fetch_all(self):
+        if self._result_cache is None and self._query_cache_timeout is not missing:
+            key = self._get_query_cache_key()
+            if key is not None:
+                prefix = get_key_prefix(key)
+                time_start = time.perf_counter()
+                res = decode_value(cache.get(key, None))
+                if res is None or res is undecodable:
+                    # Results are cached before prefetch, prefetched objects have own keys
+                    res = list(self._iterable_class(self))
+                    value = encode_value(res, prefix)
+                    cache.set(key, value, timeout=self._query_cache_timeout)
+                    cache_metrics.miss(prefix, time.perf_counter() - time_start)
+                    cache_metrics.set(prefix, len(value))
+                else:
+                    cache_metrics.hit(prefix, time.perf_counter() - time_start)
+                self._result_cache = res
+                if self._prefetch_related_lookups and not self._prefetch_done:
+                    self._prefetch_related_objects()
+                return
+        super()._fetch_all()
+
+    def _get_query_cache_key(self) -> str | None:
+        """Get cache key of results of query, None if query is empty or a table of query is not cached"""
+        tables = sorted({join.table_name for join in self.query.alias_map.values()} | {self.model._meta.db_table})
+        if not _cached_tables.issuperset(tables):
+            return None
+        try:
+            sql, params = self.query.get_compiler(using=self.db).as_sql()
+        except EmptyResultSet:
+            return None
+        generations = get_table_generations(tables)
+        data = repr((self.db, sql, params, self._iterable_class.__name__, self._fields, generations))
+        return f"QUERY_{md5(data.encode(), usedforsecurity=False).hexdigest()}"
 
     def blocked(self, blocked: bool = True):
         """Filter by field is_blocked, with value blocked (bool)"""
@@ -57,6 +179,10 @@ class BaseQuerySet(models.QuerySet):
         """
         Get result of quryset from cache or set cache if not exist.
         -----------------------------------------------------------
+        Results are kept in the in-process LRU cache (local_cache) in front of the shared cache.
+        A queryset is cached as evaluated rows in a compact form (tuples of values),
+        and got as a queryset with the rows. Values are encoded by the codec (encode_value).
+        Hits, misses, sets and latency are counted by prefix of key (cache_metrics).
         Parameters:
             by_key (str): cache key
             queryset_as (CacheQuerysetKey): Literal ("queryset", "get", "first")
@@ -66,18 +192,81 @@ class BaseQuerySet(models.QuerySet):
         Returns:
             cache value or queryset
         """
-        res = cache.get(by_key, None)
-        if res is None:
+        prefix = get_key_prefix(by_key)
+        time_start = time.perf_counter()
+        res = local_cache.get(by_key, missing)
+        if res is not missing:
+            cache_metrics.hit(prefix, time.perf_counter() - time_start, local=True)
+            return res
+
+        res = decode_value(cache.get(by_key, None))
+        is_hit = res is not None and res is not undecodable
+        if not is_hit:
             match queryset_as:
                 case "get":
                     res = self.get(**get_kwargs)
                 case "first":
                     res = self.first()
                 case "queryset":
-                    res = self
-            cache.set(by_key, res, timeout=timeout)
+                    res = self._get_rows_payload()
+            value = encode_value(res, prefix)
+            cache.set(by_key, value, timeout=timeout)
+            cache_metrics.set(prefix, len(value) if value is not None else 0)
+        if queryset_as == "queryset":
+            res = self._from_rows_payload(res)
+        local_cache.set(by_key, res)
+        (cache_metrics.hit if is_hit else cache_metrics.miss)(prefix, time.perf_counter() - time_start)
         return res
 
+    def _get_rows_payload(self) -> tuple:
+        """
+        Get rows of queryset in a compact form for cache: (kind, model or names of fields, rows).
+        -----------------------------------------------------------------------------------------
+        Model instances are tuples of values of concrete (not deferred) fields,
+        values() are tuples with names of fields, values_list() are tuples as is.
+        Instances with related objects (select_related, prefetch_related) or annotations are cached as is.
+        """
+        items = list(self)
+        query = self.query
+        if self._iterable_class is ValuesIterable:
+            names = tuple(items[0]) if items else ()
+            return "dict", names, tuple(tuple(item[name] for name in names) for item in items)
+        if self._iterable_class is NamedValuesListIterable:
+            return "named", tuple(items[0]._fields) if items else (), tuple(tuple(item) for item in items)
+        if self._iterable_class is not ModelIterable:
+            return "rows", None, tuple(items)
+        if query.select_related or query.annotation_select or query.extra_select or self._prefetch_related_lookups:
+            return "instances", None, items
+
+        # Values are taken from __dict__ of instance, so descriptors (e.g. of files) are not applied
+        deferred = items[0].get_deferred_fields() if items else set()
+        attnames = tuple(field.attname for field in self.model._meta.concrete_fields if field.attname not in deferred)
+        return "model", (self.model, attnames), tuple(tuple(vars(item)[name] for name in attnames) for item in items)
+
+    def _from_rows_payload(self, payload: tuple):
+        """Get queryset (with evaluated results) from rows in a compact form"""
+        if isinstance(payload, models.QuerySet):
+            # A queryset is cached by a previous version
+            return payload
+
+        kind, meta, rows = payload
+        match kind:
+            case "model":
+                model, attnames = meta
+                items = [model.from_db(self.db, attnames, row) for row in rows]
+            case "dict":
+                items = [dict(zip(meta, row)) for row in rows]
+            case "named":
+                row_class = create_namedtuple_class(*meta) if meta else tuple
+                items = [row_class(*row) for row in rows]
+            case _:
+                items = list(rows)
+
+        clone = self._chain()
+        clone._result_cache = items
+        clone._prefetch_done = True
+        return clone
+
     def pagination(self, page: int = 1, per_page: int = settings.NUMBER_PER_PAGE) -> Page:
         """
         Get pagination objects from queryset.
@@ -95,4 +284,89 @@ class BaseQuerySet(models.QuerySet):
             page_obj = paginator.page(1)  # first page
         except EmptyPage:
             page_obj = paginator.page(paginator.num_pages)  # last page
-        return page_obj
\ No newline at end of file
+        return page_obj
+
+def get_table_generations(tables: list[str], local: bool = False) -> list[str]:
+    """
+    Get generations of tables (for keys of cached queries).
+    -------------------------------------------------------
+    A missing generation (e.g. evicted) is set to a new unique value, so old keys are never used again.
+    Parameters:
+        tables (list[str]): names of tables
+        local (bool): get generations from the in-process cache (local_cache) first,
+            a changed generation can be got by other processes for check_interval of local_cache
+    Returns:
+        (list[str]): generations of tables, in order of tables
+    """
+    keys = [_get_table_generation_key(table) for table in tables]
+    generations = {}
+    if local:
+        for key in keys:
+            generation = local_cache.get(key, missing)
+            if generation is not missing:
+                generations[key] = generation
+    missed = [key for key in keys if key not in generations]
+    if missed:
+        generations.update(cache.get_many(missed))
+        for key in missed:
+            if key not in generations:
+                cache.add(key, get_unique_str(), timeout=None)
+                generations[key] = cache.get(key)
+            if local:
+                local_cache.set(key, generations[key])
+    return [generations[key] for key in keys]
+
+
+def bump_table_generation(table: str) -> None:
+    """
+    Change generation of table (cached queries of table are not used more), if the table is cached (cache_queries).
+    It is changed now and after commit, so results read by other transactions before commit are not used.
+    """
+    if table not in _cached_tables:
+        return
+    key = _get_table_generation_key(table)
+
+    def bump():
+        cache.set(key, get_unique_str(), timeout=None)
+        local_cache.delete(key)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def _get_table_generation_key(table: str) -> str:
+    """Get cache key of generation of table"""
+    return f"TABLE_GENERATION_{table}"
+
+
+def _is_cached_model(model) -> bool:
+    """Get model has cached queries: queries of BaseQuerySet and cache_queries = True"""
+    return (
+        getattr(model, "cache_queries", False)
+        and issubclass(getattr(model._default_manager, "_queryset_class", models.QuerySet), BaseQuerySet)
+    )
+
+
+def bump_model_generation(sender, **kwargs):
+    """Change generation of table of model on save and delete"""
+    bump_table_generation(sender._meta.db_table)
+
+
+@receiver(class_prepared)
+def connect_model_generation(sender, **kwargs):
+    """
+    Connect changes of generation to signals of models with cached queries (cache_queries)
+    (receivers are connected by sender, so fast deletes of other models are kept).
+    """
+    if not sender._meta.abstract and _is_cached_model(sender):
+        _cached_tables.add(sender._meta.db_table)
+        post_save.connect(bump_model_generation, sender=sender, dispatch_uid=f"generation_save_{sender._meta.label}")
+        post_delete.connect(bump_model_generation, sender=sender, dispatch_uid=f"generation_delete_{sender._meta.label}")
+
+
+@receiver(m2m_changed)
+def bump_m2m_generation(sender, instance, model, **kwargs):
+    """Change generations of tables of m2m relation on change"""
+    if kwargs.get("action", "").startswith("post_"):
+        for related in (sender, type(instance), model):
+            bump_table_generation(related._meta.db_table)
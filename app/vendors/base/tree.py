@@ -0,0 +1,343 @@
+import json
+from array import array
+from collections import namedtuple
+from bisect import (
+    bisect_left,
+    bisect_right,
+)
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+)
+
+
+# Nested set keys of a tree node
+TreeKeys = namedtuple("TreeKeys", ["left", "right", "level", "position"])
+
+# Record of tree import: key and parent key of record (not ids of database), position in siblings, field values
+TreeRecord = namedtuple("TreeRecord", ["key", "parent", "position", "payload"])
+
+
+def get_children_map(nodes: Iterable[tuple]) -> dict[Any, list]:
+    """
+    Get children lists by parent id.
+    --------------------------------
+    Parameters:
+        nodes (Iterable[tuple]): (id, parent_id, ...) in order of siblings
+    Returns:
+        children (dict[Any, list]): {parent_id: [id, ...]}, roots by key None
+    """
+    children = {}
+    for node_id, parent_id, *_ in nodes:
+        children.setdefault(parent_id, []).append(node_id)
+    return children
+
+
+def get_tree_layout(
+    children: dict[Any, list],
+    roots: list,
+    start: int = 1,
+    step: int = 1,
+    level: int = 1,
+) -> dict[Any, TreeKeys]:
+    """
+    Get nested set keys of nodes by iterative depth-first search.
+    -------------------------------------------------------------
+    Parameters:
+        children (dict[Any, list]): children lists by parent id
+        roots (list): ids of top nodes of the layout
+        start (int): first key, default 1
+        step (int): distance between neighbouring keys, 1 is a dense tree, default 1
+        level (int): level of top nodes, default 1
+    Returns:
+        layout (dict[Any, TreeKeys]): keys by node id
+    Raise:
+        ValueError: if the children lists have a cycle
+    """
+    layout, opened = {}, {}
+    key = start
+    stack = [[roots, 0, level]]  # [siblings, index of next sibling, level of siblings]
+
+    while stack:
+        frame = stack[-1]
+        siblings, index, node_level = frame
+        if index < len(siblings):
+            node_id = siblings[index]
+            if node_id in opened or node_id in layout:
+                raise ValueError(f"Tree has a cycle on node: {node_id}")
+            frame[1] += 1
+            opened[node_id] = (key, node_level, index + 1)
+            key += step
+            stack.append([children.get(node_id, ()), 0, node_level + 1])
+            continue
+
+        stack.pop()
+        if stack:
+            parent_frame = stack[-1]
+            node_id = parent_frame[0][parent_frame[1] - 1]
+            left, node_level, position = opened.pop(node_id)
+            layout[node_id] = TreeKeys(left, key, node_level, position)
+            key += step
+
+    return layout
+
+
+def get_tree_records(nodes: Iterable[dict], children_key: str = "children") -> Iterator[TreeRecord]:
+    """
+    Get import records of a nested structure.
+    -----------------------------------------
+    Parameters:
+        nodes (Iterable[dict]): top nodes, a node is field values and list of children nodes by children_key
+        children_key (str): key of children list, default "children"
+    Returns:
+        (Iterator[TreeRecord]): records in order of nodes, keys are numbers from 1
+    """
+    key = 0
+    stack = [(None, iter(nodes))]
+    while stack:
+        parent_key, siblings = stack[-1]
+        node = next(siblings, None)
+        if node is None:
+            stack.pop()
+            continue
+        key += 1
+        payload = {name: value for name, value in node.items() if name != children_key}
+        yield TreeRecord(key, parent_key, None, payload)
+        if node.get(children_key):
+            stack.append((key, iter(node[children_key])))
+
+
+def read_tree_records(lines: Iterable[str | bytes]) -> Iterator[TreeRecord]:
+    """
+    Get import records of JSON lines: {"id": ..., "parent": ..., "position": ..., "payload": {...}}.
+    ------------------------------------------------------------------------------------------------
+    Parameters:
+        lines (Iterable[str | bytes]): JSON lines (e.g. a file), empty lines are skipped
+    Returns:
+        (Iterator[TreeRecord]): records
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        data = json.loads(line)
+        yield TreeRecord(data["id"], data.get("parent"), data.get("position"), data.get("payload") or {})
+
+
+def get_sparse_step(lo: int, hi: int | None, size: int = 1, gap: int = 1, max_key: int | None = None) -> int | None:
+    """
+    Get step of keys for a branch placed between keys lo and hi.
+    ------------------------------------------------------------
+    Parameters:
+        lo (int): key before the branch (left of parent or right of previous sibling)
+        hi (int | None): key after the branch (right of parent or left of next sibling),
+            None if there is no upper bound (the bound is max_key)
+        size (int): number of nodes in the branch, default 1
+        gap (int): max step of keys, default 1
+        max_key (int | None): max value of keys (e.g. by type of field), default None is not limited
+    Returns:
+        step (int | None): step of keys, the first key is lo + step, None if the gap is exhausted
+    """
+    if hi is None:
+        if max_key is None:
+            return gap
+        hi = max_key + 1
+    step = min(gap, (hi - lo) // (2 * size + 1))
+    return step if step >= 1 else None
+
+
+def get_path_segment(position: int, width: int = 4) -> str:
+    """
+    Get segment of materialized path for position of node in children.
+    -------------------------------------------------------------------
+    Segments have a fixed width (zero-padded base 36), so paths are sorted in depth-first order.
+    Parameters:
+        position (int): position of node in children, from 1
+        width (int): number of chars in segment, default 4
+    Returns:
+        segment (str): segment of path
+    Raise:
+        ValueError: if position does not fit into the segment
+    """
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    if position < 0 or position >= 36 ** width:
+        raise ValueError(f"Position {position} does not fit into path segment of width {width}")
+    segment = ""
+    for _ in range(width):
+        position, rest = divmod(position, 36)
+        segment = digits[rest] + segment
+    return segment
+
+
+def check_tree_keys(rows: Iterable[tuple], dense: bool = True) -> Iterator[tuple[Any, str]]:
+    """
+    Check nested set keys by one pass with a stack.
+    ------------------------------------------------
+    Checked: left < right, uniqueness of keys, nesting into parent branch,
+    parent is the nearest upper node, level is parent level + 1,
+    for dense keys: keys are 1, 2, ... 2 * count (it covers min left, max right and level parity).
+    Parameters:
+        rows (Iterable[tuple]): (id, parent_id, left, right, level) ordered by left
+        dense (bool): the keys are dense, default True
+    Returns:
+        (Iterator[tuple[Any, str]]): id of offending node and error message
+    """
+    stack = []  # (id, right, depth) of opened nodes
+    last_key = 0
+
+    for node_id, parent_id, left, right, level in rows:
+        if left is None or right is None or level is None:
+            yield node_id, "Empty keys"
+            continue
+        if left >= right:
+            yield node_id, "Left is not less than right"
+            continue
+
+        while stack and stack[-1][1] < left:
+            closed_id, closed_right, _ = stack.pop()
+            if error := _get_key_error(closed_right, last_key, dense):
+                yield closed_id, error
+            last_key = max(last_key, closed_right)
+
+        if error := _get_key_error(left, last_key, dense):
+            yield node_id, error
+        last_key = max(last_key, left)
+
+        if stack:
+            upper_id, upper_right, upper_depth = stack[-1]
+            if right >= upper_right:
+                yield node_id, "Branch overlaps branch of upper node"
+            if parent_id != upper_id:
+                yield node_id, "Parent is not the nearest upper node"
+        elif parent_id is not None:
+            yield node_id, "Top node has parent"
+
+        # Level is compared with depth by keys, so a wrong level is not repeated for lower nodes
+        depth = stack[-1][2] + 1 if stack else 1
+        if level != depth:
+            yield node_id, "Level is not parent level + 1"
+
+        stack.append((node_id, right, depth))
+
+    while stack:
+        closed_id, closed_right, _ = stack.pop()
+        if error := _get_key_error(closed_right, last_key, dense):
+            yield closed_id, error
+        last_key = max(last_key, closed_right)
+
+
+def _get_key_error(key: int, last_key: int, dense: bool) -> str | None:
+    """Get error of next key in order of keys, or None"""
+    if key <= last_key:
+        return "Key is not unique"
+    if dense and key != last_key + 1:
+        return "Keys are not dense"
+    return None
+
+
+class TreeSnapshot:
+    """
+    Tree nodes in memory (loaded by one query), for lookups without queries.
+    -------------------------------------------------------------------------
+    Nodes are ordered by left, keys are in compact arrays, so lower nodes are a slice
+    found by binary search of left keys, and upper nodes are a chain of indexes.
+    Parameters:
+        nodes (Iterable): tree nodes (id, left, right, level) ordered by left
+    Attributes:
+        nodes (list): tree nodes ordered by left
+    Methods:
+        get (node_id): get node by id or None
+        get_by_left (left): get node by left key or None
+        with_lower (node): get node with lower nodes
+        lower (node): get lower nodes
+        parents (node): get parents nodes of node (with node)
+        branch (node): get branch of node (parents, node and lower nodes)
+        get_lower (node, by_depth: int = 1): get lower nodes by depth
+        get_with_lower (node, by_depth: int = 1): get node with lower nodes by depth
+    Node parameter of methods is a node or id of node.
+    """
+
+    def __init__(self, nodes: Iterable):
+        self.nodes = list(nodes)
+        self._lefts = array("q", (node.left for node in self.nodes))
+        self._rights = array("q", (node.right for node in self.nodes))
+        self._levels = array("q", (node.level for node in self.nodes))
+        self._index = {node.id: i for i, node in enumerate(self.nodes)}
+
+        # Index of the nearest upper node by keys, -1 for top nodes
+        self._uppers = array("q")
+        stack = []
+        for i, left in enumerate(self._lefts):
+            while stack and self._rights[stack[-1]] < left:
+                stack.pop()
+            self._uppers.append(stack[-1] if stack else -1)
+            stack.append(i)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def get(self, node_id: Any) -> Any:
+        """Get node by id or None"""
+        i = self._index.get(node_id)
+        return self.nodes[i] if i is not None else None
+
+    def get_by_left(self, left: int) -> Any:
+        """Get node by left key or None"""
+        i = bisect_left(self._lefts, left)
+        return self.nodes[i] if i < len(self._lefts) and self._lefts[i] == left else None
+
+    def with_lower(self, node: Any) -> list:
+        """Get node with lower nodes"""
+        return self.get_with_lower(node, by_depth=None)
+
+    def lower(self, node: Any) -> list:
+        """Get lower nodes"""
+        return self.get_lower(node, by_depth=None)
+
+    def parents(self, node: Any) -> list:
+        """Get parents nodes of node (with node), from the top"""
+        left, right, _ = self._get_keys(node)
+        i = bisect_right(self._lefts, left) - 1
+        while i >= 0 and self._rights[i] < right:
+            i = self._uppers[i]
+
+        res = []
+        while i >= 0:
+            res.append(self.nodes[i])
+            i = self._uppers[i]
+        res.reverse()
+        return res
+
+    def branch(self, node: Any) -> list:
+        """Get branch of node (parents, node and lower nodes)"""
+        return self.parents(node) + self.lower(node)
+
+    def get_lower(self, node: Any, by_depth: int | None = 1) -> list:
+        """Get lower nodes by depth (default depth is 1, None is all lower nodes)"""
+        left, right, level = self._get_keys(node)
+        return self._get_slice(bisect_right(self._lefts, left), right, level, by_depth)
+
+    def get_with_lower(self, node: Any, by_depth: int | None = 1) -> list:
+        """Get node with lower nodes by depth (default depth is 1, None is all lower nodes)"""
+        left, right, level = self._get_keys(node)
+        return self._get_slice(bisect_left(self._lefts, left), right, level, by_depth)
+
+    def _get_slice(self, start: int, right: int, level: int, by_depth: int | None) -> list:
+        """Get nodes from index start with left less than right, and level less than level + 1 + by_depth"""
+        end = bisect_left(self._lefts, right, lo=start)
+        if by_depth is None:
+            return self.nodes[start:end]
+        by_level = level + 1 + by_depth
+        return [self.nodes[i] for i in range(start, end) if self._levels[i] < by_level]
+
+    def _get_keys(self, node: Any) -> tuple[int, int, int]:
+        """Get (left, right, level) of node or of node by id"""
+        i = self._index.get(getattr(node, "id", node))
+        if i is not None:
+            return self._lefts[i], self._rights[i], self._levels[i]
+        if hasattr(node, "left"):
+            return node.left, node.right, node.level
+        raise KeyError(f"Node is not in snapshot: {node}")
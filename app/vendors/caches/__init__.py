@@ -0,0 +1,2 @@
+from .mmap import MmapCache
+from .file import ShardedFileCache
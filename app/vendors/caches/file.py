@@ -0,0 +1,280 @@
+import os
+import glob
+import time
+import zlib
+import pickle
+import random
+import shutil
+import struct
+import tempfile
+import threading
+from hashlib import md5
+from django.core.files import locks
+from django.utils._os import safe_makedirs
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+# Index of cache: number of entries
+_index = struct.Struct("<q")
+
+
+class ShardedFileCache(FileBasedCache):
+    """
+    File cache backend with keys sharded into subdirectories (by the first chars of md5 of key).
+    --------------------------------------------------------------------------------------------
+    A value is written into a temporary file of its shard and renamed (atomic), readers never see
+    a partial file. add links the temporary file to the file of key, so only one of concurrent adds
+    creates it (an expired file is removed under a lock). get_many and set_many work by shards:
+    a shard is listed once, and number of entries is changed once per batch. Number of entries is kept in a small index file (updated by batches of changes
+    of process), so a set checks the size in O(1), and culling runs in a background thread:
+    it deletes the files of random shards (1 / CULL_FREQUENCY of shards) and recounts the entries.
+    Settings (CACHES):
+        "BACKEND": "app.vendors.caches.ShardedFileCache",
+        "LOCATION": directory of cache,
+        "OPTIONS": {
+            "MAX_ENTRIES": max number of entries (default 300),
+            "CULL_FREQUENCY": 1 / part of shards deleted by culling (default 3),
+            "SHARD_DEPTH": number of levels of subdirectories, 256 per level (default 1),
+            "INDEX_INTERVAL": max interval of updates of the index by process, seconds (default 1),
+        }
+    """
+
+    index_name = "index"
+    index_batch = 100
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        options = params.get("OPTIONS", {})
+        self._shard_depth = int(options.get("SHARD_DEPTH", 1))
+        self._index_interval = float(options.get("INDEX_INTERVAL", 1))
+        self._index_path = os.path.join(self._dir, self.index_name)
+        self._lock = threading.Lock()
+        self._count = self._read_index()  # number of entries by the index, at the last update
+        self._delta = 0  # changes of number of entries of process, which are not in the index
+        self._updated = 0.0
+        self._culling = False
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set(self._key_to_file(key, version), value, timeout)
+        self._cull()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        fname = self._key_to_file(key, version)
+        tmp_path = self._write_shard_file(fname, value, timeout, rename=False)
+        try:
+            for _ in range(2):
+                try:
+                    os.link(tmp_path, fname)
+                except FileExistsError:
+                    if not self._delete_expired(fname):
+                        return False
+                except FileNotFoundError:
+                    # The shard is deleted by culling
+                    return False
+                else:
+                    self._change_count(1)
+                    self._cull()
+                    return True
+            return False
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        created = 0
+        for shard, files in self._get_shard_files(data, version).items():
+            safe_makedirs(shard, mode=0o700, exist_ok=True)
+            names = set(os.listdir(shard))
+            for key, fname in files.items():
+                self._write_shard_file(fname, data[key], timeout)
+                created += os.path.basename(fname) not in names
+        if created:
+            self._change_count(created)
+        self._cull()
+        return []
+
+    def get_many(self, keys, version=None):
+        res = {}
+        for shard, files in self._get_shard_files(keys, version).items():
+            if len(files) > 1:
+                # Missing keys of shard are skipped without opening their files
+                try:
+                    names = set(os.listdir(shard))
+                except FileNotFoundError:
+                    continue
+                files = {key: fname for key, fname in files.items() if os.path.basename(fname) in names}
+            for key, fname in files.items():
+                value = self._read_file(fname, self)
+                if value is not self:
+                    res[key] = value
+        return res
+
+    def clear(self):
+        for shard in glob.glob("[0-9a-f][0-9a-f]", root_dir=self._dir):
+            shutil.rmtree(os.path.join(self._dir, shard), ignore_errors=True)
+        with self._lock:
+            self._delta = 0
+        self._update_index(count=0)
+
+    def _set(self, fname: str, value, timeout) -> None:
+        """Write value into a temporary file of shard, and rename it"""
+        existed = os.path.exists(fname)
+        self._write_shard_file(fname, value, timeout)
+        if not existed:
+            self._change_count(1)
+
+    def _write_shard_file(self, fname: str, value, timeout, rename: bool = True) -> str:
+        """Write value into a temporary file of shard of fname (the shard is created, if it is deleted by culling)"""
+        try:
+            return self._write_file(fname, value, timeout, rename)
+        except FileNotFoundError:
+            safe_makedirs(os.path.dirname(fname), mode=0o700, exist_ok=True)
+            return self._write_file(fname, value, timeout, rename)
+
+    def _write_file(self, fname: str, value, timeout, rename: bool = True) -> str:
+        """
+        Write value into a temporary file in directory of fname, and rename it to fname.
+        ---------------------------------------------------------------------------------
+        Parameters:
+            fname (str): path of file of key
+            value: value of key
+            timeout: timeout of key
+            rename (bool): rename the temporary file to fname, else the temporary file is kept for caller
+        Returns:
+            (str): path of the temporary file
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(fname))
+        done = False
+        try:
+            with open(fd, "wb") as f:
+                self._write_content(f, timeout, value)
+            if rename:
+                os.replace(tmp_path, fname)
+            done = True
+        finally:
+            if not done and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return tmp_path
+
+    def _read_file(self, fname: str, default=None):
+        """Get value of file of key, default if file is not found or expired (an expired file is deleted)"""
+        try:
+            with open(fname, "rb") as f:
+                if not self._is_expired(f):
+                    return pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            pass
+        return default
+
+    def _delete_expired(self, fname: str) -> bool:
+        """
+        Delete file of key, if it is expired (for add).
+        ------------------------------------------------
+        Concurrent adds check and delete under a lock, so a file created by other add after the check is kept.
+        Returns:
+            (bool): file is deleted or not found
+        """
+        with open(os.path.join(self._dir, "add.lock"), "a+b") as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                with open(fname, "rb") as f:
+                    return self._is_expired(f)
+            except FileNotFoundError:
+                return True
+            finally:
+                locks.unlock(lock_file)
+
+    def _get_shard_files(self, keys, version=None) -> dict[str, dict]:
+        """Get files of keys by shards: {directory of shard: {key: path of file}}"""
+        res = {}
+        for key in keys:
+            fname = self._key_to_file(key, version)
+            res.setdefault(os.path.dirname(fname), {})[key] = fname
+        return res
+
+    def _delete(self, fname):
+        deleted = super()._delete(fname)
+        if deleted:
+            self._change_count(-1)
+        return deleted
+
+    def _cull(self):
+        """Start culling in background, if number of entries is over max entries"""
+        with self._lock:
+            if self._culling or self._count + self._delta < self._max_entries:
+                return
+            self._culling = True
+        threading.Thread(target=self._cull_shards, daemon=True).start()
+
+    def _cull_shards(self) -> None:
+        """Delete files of random shards (all files, if CULL_FREQUENCY is 0), and recount entries"""
+        try:
+            with open(os.path.join(self._dir, "cull.lock"), "a+b") as lock_file:
+                # Only one process culls the cache
+                if not locks.lock(lock_file, locks.LOCK_EX | locks.LOCK_NB):
+                    return
+                try:
+                    shards = glob.glob("[0-9a-f][0-9a-f]", root_dir=self._dir)
+                    if self._cull_frequency and shards:
+                        shards = random.sample(shards, max(1, len(shards) // self._cull_frequency))
+                    for shard in shards:
+                        shutil.rmtree(os.path.join(self._dir, shard), ignore_errors=True)
+                    count = len(self._list_cache_files())
+                    with self._lock:
+                        self._delta = 0
+                    self._update_index(count=count)
+                finally:
+                    locks.unlock(lock_file)
+        finally:
+            with self._lock:
+                self._culling = False
+
+    def _change_count(self, delta: int) -> None:
+        """Change number of entries, the index is updated by batches"""
+        with self._lock:
+            self._delta += delta
+            if abs(self._delta) < self.index_batch and time.monotonic() - self._updated < self._index_interval:
+                return
+            delta, self._delta = self._delta, 0
+        self._update_index(delta)
+
+    def _update_index(self, delta: int = 0, count: int | None = None) -> None:
+        """Add delta to number of entries in the index, or set number of entries"""
+        self._createdir()
+        with open(self._index_path, "a+b") as f:
+            locks.lock(f, locks.LOCK_EX)
+            try:
+                if count is None:
+                    f.seek(0)
+                    data = f.read(_index.size)
+                    count = max(0, (_index.unpack(data)[0] if len(data) == _index.size else 0) + delta)
+                f.seek(0)
+                f.truncate()
+                f.write(_index.pack(count))
+            finally:
+                locks.unlock(f)
+        with self._lock:
+            self._count = count
+            self._updated = time.monotonic()
+
+    def _read_index(self) -> int:
+        """Get number of entries in the index"""
+        try:
+            with open(self._index_path, "rb") as f:
+                data = f.read(_index.size)
+        except FileNotFoundError:
+            return 0
+        return _index.unpack(data)[0] if len(data) == _index.size else 0
+
+    def _key_to_file(self, key, version=None):
+        """Get path of file of key: directory / shards / md5 of key + suffix"""
+        key = self.make_and_validate_key(key, version=version)
+        name = md5(key.encode(), usedforsecurity=False).hexdigest()
+        shards = [name[i * 2:i * 2 + 2] for i in range(self._shard_depth)]
+        return os.path.join(self._dir, *shards, f"{name}{self.cache_suffix}")
+
+    def _list_cache_files(self):
+        """Get paths of all files of cache in shards"""
+        pattern = os.path.join(*["[0-9a-f][0-9a-f]"] * self._shard_depth, f"*{self.cache_suffix}")
+        return [os.path.join(self._dir, fname) for fname in glob.glob(pattern, root_dir=self._dir)]
@@ -0,0 +1,263 @@
+import os
+import mmap
+import time
+import struct
+import pickle
+import hashlib
+import threading
+from contextlib import contextmanager
+from django.core.files import locks
+from django.core.cache.backends.base import (
+    BaseCache,
+    DEFAULT_TIMEOUT,
+)
+
+
+# Header: magic, generation (odd while a write is in progress), number of slots, size of data,
+# end of data, number of used slots (live and deleted)
+_header = struct.Struct("<8sQQQQQ")
+_field = struct.Struct("<Q")
+_generation_offset, _end_offset, _used_offset = 8, 32, 40
+# Slot of index: hash of key (0 is empty, 1 is deleted), offset of record, length of record, expiry time (0 is never)
+_slot = struct.Struct("<QQQd")
+# Record of data: length of key, key, pickled value
+_record = struct.Struct("<H")
+
+_magic = b"APPMMAP1"
+_empty, _deleted = 0, 1
+
+
+class MmapCache(BaseCache):
+    """
+    Cache backend in a memory-mapped file, shared by processes of host (e.g. prefork workers).
+    -------------------------------------------------------------------------------------------
+    The file is an index of slots (open addressing, linear probing by hash of key) and an append-only
+    data area of records. Readers do not lock: a value is unpickled from the mapped memory and
+    the generation of header is checked before and after (a seqlock), a read is repeated if a write was
+    in progress. Writers are serialized by a lock of the file. When the data area is full, live records
+    are compacted, if there is no room after the compaction, the cache is cleared.
+    Settings (CACHES):
+        "BACKEND": "app.vendors.caches.MmapCache",
+        "LOCATION": path of file,
+        "OPTIONS": {"SLOTS": number of slots (default 4096), "SIZE": size of data area in bytes (default 64 MB)}
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+    read_retries = 100
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._path = str(location)
+        self._slots = int(options.get("SLOTS", 4096))
+        self._size = int(options.get("SIZE", 64 * 1024 * 1024))
+        self._index_offset = _header.size
+        self._data_offset = _header.size + self._slots * _slot.size
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = None
+        self._pid = None
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        found, value = self._read(key)
+        return value if found else default
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._read(key, load=False)[0]
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._write(key, pickle.dumps(value, self.pickle_protocol), self.get_backend_timeout(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        return self._write(key, pickled, self.get_backend_timeout(timeout), only_new=True)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expires = self.get_backend_timeout(timeout)
+        with self._writing() as mm:
+            slot = self._find(mm, key)[0]
+            if slot is None:
+                return False
+            key_hash, offset, length, _ = _slot.unpack_from(mm, slot)
+            _slot.pack_into(mm, slot, key_hash, offset, length, expires or 0)
+            return True
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._writing() as mm:
+            slot = self._find(mm, key)[0]
+            if slot is None:
+                return False
+            _slot.pack_into(mm, slot, _deleted, 0, 0, 0)
+            return True
+
+    def clear(self):
+        with self._writing() as mm:
+            self._clear(mm)
+
+    def close(self, **kwargs):
+        # The mapping is kept for next requests of process
+        pass
+
+    def _get_map(self) -> mmap.mmap:
+        """Get mapping of file, it is opened once per process (and created, if it does not exist)"""
+        if self._map is not None and self._pid == os.getpid():
+            return self._map
+        with self._lock:
+            if self._map is None or self._pid != os.getpid():
+                os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+                file = open(self._path, "a+b")
+                locks.lock(file, locks.LOCK_EX)
+                try:
+                    size = self._data_offset + self._size
+                    file.seek(0)
+                    header = file.read(_header.size)
+                    if len(header) < _header.size or _header.unpack(header)[0] != _magic or (
+                        _header.unpack(header)[2:4] != (self._slots, self._size)
+                    ):
+                        file.truncate(0)
+                        file.truncate(size)
+                        mm = mmap.mmap(file.fileno(), size)
+                        _header.pack_into(mm, 0, _magic, 0, self._slots, self._size, 0, 0)
+                    else:
+                        mm = mmap.mmap(file.fileno(), size)
+                finally:
+                    locks.unlock(file)
+                self._file, self._map, self._pid = file, mm, os.getpid()
+        return self._map
+
+    def _read(self, key: str, load: bool = True) -> tuple:
+        """Read value of key (a seqlock): (found, value)"""
+        mm = self._get_map()
+        for _ in range(self.read_retries):
+            generation = _field.unpack_from(mm, _generation_offset)[0]
+            if generation % 2:
+                time.sleep(0)
+                continue
+            try:
+                found, value = False, None
+                slot, record = self._find(mm, key)
+                if slot is not None:
+                    expires = _slot.unpack_from(mm, slot)[3]
+                    if not expires or expires > time.time():
+                        found = True
+                        if load:
+                            with memoryview(mm) as view:
+                                value = pickle.loads(view[record[0]:record[1]])
+            except Exception:
+                # The data was changed by a writer during the read
+                found = None
+            if found is not None and _field.unpack_from(mm, _generation_offset)[0] == generation:
+                return found, value
+        return False, None
+
+    def _find(self, mm: mmap.mmap, key: str) -> tuple:
+        """Get offset of slot of key and (start, end) of pickled value, or (None, None)"""
+        key_bytes = key.encode()
+        key_hash = self._hash(key_bytes)
+        for slot in self._probe(key_hash):
+            slot_hash, offset, length, _ = _slot.unpack_from(mm, slot)
+            if slot_hash == _empty:
+                break
+            if slot_hash == key_hash:
+                key_length = _record.unpack_from(mm, offset)[0]
+                start = offset + _record.size
+                if mm[start:start + key_length] == key_bytes:
+                    return slot, (start + key_length, offset + length)
+        return None, None
+
+    def _write(self, key: str, pickled: bytes, expires: float | None, only_new: bool = False) -> bool:
+        """Write record of key, compact or clear data if it is full"""
+        key_bytes = key.encode()
+        record = _record.pack(len(key_bytes)) + key_bytes + pickled
+        if len(record) > self._size:
+            return False
+
+        with self._writing() as mm:
+            slot = self._find(mm, key)[0]
+            if slot is not None:
+                if only_new and self._is_live(mm, slot):
+                    return False
+                _slot.pack_into(mm, slot, _deleted, 0, 0, 0)
+
+            end = _field.unpack_from(mm, _end_offset)[0]
+            if end + len(record) > self._size or not self._has_room(mm):
+                end = self._compact(mm)
+                if end + len(record) > self._size or not self._has_room(mm):
+                    self._clear(mm)
+                    end = 0
+            self._insert(mm, self._hash(key_bytes), record, end, expires or 0)
+            _field.pack_into(mm, _end_offset, end + len(record))
+            return True
+
+    def _insert(self, mm: mmap.mmap, key_hash: int, record: bytes, end: int, expires: float) -> None:
+        """Write record at end of data, and its slot"""
+        offset = self._data_offset + end
+        mm[offset:offset + len(record)] = record
+        for slot in self._probe(key_hash):
+            slot_hash = _slot.unpack_from(mm, slot)[0]
+            if slot_hash in (_empty, _deleted):
+                _slot.pack_into(mm, slot, key_hash, offset, len(record), expires)
+                if slot_hash == _empty:
+                    _field.pack_into(mm, _used_offset, _field.unpack_from(mm, _used_offset)[0] + 1)
+                return
+
+    def _compact(self, mm: mmap.mmap) -> int:
+        """Rewrite live records from start of data, and rebuild index; returns end of data"""
+        live = []
+        for slot in range(self._index_offset, self._data_offset, _slot.size):
+            key_hash, offset, length, expires = _slot.unpack_from(mm, slot)
+            if key_hash > _deleted and (not expires or expires > time.time()):
+                live.append((key_hash, mm[offset:offset + length], expires))
+        self._clear(mm)
+        end = 0
+        for key_hash, record, expires in live:
+            self._insert(mm, key_hash, record, end, expires)
+            end += len(record)
+        _field.pack_into(mm, _end_offset, end)
+        return end
+
+    def _clear(self, mm: mmap.mmap) -> None:
+        """Clear index and data"""
+        mm[self._index_offset:self._data_offset] = bytes(self._data_offset - self._index_offset)
+        _field.pack_into(mm, _end_offset, 0)
+        _field.pack_into(mm, _used_offset, 0)
+
+    def _has_room(self, mm: mmap.mmap) -> bool:
+        """Get index has a room (used and deleted slots are less than 3/4 of slots)"""
+        return _field.unpack_from(mm, _used_offset)[0] < self._slots * 3 // 4
+
+    def _is_live(self, mm: mmap.mmap, slot: int) -> bool:
+        """Get slot is not expired"""
+        expires = _slot.unpack_from(mm, slot)[3]
+        return not expires or expires > time.time()
+
+    def _probe(self, key_hash: int):
+        """Get offsets of slots in order of probing for hash"""
+        start = key_hash % self._slots
+        for i in range(self._slots):
+            yield self._index_offset + ((start + i) % self._slots) * _slot.size
+
+    @staticmethod
+    def _hash(key_bytes: bytes) -> int:
+        """Get hash of key, 0 and 1 are reserved"""
+        key_hash = int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), "little")
+        return key_hash if key_hash > _deleted else key_hash + 2
+
+    @contextmanager
+    def _writing(self):
+        """Context of write: lock of threads of process and of file, generation is odd during the write"""
+        mm = self._get_map()
+        with self._lock:
+            locks.lock(self._file, locks.LOCK_EX)
+            _field.pack_into(mm, _generation_offset, _field.unpack_from(mm, _generation_offset)[0] + 1)
+            try:
+                yield mm
+            finally:
+                _field.pack_into(mm, _generation_offset, _field.unpack_from(mm, _generation_offset)[0] + 1)
+                locks.unlock(self._file)
@@ -1,6 +1,8 @@
 import string
 import shutil
 import secrets
+from copy import deepcopy
+from types import MappingProxyType
 from app.vendors import data
 from datetime import datetime
 from django.conf import settings
@@ -235,6 +237,41 @@ def get_dict_value_by_keychain(dict_: dict, keychain: str) -> Any:
     return res
 
 
+def get_merged_dict(defaults: dict, dict_: dict) -> dict:
+    """Get dict merged (deep) with defaults, values of dict_ override values of defaults"""
+    res = dict(defaults)
+    for key, value in dict_.items():
+        if isinstance(value, dict) and isinstance(res.get(key, None), dict):
+            value = get_merged_dict(res[key], value)
+        res[key] = value
+    return res
+
+
+def get_keychains_table(dict_: dict, defaults: dict | None = None) -> MappingProxyType:
+    """
+    Get flattened, read-only dict of values by keychains (get_dict_value_by_keychain in O(1)).
+    ------------------------------------------------------------------------------------------
+    Every level is included: {"a": {"b": 1}} is {"a": {"b": 1}, "a.b": 1}. Values are copies
+    of dict_ and defaults (plain dicts and lists), they are shared by keychains and must not be changed.
+    Parameters:
+        dict_ (dict): data dict
+        defaults (dict | None): default values, dict_ is merged with it
+    Returns:
+        res (MappingProxyType): {keychain: value}
+    """
+    res = {}
+
+    def add_keychains(src: dict, prefix: str) -> None:
+        for key, value in src.items():
+            keychain = f"{prefix}{key}"
+            res[keychain] = value
+            if isinstance(value, dict):
+                add_keychains(value, f"{keychain}.")
+
+    add_keychains(deepcopy(get_merged_dict(defaults or {}, dict_ or {})), "")
+    return MappingProxyType(res)
+
+
 def update_request_get_parameters(params: dict, **kwargs) -> str:
     """
     Update request get parameters
@@ -1,14 +1,26 @@
+import json
 from typing import Any
+from django.urls import path
 from django.contrib import admin
 from django.conf import settings
-from django.db.models import Count
+from django.db.models import (
+    F,
+    Exists,
+    OuterRef,
+)
 from django.utils.html import format_html
-from django.http import HttpResponseRedirect
+from django.core.exceptions import PermissionDenied
+from django.http import (
+    HttpResponseRedirect,
+    HttpResponseNotAllowed,
+    JsonResponse,
+)
 from django.utils.translation import gettext_lazy as _
 from .filters import (
     LangsListFilter,
     ParentsFilter,
 )
+from app.vendors.mixins.model import TreeMixin
 from app.vendors.helpers import (
     get_choices_of_languages,
     update_request_get_parameters,
@@ -29,7 +41,11 @@ class AdminLanguageChoiceMixin:
 
 
 class AdminParentMixin:
-    """ Admin tree mixin """
+    """
+    Admin tree mixin
+    Methods:
+        get_num_child_expression: get expression of annotation num_child (node has lower nodes)
+    """
     current_url_params = None
 
     def parent_queryset(self, query, request, order_by: str | None = "created_at"):
@@ -42,11 +58,21 @@ class AdminParentMixin:
 
         if not request.GET.get("parent"):
             query = query.filter(parent__isnull=True)
-        query = query.annotate(num_child=Count("children"))
+        query = query.annotate(num_child=self.get_num_child_expression())
         if order_by:
             query = query.order_by(order_by)
         return query
 
+    def get_num_child_expression(self):
+        """
+        Get expression of annotation num_child, without a join and GROUP BY over the changelist:
+        number of lower nodes by keys for a dense nested set, else existence of children
+        (a subquery per row of page, by index of parent).
+        """
+        if issubclass(self.model, TreeMixin) and not self.model.is_sparse_tree():
+            return (F("right") - F("left") - 1) / 2
+        return Exists(self.model.objects.filter(parent_id=OuterRef("pk")))
+
     @admin.display(description="")
     def link_to_child(self, obj):
         _str_params = update_request_get_parameters(self.current_url_params, parent=obj.id)
@@ -63,11 +89,50 @@ class AdminParentMixin:
 
 
 class AdminTreeMixin(AdminParentMixin):
-    """Admin tree mixin"""
+    """
+    Admin tree mixin
+    Methods:
+        tree_handle: handle of drag and drop (add to list_display), it is used by js/admin/tree.js
+        tree_move_view: move nodes by a batch of operations (drag and drop),
+            POST json {"operations": [[node_id, new_parent_id, new_position], ...]}
+    """
 
     class Media:
         js = ["js/admin/tree.js"]
 
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        urls = [
+            path(
+                "tree-move/",
+                self.admin_site.admin_view(self.tree_move_view),
+                name="%s_%s_tree_move" % info,
+            ),
+        ]
+        return urls + super().get_urls()
+
+    @admin.display(description="")
+    def tree_handle(self, obj):
+        return format_html(
+            "<span class='tree-handle' draggable='true' data-id='{}' data-parent='{}' data-position='{}'>&#8597;</span>",
+            obj.id,
+            obj.parent_id or "",
+            obj.position or "",
+        )
+
+    def tree_move_view(self, request):
+        """Move nodes by a batch of operations, in one transaction"""
+        if request.method != "POST":
+            return HttpResponseNotAllowed(["POST"])
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        try:
+            operations = json.loads(request.body)["operations"]
+            count = self.model.move_tree_nodes(operations)
+        except (ValueError, KeyError, TypeError) as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+        return JsonResponse({"updated": count})
+
 
 class AdminSoftDeleteChangeFormMixin:
     """Admin form mixin. Set keys and change response for soft delete"""
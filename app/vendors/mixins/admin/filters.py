@@ -60,6 +60,10 @@ class ParentsFilter(admin.SimpleListFilter):
 
     def lookups(self, request, model_admin):
         parent_id = request.GET.get("parent", None)
+        if not parent_id:
+            return []
+        if hasattr(model_admin.model, "get_tree_breadcrumbs"):
+            return model_admin.model.get_tree_breadcrumbs(parent_id)
         parent = model_admin.model.objects.filter(pk=parent_id).first()
         _items = []
         if parent:
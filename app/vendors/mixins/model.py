@@ -1,16 +1,56 @@
-from django.db import models
+import time
+from itertools import batched
 from django.conf import settings
+from django.db import (
+    models,
+    router,
+    connections,
+    transaction,
+)
+from django.apps import apps
+from django.db.backends.base.operations import BaseDatabaseOperations
 from django.contrib import admin
 from django.utils import timezone
 from django.core.cache import cache
-from django.db.models.functions import Mod
 from django_ckeditor_5.fields import CKEditor5Field
-from django.utils.translation import gettext_lazy as _
-from app.vendors.helpers import get_choices_of_languages
+from django.utils.translation import (
+    get_language,
+    gettext_lazy as _,
+)
+from app.vendors.base.cache import (
+    missing,
+    local_cache,
+    get_or_set_cache,
+    get_cache_entry,
+    delete_cache_entries,
+)
+from app.vendors.base.metrics import cache_metrics
+from app.vendors.base.model.queryset import (
+    get_table_generations,
+    bump_table_generation,
+)
+from app.vendors.base.codec import (
+    undecodable,
+    encode_value,
+    decode_value,
+)
+from app.vendors.base.tree import (
+    TreeKeys,
+    TreeSnapshot,
+    get_children_map,
+    get_tree_layout,
+    get_sparse_step,
+    get_path_segment,
+    check_tree_keys,
+)
 from django.utils.html import (
     format_html,
     mark_safe,
 )
+from app.vendors.helpers import (
+    get_choices_of_languages,
+    get_unique_str,
+)
 from app.vendors.base.field import (
     ExtImageField,
     NamesJsonField,
@@ -24,12 +64,21 @@ from django.db.models import (
     F,
     Q,
     Max,
-    Min,
+    Case,
+    When,
+    Value,
 )
+from django.db.models.functions import (
+    Concat,
+    Substr,
+)
+from django.db.models.query import ModelIterable
 from typing import (
     Any,
     Tuple,
     List,
+    Iterable,
+    Sequence,
 )
 
 
@@ -299,7 +348,138 @@ class LanguageRichTextMixin(models.Model):
     )
 
 
-class TreeMixin(models.Model):
+# Key of new (not saved) node in a tree layout
+_new_tree_node = object()
+# Fields of tree row for a tree layout
+_tree_row_fields = ("id", "parent_id", "left", "right", "level", "position")
+
+
+class BaseTreeMixin(models.Model):
+    """
+    Base tree mixin, a storage of tree is defined by subclass:
+    TreeMixin (nested set), PathTreeMixin (materialized path), ClosureTreeMixin (closure table).
+    All of them have the same API for views.
+    --------------------------------------------------------------------------------------------
+    Attributes:
+        parent (ForeignKey by self): parent node id
+        level (SmallIntegerField): node level
+        position (SmallIntegerField): position node in children set
+    Properties (in subclass):
+        with_lower: get self with lower nodes
+        lower: get lower nodes
+        parents: get node parents
+        branch: get branch of node (parents, self and lower nodes)
+    Methods:
+        get_all (class method, in subclass): get tree nodes
+        get_lower (by_depth: int = 1, in subclass): get lower nodes by depth
+        get_with_lower (by_depth: int = 1, in subclass): get self with lower nodes by depth
+        create_tree_node (in subclass): create node, call before save
+        update_tree_node (in subclass): update node, call before save
+        delete_tree_node (in subclass): delete node
+        get_tree_version (class method): get version of tree, it is changed on every tree mutation
+        get_tree_breadcrumbs (class method): get parents of node (id, title) from cache
+    Admin:
+        tree_fieldsets: parent, position fieldsets
+    """
+
+    level = models.SmallIntegerField(
+        blank=True,
+        null=True,
+    )
+    position = models.SmallIntegerField(
+        blank=True,
+        null=True,
+    )
+    parent = models.ForeignKey(
+        verbose_name=_("Parent"),
+        to="self",
+        blank=True,
+        null=True,
+        related_name="children",
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        abstract = True
+        # Meta of a concrete tree model extends Meta of mixin to keep the indexes
+        indexes = [
+            models.Index(fields=["parent", "position"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Save node and change version of tree"""
+        super().save(*args, **kwargs)
+        transaction.on_commit(type(self)._bump_tree_version)
+
+    def delete(self, *args, **kwargs):
+        """Delete node and change version of tree"""
+        res = super().delete(*args, **kwargs)
+        transaction.on_commit(type(self)._bump_tree_version)
+        return res
+
+    @classmethod
+    def get_tree_version(cls) -> str:
+        """Get version of tree, it is changed on every tree mutation"""
+        key = cls._get_tree_cache_key("VERSION")
+        version = cache.get(key, None)
+        if version is None:
+            cache.add(key, get_unique_str(), timeout=None)
+            version = cache.get(key, None)
+        return version
+
+    @classmethod
+    def _bump_tree_version(cls) -> None:
+        """Change version of tree (a unique str, so an evicted version never comes back)"""
+        cache.set(cls._get_tree_cache_key("VERSION"), get_unique_str(), timeout=None)
+
+    @classmethod
+    def _get_tree_cache_key(cls, postfix: str) -> str:
+        """Get cache key for tree data"""
+        return f"{cls.__name__.upper()}_TREE_{postfix}"
+
+    @classmethod
+    def get_tree_breadcrumbs(cls, node_id: Any) -> List[Tuple[str, str]]:
+        """
+        Get parents of node (with node) for breadcrumbs, from cache by version of tree.
+        --------------------------------------------------------------------------------
+        Parameters:
+            node_id (Any): id of node
+        Returns:
+            (List[Tuple[str, str]]): (id, title) from the top, empty list if node is not found
+        """
+        key = f"{cls._get_tree_cache_key('BREADCRUMBS')}_{node_id}_{get_language()}_{cls.get_tree_version()}"
+        breadcrumbs = cache.get(key, None)
+        if breadcrumbs is None:
+            node = cls.objects.filter(pk=node_id).first()
+            breadcrumbs = [(str(upper.pk), str(upper)) for upper in node.parents] if node else []
+            cache.set(key, breadcrumbs, timeout=settings.CACHE_TIME_DEFAULT)
+        return breadcrumbs
+
+    def _get_tree_place(self, parent_id: Any, position: int | None, exclude_id: Any = None) -> Tuple[int, int]:
+        """Get index of a place for node in children of parent (position None is the last), and number of children"""
+        parent_q = Q(parent_id=parent_id) if parent_id else Q(parent__isnull=True)
+        siblings = type(self).objects.filter(parent_q)
+        if exclude_id is not None:
+            siblings = siblings.exclude(pk=exclude_id)
+        count = siblings.count()
+        index = min(max(position - 1, 0), count) if position else count
+        return index, count
+
+    def _shift_tree_positions(self, parent_id: Any, from_position: int, offset: int, exclude_id: Any = None) -> None:
+        """Shift positions of children of parent, from position by offset"""
+        parent_q = Q(parent_id=parent_id) if parent_id else Q(parent__isnull=True)
+        children = type(self).objects.filter(parent_q, position__gte=from_position)
+        if exclude_id is not None:
+            children = children.exclude(pk=exclude_id)
+        children.update(position=F("position") + offset)
+
+    tree_fieldsets = (
+        "parent",
+        "position",
+    )
+
+
+class TreeMixin(BaseTreeMixin):
     """
     Three fields mixin (nested set).
     ---------------------------------
@@ -309,6 +489,8 @@ class TreeMixin(models.Model):
         right (SmallIntegerField): right node index
         level (SmallIntegerField): node level
         position (SmallIntegerField): position node in children set
+        tree_key_gap (int): distance between neighbouring keys,
+            1 is a dense nested set, > 1 is a sparse (gap-based) nested set
     Properties:
         with_lower: get self with lower nodes
         lower: get lower nodes
@@ -316,12 +498,20 @@ class TreeMixin(models.Model):
         branch: get branch of node (parents, self and lower nodes)
     Methods:
         get_all (class method): get tree nodes
+        get_tree_snapshot (class method): get snapshot of tree nodes (TreeSnapshot) from cache
+        get_tree_version (class method): get version of tree, it is changed on every tree mutation
         get_lower(by_depth: int = 1): get lower nodes by depth
         get_with_lower(by_depth: int = 1): get self with lower nodes by depth
         create_tree_node: create node
         update_tree_node: update node
         delete_tree_node: delete node
+        rebuild_tree (class method): rebuild keys of nodes from parent pointers
+        move_tree_nodes (class method): move nodes by a batch of operations
+        import_tree (class method): import nodes by bulk inserts
+        get_tree_errors (class method): get errors of tree keys (id, message)
         check_tree (class method): check tree for test
+        is_sparse_tree (class method): the tree keys are sparse (gap-based)
+        get_tree_key_max (class method): get max value of keys by type of the field
     Admin:
         tree_fieldsets: parent, position fieldsets
     """
@@ -334,22 +524,13 @@ class TreeMixin(models.Model):
         blank=True,
         null=True,
     )
-    level = models.SmallIntegerField(
-        blank=True,
-        null=True,
-    )
-    position = models.SmallIntegerField(
-        blank=True,
-        null=True,
-    )
-    parent = models.ForeignKey(
-        verbose_name=_("Parent"),
-        to="self",
-        blank=True,
-        null=True,
-        related_name="children",
-        on_delete=models.CASCADE,
-    )
+
+    # Distance between neighbouring keys, 1 is a dense nested set.
+    # In a sparse tree an insert or a move writes only the node (branch)
+    # while there is a gap for it, else the nearest upper branch with room is renumbered.
+    # Keys are kept in the range of the field (get_tree_key_max): the step is reduced near the max,
+    # a large sparse tree needs wide keys (WideTreeMixin).
+    tree_key_gap = 1
 
     @property
     def with_lower(self):
@@ -391,14 +572,39 @@ class TreeMixin(models.Model):
             .order_by("left")
         )
 
-    class Meta:
+    class Meta(BaseTreeMixin.Meta):
         abstract = True
+        indexes = BaseTreeMixin.Meta.indexes + [
+            models.Index(fields=["left", "right"]),
+        ]
 
     @classmethod
     def get_all(cls):
         """Get all tree node"""
         return cls.objects.actual().order_by("left")
 
+    @classmethod
+    def get_tree_snapshot(cls) -> TreeSnapshot:
+        """
+        Get snapshot of actual tree nodes (get_all) for lookups without queries.
+        -------------------------------------------------------------------------
+        The snapshot is cached by version of tree, and kept in the process until the version is changed.
+        Returns:
+            (TreeSnapshot): tree nodes in memory
+        """
+        version = cls.get_tree_version()
+        memo_version, snapshot = getattr(cls, "_tree_snapshot", (None, None))
+        if memo_version == version:
+            return snapshot
+
+        key = f"{cls._get_tree_cache_key('SNAPSHOT')}_{version}"
+        snapshot = cache.get(key, None)
+        if snapshot is None:
+            snapshot = TreeSnapshot(cls.get_all())
+            cache.set(key, snapshot, timeout=settings.CACHE_TIME_DEFAULT)
+        cls._tree_snapshot = (version, snapshot)
+        return snapshot
+
     def get_lower(self, by_depth: int = 1):
         """Get lower nodes by depth (default depth is 1)"""
         by_level = self.level + 1 + by_depth
@@ -419,8 +625,30 @@ class TreeMixin(models.Model):
             .order_by("left")
         )
 
+    @classmethod
+    def is_sparse_tree(cls) -> bool:
+        """Get the tree keys are sparse (gap-based)"""
+        return cls.tree_key_gap > 1
+
+    @classmethod
+    def get_tree_key_max(cls) -> int:
+        """Get max value of keys (left, right) by type of the field"""
+        return BaseDatabaseOperations.integer_field_ranges[cls._meta.get_field("right").get_internal_type()][1]
+
+    @classmethod
+    def _get_tree_step(cls, size: int) -> int:
+        """Get step of keys of a whole tree of size nodes: tree_key_gap, reduced to fit keys into the field"""
+        step = get_sparse_step(0, None, size=size, gap=cls.tree_key_gap, max_key=cls.get_tree_key_max())
+        if step is None:
+            raise ValueError(f"Keys of {size} nodes do not fit into {cls.get_tree_key_max()} (use WideTreeMixin)")
+        return step
+
     def create_tree_node(self):
         """Create tree node"""
+        if type(self).is_sparse_tree():
+            self._create_sparse_tree_node()
+            return
+
         if self.parent_id:
             parent = type(self).objects.filter(pk=self.parent_id).first()
             level = parent.level + 1 if parent else 1
@@ -486,6 +714,10 @@ class TreeMixin(models.Model):
 
     def update_tree_node(self):
         """Update tree node"""
+        if type(self).is_sparse_tree():
+            self._update_sparse_tree_node()
+            return
+
         node = type(self).objects.filter(pk=self.id).first()
 
         if node.parent_id == self.parent_id and node.position == self.position:
@@ -576,6 +808,14 @@ class TreeMixin(models.Model):
 
     def delete_tree_node(self):
         """Delete tree node"""
+        if type(self).is_sparse_tree():
+            # The gap of deleted branch stays free for next nodes
+            type(self).objects.filter(left__gte=self.left, right__lte=self.right).delete()
+            if self.position:
+                self._shift_tree_positions(self.parent_id, self.position + 1, -1)
+            transaction.on_commit(type(self)._bump_tree_version)
+            return
+
         right = self.right
         left = self.left
         offset = right - left + 1
@@ -592,57 +832,435 @@ class TreeMixin(models.Model):
         type(self).objects.filter(left__gt=right).update(
             left=F("left") - offset, right=F("right") - offset
         )
+        transaction.on_commit(type(self)._bump_tree_version)
+
+    def _create_sparse_tree_node(self):
+        """Create tree node in sparse tree"""
+        parent = type(self).objects.filter(pk=self.parent_id).first() if self.parent_id else None
+        lo, hi, index, count = self._get_tree_bounds(parent, self.position)
+        step = get_sparse_step(lo, hi, gap=type(self).tree_key_gap, max_key=type(self).get_tree_key_max())
+
+        if step is None:
+            # The gap is exhausted
+            keys = self._renumber_sparse_tree(parent, index, _new_tree_node)[_new_tree_node]
+        else:
+            if index < count:
+                self._shift_tree_positions(self.parent_id, index + 1, 1)
+            level = parent.level + 1 if parent else 1
+            keys = TreeKeys(lo + step, lo + 2 * step, level, index + 1)
+
+        self.left, self.right, self.level, self.position = keys
+
+    def _update_sparse_tree_node(self):
+        """Update (move) tree node in sparse tree"""
+        node = type(self).objects.filter(pk=self.id).first()
+
+        if node.parent_id == self.parent_id and node.position == self.position:
+            # A tree is not updated
+            return
+
+        parent = type(self).objects.filter(pk=self.parent_id).first() if self.parent_id else None
+        if parent and node.left <= parent.left and parent.right <= node.right:
+            raise ValueError("A node can not be moved into own branch")
+
+        branch = list(
+            type(self)
+            .objects.filter(left__gte=node.left, right__lte=node.right)
+            .order_by("left")
+            .values_list(*_tree_row_fields)
+        )
+
+        with transaction.atomic():
+            if node.position:
+                # Close the place of node in old children
+                self._shift_tree_positions(node.parent_id, node.position + 1, -1, exclude_id=node.id)
+
+            lo, hi, index, count = self._get_tree_bounds(parent, self.position, exclude_id=node.id)
+            step = get_sparse_step(
+                lo, hi, size=len(branch), gap=type(self).tree_key_gap, max_key=type(self).get_tree_key_max()
+            )
+
+            if step is None:
+                # The gap is exhausted
+                layout = self._renumber_sparse_tree(parent, index, node.id, branch)
+            else:
+                if index < count:
+                    self._shift_tree_positions(self.parent_id, index + 1, 1, exclude_id=node.id)
+                layout = get_tree_layout(
+                    get_children_map(branch),
+                    [node.id],
+                    start=lo + step,
+                    step=step,
+                    level=parent.level + 1 if parent else 1,
+                )
+                layout[node.id] = layout[node.id]._replace(position=index + 1)
+                self._save_tree_layout(layout, branch, exclude_id=node.id)
+
+        self.left, self.right, self.level, self.position = layout[node.id]
+
+    def _get_tree_bounds(self, parent, position: int | None, exclude_id: Any = None) -> Tuple[int, int | None, int, int]:
+        """
+        Get bounds of a place for node in children of parent.
+        -----------------------------------------------------
+        Parameters:
+            parent (TreeMixin | None): parent node, None for top level
+            position (int | None): position in children, None is the last
+            exclude_id (Any): id of node which is not counted in children
+        Returns:
+            (tuple): key before the place, key after the place (None if there is no upper bound),
+                index of the place, number of children
+        """
+        parent_q = Q(parent_id=parent.id) if parent else Q(parent__isnull=True)
+        siblings = type(self).objects.filter(parent_q)
+        if exclude_id is not None:
+            siblings = siblings.exclude(pk=exclude_id)
+        siblings = list(siblings.order_by("left").values_list("left", "right"))
+
+        count = len(siblings)
+        index = min(max(position - 1, 0), count) if position else count
+        lo = siblings[index - 1][1] if index else (parent.left if parent else 0)
+        hi = siblings[index][0] if index < count else (parent.right if parent else None)
+        return lo, hi, index, count
+
+    def _renumber_sparse_tree(self, parent, index: int, node_key: Any, branch: list | None = None) -> dict:
+        """
+        Renumber keys of the nearest upper branch, which has a room for the node (or moved branch).
+        -------------------------------------------------------------------------------------------
+        Parameters:
+            parent (TreeMixin | None): new parent of node, None for top level
+            index (int): index of node in children of parent
+            node_key (Any): id of moved node, or key of new node
+            branch (list | None): rows of moved branch
+        Returns:
+            layout (dict[Any, TreeKeys]): keys of renumbered nodes by id
+        """
+        gap = type(self).tree_key_gap
+        anchor = parent
+
+        while True:
+            anchor_q = Q(left__gt=anchor.left, right__lt=anchor.right) if anchor else Q()
+            rows = list(
+                type(self)
+                .objects.filter(anchor_q)
+                .order_by("left")
+                .values_list(*_tree_row_fields)
+            )
+            ids = {row[0] for row in rows}
+            rows += [row for row in branch or [] if row[0] not in ids]
+            size = len(ids | {row[0] for row in branch or []} | {node_key})
+
+            lo, hi = (anchor.left, anchor.right) if anchor else (0, None)
+            step = get_sparse_step(lo, hi, size=size, gap=gap, max_key=type(self).get_tree_key_max())
+            if step is not None:
+                break
+            if anchor is None:
+                step = type(self)._get_tree_step(size)
+                break
+            anchor = type(self).objects.filter(pk=anchor.parent_id).first() if anchor.parent_id else None
+
+        children = get_children_map(rows)
+        for siblings in children.values():
+            if node_key in siblings:
+                siblings.remove(node_key)
+        children.setdefault(parent.id if parent else None, []).insert(index, node_key)
+
+        layout = get_tree_layout(
+            children,
+            children.get(anchor.id if anchor else None, []),
+            start=lo + step,
+            step=step,
+            level=anchor.level + 1 if anchor else 1,
+        )
+        with transaction.atomic():
+            self._save_tree_layout(layout, rows, exclude_id=node_key)
+        return layout
 
     @classmethod
-    def check_tree(cls):
-        """Check tree in test"""
-        left_gr_right = cls.objects.filter(left__gte=F("right"))
-        if len(left_gr_right):
-            raise ValueError("Some left gr right")
-
-        left_min = cls.objects.aggregate(Min("left", default=None))
-        right_max = cls.objects.aggregate(Max("right", default=None))
-        count = cls.objects.count()
-
-        if left_min and left_min["left__min"] != 1:
-            raise ValueError("Min left != 1")
-        if right_max and right_max["right__max"] / count != 2:
-            raise ValueError("Max right / count != 2")
-
-        rem_div = cls.objects.annotate(rmd=Mod(F("right") - F("left"), 2)).filter(rmd=0)
-        rem_dif = cls.objects.annotate(rmd=Mod(F("left") - F("level") + 2, 2)).filter(
-            rmd=1
+    def _save_tree_layout(cls, layout: dict, rows: list, exclude_id: Any = None, parents: dict | None = None) -> int:
+        """
+        Save keys from layout for rows (id, parent_id, left, right, level, position) which keys are changed.
+        Keys are written by chunks of one parametrized UPDATE (executemany), it is linear by number of rows,
+        unlike bulk_update which builds CASE expression for each chunk.
+        If parents ({id: parent_id}) is set, parents are saved too.
+        The generation of table is changed (raw writes do not send signals of cached queries).
+        Returns number of saved rows.
+        """
+        def get_changed():
+            for node_id, parent_id, *keys in rows:
+                new_keys = layout.get(node_id)
+                if node_id == exclude_id or new_keys is None:
+                    continue
+                if parents is None:
+                    if new_keys != tuple(keys):
+                        yield (*new_keys, node_id)
+                elif new_keys != tuple(keys) or parents[node_id] != parent_id:
+                    yield (*new_keys, parents[node_id], node_id)
+
+        fields = TreeKeys._fields if parents is None else (*TreeKeys._fields, "parent")
+        connection = connections[router.db_for_write(cls)]
+        quote_name = connection.ops.quote_name
+        columns = ", ".join(
+            f"{quote_name(cls._meta.get_field(name).column)} = %s" for name in fields
+        )
+        sql = (
+            f"UPDATE {quote_name(cls._meta.db_table)} SET {columns} "
+            f"WHERE {quote_name(cls._meta.pk.column)} = %s"
         )
 
-        if len(rem_div):
-            raise ValueError("Some MOD((left - right) / 2) != 0")
-
-        if len(rem_dif):
-            raise ValueError("Some MOD((left – level + 2) / 2) != 1")
-
-        not_uniq = cls.objects.raw(
-            """
-            SELECT t1.id,
-                COUNT(t1.id) AS rep,
-                MAX(t3.right) AS max_right
-            FROM %(table_name)s AS t1, %(table_name)s AS t2, %(table_name)s AS t3
-            WHERE t1.left <> t2.left
-            AND t1.left <> t2.right
-            AND t1.right <> t2.left
-            AND t1.right <> t2.right
-            GROUP BY t1.id
-            HAVING max_right <> SQRT(4 * rep + 1) + 1
-            """
-            % {"table_name": cls._meta.db_table}
+        count = 0
+        with connection.cursor() as cursor:
+            for chunk in batched(get_changed(), settings.TREE_BATCH_SIZE):
+                cursor.executemany(sql, chunk)
+                count += len(chunk)
+        if count:
+            bump_table_generation(cls._meta.db_table)
+        return count
+
+    @classmethod
+    def rebuild_tree(cls) -> int:
+        """
+        Rebuild keys (left, right, level, position) of all nodes from parent pointers.
+        -----------------------------------------------------------------------------
+        Nodes are read by one streaming query, children are ordered by position (and id),
+        keys are computed in memory and only changed rows are saved by chunks.
+        Returns:
+            (int): number of saved rows
+        Raise:
+            ValueError: if some nodes are not reachable from top nodes (a cycle of parents), or keys do not fit
+        """
+        rows = list(
+            cls.objects.order_by(F("position").asc(nulls_last=True), "id")
+            .values_list(*_tree_row_fields)
+            .iterator(chunk_size=settings.TREE_BATCH_SIZE)
         )
+        children = get_children_map(rows)
+        step = cls._get_tree_step(len(rows))
+        layout = get_tree_layout(children, children.get(None, []), start=step, step=step)
+        if len(layout) != len(rows):
+            unreachable = [row[0] for row in rows if row[0] not in layout]
+            raise ValueError(f"Nodes are not reachable from top nodes: {unreachable}")
+
+        with transaction.atomic():
+            count = cls._save_tree_layout(layout, rows)
+            transaction.on_commit(cls._bump_tree_version)
+        return count
 
-        if len(not_uniq):
-            raise ValueError("Not unique left or right")
+    @classmethod
+    def move_tree_nodes(cls, operations: Iterable[Sequence]) -> int:
+        """
+        Move nodes by a batch of operations (for admin drag and drop).
+        ---------------------------------------------------------------
+        Nodes are read and locked (select_for_update) by one query, operations are applied to keys in memory
+        and only changed rows are saved in one transaction. A moved branch is placed into the gap of its new
+        place (sparse tree), else keys of the nearest upper branch which has a room are laid out again
+        (the common upper branch of old and new place for a dense tree), the other keys are not changed.
+        Parameters:
+            operations (Iterable[Sequence]): (node, new_parent, new_position),
+                node and new_parent are nodes or ids, new_parent None is the top level,
+                new_position from 1, None is the last position
+        Returns:
+            (int): number of saved rows
+        Raise:
+            ValueError: if a node (parent) is not found, a node is moved into own branch, or keys do not fit
+        """
+        gap, max_key = cls.tree_key_gap, cls.get_tree_key_max()
+        sparse = cls.is_sparse_tree()
+
+        def get_size(node_id):
+            size, stack = 0, list(children.get(node_id, ()))
+            while stack:
+                size += 1
+                stack.extend(children.get(stack.pop(), ()))
+            return size
+
+        with transaction.atomic():
+            rows = list(cls.objects.select_for_update().order_by("left").values_list(*_tree_row_fields))
+            children = get_children_map(rows)
+            parents = {row[0]: row[1] for row in rows}
+            keys = {row[0]: TreeKeys(*row[2:]) for row in rows}
+            moved_parents = set()
+
+            for node, new_parent, position in operations:
+                node_id = getattr(node, "pk", node)
+                parent_id = getattr(new_parent, "pk", new_parent)
+                if node_id not in parents:
+                    raise ValueError(f"Node is not found: {node_id}")
+                if parent_id is not None and parent_id not in parents:
+                    raise ValueError(f"Parent is not found: {parent_id}")
+
+                upper_id = parent_id
+                while upper_id is not None:
+                    if upper_id == node_id:
+                        raise ValueError(f"A node can not be moved into own branch: {node_id}")
+                    upper_id = parents[upper_id]
+
+                moved_parents.update((parents[node_id], parent_id))
+                children[parents[node_id]].remove(node_id)
+                siblings = children.setdefault(parent_id, [])
+                index = min(max(position - 1, 0), len(siblings)) if position else len(siblings)
+                siblings.insert(index, node_id)
+                parents[node_id] = parent_id
+
+                parent = keys.get(parent_id)
+                lo = keys[siblings[index - 1]].right if index else (parent.left if parent else 0)
+                hi = keys[siblings[index + 1]].left if index + 1 < len(siblings) else (parent.right if parent else None)
+                step = get_sparse_step(lo, hi, size=get_size(node_id) + 1, gap=gap, max_key=max_key) if sparse else None
+                anchor_id, roots = parent_id, [node_id]
+
+                while step is None:
+                    # The gap is exhausted, the nearest upper branch which has a room is laid out
+                    anchor = keys.get(anchor_id)
+                    roots = children.get(anchor_id, [])
+                    if anchor is None:
+                        lo, step = 0, cls._get_tree_step(len(rows))
+                        break
+                    lo = anchor.left
+                    step = get_sparse_step(lo, anchor.right, size=get_size(anchor_id), gap=gap, max_key=max_key)
+                    if step is None:
+                        anchor_id = parents[anchor_id]
+
+                anchor = keys.get(anchor_id)
+                level = anchor.level + 1 if anchor else 1
+                keys.update(get_tree_layout(children, roots, start=lo + step, step=step, level=level))
+
+            for parent_id in moved_parents:
+                for index, node_id in enumerate(children.get(parent_id, [])):
+                    keys[node_id] = keys[node_id]._replace(position=index + 1)
+
+            count = cls._save_tree_layout(keys, rows, parents=parents)
+            transaction.on_commit(cls._bump_tree_version)
+        return count
 
-    tree_fieldsets = (
-        "parent",
-        "position",
-    )
+    @classmethod
+    def import_tree(cls, records: Iterable[Sequence], parent: Any = None, batch_size: int | None = None) -> int:
+        """
+        Import nodes (e.g. seeding of menus, import of categories), without queries per node.
+        ----------------------------------------------------------------------------------------
+        Keys of imported nodes are computed in memory, the imported tree is appended to children
+        of parent by one shift of keys, nodes are created by bulk_create level by level
+        (parent ids of a level are known after the upper level is created).
+        Records are made by app.vendors.base.tree.get_tree_records (a nested structure)
+        or app.vendors.base.tree.read_tree_records (JSON lines).
+        Parameters:
+            records (Iterable[Sequence]): (key, parent key, position, payload),
+                parent key None is a top node of import, position None is the last in order of records,
+                payload is field values of node
+            parent (Any): node or id of node, the imported tree is appended to its children,
+                default None is the top level
+            batch_size (int | None): rows per query, default settings.TREE_BATCH_SIZE
+        Returns:
+            (int): number of created nodes
+        Raise:
+            DoesNotExist: if parent is given, but it is not found
+            ValueError: if a parent key is not found, records have a cycle, or keys do not fit into the field
+        """
+        batch_size = batch_size or settings.TREE_BATCH_SIZE
+        records = {record[0]: record for record in records}
+        if not records:
+            return 0
+
+        children = {}
+        for order, (key, parent_key, position, payload) in enumerate(records.values()):
+            if parent_key is not None and parent_key not in records:
+                raise ValueError(f"Parent is not found: {parent_key}")
+            children.setdefault(parent_key, []).append((position is None, position, order, key))
+        children = {parent_key: [item[-1] for item in sorted(siblings)] for parent_key, siblings in children.items()}
+
+        gap = cls.tree_key_gap
+        size = len(records)
+        with transaction.atomic():
+            if parent is not None:
+                parent = cls.objects.select_for_update().get(pk=getattr(parent, "pk", parent))
+            parent_id = parent.pk if parent else None
+            siblings = cls.objects.filter(Q(parent_id=parent_id) if parent else Q(parent__isnull=True))
+            count = siblings.count()
+            if parent:
+                lo = siblings.aggregate(Max("right", default=None))["right__max"] or parent.left
+                hi = parent.right
+            else:
+                lo, hi = cls.objects.aggregate(Max("right", default=0))["right__max"], None
+
+            # One shift of keys right of the place, if there is no room for the imported tree
+            key_max = cls.get_tree_key_max()
+            shift = lo + (2 * size + 1) * gap - hi if hi is not None else 0
+            if shift > 0:
+                if cls.objects.aggregate(Max("right", default=0))["right__max"] + shift > key_max:
+                    raise ValueError(f"Keys of imported tree do not fit into {key_max} (use WideTreeMixin)")
+                cls.objects.filter(right__gte=hi).update(
+                    left=Case(
+                        When(left__gte=hi, then=F("left") + shift),
+                        default=F("left"),
+                        output_field=cls._meta.get_field("left"),
+                    ),
+                    right=F("right") + shift,
+                )
+                step = gap
+            else:
+                step = get_sparse_step(lo, hi, size=size, gap=gap, max_key=key_max)
+                if step is None:
+                    raise ValueError(f"Keys of imported tree do not fit into {key_max} (use WideTreeMixin)")
+
+            layout = get_tree_layout(
+                children,
+                children.get(None, []),
+                start=lo + step,
+                step=step,
+                level=parent.level + 1 if parent else 1,
+            )
+            if len(layout) < size:
+                raise ValueError(f"Records have a cycle: {sorted(set(records) - set(layout), key=str)[:10]}")
+
+            levels = {}
+            for key, keys in layout.items():
+                levels.setdefault(keys.level, []).append(key)
+
+            ids = {None: parent_id}
+            for level in sorted(levels):
+                nodes = []
+                for key in levels[level]:
+                    keys = layout[key]
+                    nodes.append(cls(
+                        **records[key][3],
+                        parent_id=ids[records[key][1]],
+                        left=keys.left,
+                        right=keys.right,
+                        level=level,
+                        position=keys.position + count if records[key][1] is None else keys.position,
+                    ))
+                cls.objects.bulk_create(nodes, batch_size=batch_size)
+
+                # A database without returning of ids on bulk insert: ids are found by unique left keys
+                if any(node.pk is None for node in nodes):
+                    for chunk in batched(nodes, batch_size):
+                        found = dict(cls.objects.filter(left__in=[node.left for node in chunk]).values_list("left", "id"))
+                        for node in chunk:
+                            node.pk = found[node.left]
+                ids.update((key, node.pk) for key, node in zip(levels[level], nodes))
+
+            transaction.on_commit(cls._bump_tree_version)
+        return size
+
+    @classmethod
+    def get_tree_errors(cls) -> List[Tuple[Any, str]]:
+        """
+        Get errors of tree keys by one streaming pass over nodes ordered by left (linear time).
+        ----------------------------------------------------------------------------------------
+        Returns:
+            (list[tuple[Any, str]]): id of offending node and error message
+        """
+        rows = (
+            cls.objects.order_by("left")
+            .values_list("id", "parent_id", "left", "right", "level")
+            .iterator(chunk_size=settings.TREE_BATCH_SIZE)
+        )
+        return list(check_tree_keys(rows, dense=not cls.is_sparse_tree()))
+
+    @classmethod
+    def check_tree(cls):
+        """Check tree in test (or in a periodic job)"""
+        errors = cls.get_tree_errors()
+        if errors:
+            raise ValueError(f"Tree {cls.__name__} is not valid: {errors}")
 
 
 def get_thumbnail_save_url(instance, filename) -> str:
@@ -650,6 +1268,477 @@ def get_thumbnail_save_url(instance, filename) -> str:
     return f"{instance.get_instance_media_path()}/thumb/{filename}"
 
 
+class WideTreeMixin(TreeMixin):
+    """
+    Nested set mixin with wide keys, for trees over 16383 nodes
+    (keys of TreeMixin are SmallIntegerField, right of the last node is 2 * count of nodes).
+    ---------------------------------------------------------------------------------------
+    An existing table of TreeMixin is converted by operations of
+    app.vendors.base.migration.get_widen_columns_operations (in chunks on PostgreSQL, without a long lock).
+    Attributes:
+        left (BigIntegerField): left node index
+        right (BigIntegerField): right node index
+        position (IntegerField): position node in children set
+    """
+
+    left = models.BigIntegerField(
+        blank=True,
+        null=True,
+    )
+    right = models.BigIntegerField(
+        blank=True,
+        null=True,
+    )
+    position = models.IntegerField(
+        blank=True,
+        null=True,
+    )
+
+    class Meta(TreeMixin.Meta):
+        abstract = True
+
+
+class PathTreeMixin(BaseTreeMixin):
+    """
+    Materialized path tree mixin.
+    ------------------------------
+    Path of node is a chain of segments of positions (zero-padded base 36) from the top node,
+    so lower nodes are a prefix range of path index, and paths are sorted in depth-first order.
+    An insert or a move rewrites paths of the node branch and of branches of next siblings,
+    the rest of tree is not written.
+    Attributes:
+        parent (ForeignKey by self): parent node id
+        path (CharField): materialized path of node
+        level (SmallIntegerField): node level
+        position (SmallIntegerField): position node in children set
+        tree_path_step (int): number of chars in segment of path
+    Properties:
+        with_lower: get self with lower nodes
+        lower: get lower nodes
+        parents: get node parents
+        branch: get branch of node (parents, self and lower nodes)
+    Methods:
+        get_all (class method): get tree nodes
+        get_lower(by_depth: int = 1): get lower nodes by depth
+        get_with_lower(by_depth: int = 1): get self with lower nodes by depth
+        create_tree_node: create node
+        update_tree_node: update node
+        delete_tree_node: delete node
+    Admin:
+        tree_fieldsets: parent, position fieldsets
+    """
+
+    path = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        db_index=True,
+    )
+
+    # Number of chars in segment of path (36 ** 4 - 1 children of node, 63 levels)
+    tree_path_step = 4
+
+    class Meta(BaseTreeMixin.Meta):
+        abstract = True
+
+    @property
+    def with_lower(self):
+        """Get self with lower"""
+        return (
+            type(self)
+            .objects.actual()
+            .filter(path__startswith=self.path)
+            .order_by("path")
+        )
+
+    @property
+    def lower(self):
+        """Get lower"""
+        return (
+            type(self)
+            .objects.actual()
+            .filter(path__startswith=self.path, level__gt=self.level)
+            .order_by("path")
+        )
+
+    @property
+    def parents(self):
+        """Get parents nodes of node"""
+        return (
+            type(self)
+            .objects.actual()
+            .filter(path__in=self._get_path_prefixes())
+            .order_by("path")
+        )
+
+    @property
+    def branch(self):
+        """Get branch of node"""
+        return (
+            type(self)
+            .objects.actual()
+            .filter(Q(path__in=self._get_path_prefixes()) | Q(path__startswith=self.path))
+            .order_by("path")
+        )
+
+    @classmethod
+    def get_all(cls):
+        """Get all tree node"""
+        return cls.objects.actual().order_by("path")
+
+    def get_lower(self, by_depth: int = 1):
+        """Get lower nodes by depth (default depth is 1)"""
+        by_level = self.level + 1 + by_depth
+        return (
+            type(self)
+            .objects.actual()
+            .filter(path__startswith=self.path, level__gt=self.level, level__lt=by_level)
+            .order_by("path")
+        )
+
+    def get_with_lower(self, by_depth: int = 1):
+        """Get self with lower nodes by depth (default depth is 1)"""
+        by_level = self.level + 1 + by_depth
+        return (
+            type(self)
+            .objects.actual()
+            .filter(path__startswith=self.path, level__lt=by_level)
+            .order_by("path")
+        )
+
+    def create_tree_node(self):
+        """Create tree node"""
+        parent = type(self).objects.filter(pk=self.parent_id).first() if self.parent_id else None
+        index, count = self._get_tree_place(self.parent_id, self.position)
+
+        with transaction.atomic():
+            self._shift_tree_paths(self.parent_id, index + 1, 1)
+
+        self.level = parent.level + 1 if parent else 1
+        self.position = index + 1
+        self.path = self._get_tree_path(parent, self.position)
+
+    def update_tree_node(self):
+        """Update tree node"""
+        node = type(self).objects.filter(pk=self.id).first()
+
+        if node.parent_id == self.parent_id and node.position == self.position:
+            # A tree is not updated
+            return
+
+        parent = type(self).objects.filter(pk=self.parent_id).first() if self.parent_id else None
+        if parent and parent.path.startswith(node.path):
+            raise ValueError("A node can not be moved into own branch")
+
+        # The branch is kept under a temporary path, which is not a prefix of any path
+        temp_path = f"~{node.pk}~"
+        with transaction.atomic():
+            self._replace_tree_path(node.path, temp_path)
+            if node.position:
+                # Close the place of node in old children
+                self._shift_tree_paths(node.parent_id, node.position + 1, -1, exclude_id=node.id)
+
+            # Paths of upper nodes might be changed by the shift
+            parent = type(self).objects.filter(pk=self.parent_id).first() if self.parent_id else None
+            index, count = self._get_tree_place(self.parent_id, self.position, exclude_id=node.id)
+            self._shift_tree_paths(self.parent_id, index + 1, 1, exclude_id=node.id)
+
+            self.level = parent.level + 1 if parent else 1
+            self.position = index + 1
+            self.path = self._get_tree_path(parent, self.position)
+            self._replace_tree_path(temp_path, self.path, level_offset=self.level - node.level)
+
+    def delete_tree_node(self):
+        """Delete tree node"""
+        with transaction.atomic():
+            type(self).objects.filter(path__startswith=self.path).delete()
+            if self.position:
+                self._shift_tree_paths(self.parent_id, self.position + 1, -1)
+        transaction.on_commit(type(self)._bump_tree_version)
+
+    def _get_path_prefixes(self) -> List[str]:
+        """Get paths of parents nodes of node (with node)"""
+        step = type(self).tree_path_step
+        return [self.path[:end] for end in range(step, len(self.path) + 1, step)]
+
+    def _get_tree_path(self, parent, position: int) -> str:
+        """Get path of node by parent and position"""
+        prefix = parent.path if parent else ""
+        return prefix + get_path_segment(position, type(self).tree_path_step)
+
+    def _replace_tree_path(self, old_path: str, new_path: str, level_offset: int = 0) -> int:
+        """Replace prefix of paths of branch, and shift levels of branch by offset"""
+        values = {"path": Concat(Value(new_path), Substr("path", len(old_path) + 1))}
+        if level_offset:
+            values["level"] = F("level") + level_offset
+        return type(self).objects.filter(path__startswith=old_path).update(**values)
+
+    def _shift_tree_paths(self, parent_id: Any, from_position: int, offset: int, exclude_id: Any = None) -> None:
+        """Shift positions (and paths of branches) of children of parent, from position by offset"""
+        parent_q = Q(parent_id=parent_id) if parent_id else Q(parent__isnull=True)
+        siblings = type(self).objects.filter(parent_q, position__gte=from_position)
+        if exclude_id is not None:
+            siblings = siblings.exclude(pk=exclude_id)
+        siblings = list(siblings.order_by("position").values_list("path", "position"))
+        if offset > 0:
+            # The last sibling is moved first, so a new path is always free
+            siblings.reverse()
+
+        step = type(self).tree_path_step
+        for path, position in siblings:
+            self._replace_tree_path(path, path[:-step] + get_path_segment(position + offset, step))
+        self._shift_tree_positions(parent_id, from_position, offset, exclude_id=exclude_id)
+
+
+class TreeClosureMixin(models.Model):
+    """
+    Closure table mixin, a row is a link of tree node (descendant) with every upper node
+    (ancestor) and with self. The concrete model defines foreign keys to the tree model:
+    ancestor (related_name "descendant_links") and descendant (related_name "ancestor_links"),
+    with on_delete CASCADE.
+    ------------------------------------------------------------------------------------------
+    Attributes:
+        depth (SmallIntegerField): distance from ancestor to descendant, 0 for self link
+    """
+
+    depth = models.SmallIntegerField(
+        default=0,
+    )
+
+    class Meta:
+        abstract = True
+
+
+class ClosureTreeIterable(ModelIterable):
+    """
+    Iterable of nodes of closure tree in depth-first order (as nested set and materialized path).
+    -----------------------------------------------------------------------------------------------
+    Nodes are sorted in process by positions of their upper nodes from the top,
+    which are got by one query of links per batch of nodes.
+    """
+
+    def __iter__(self):
+        nodes = list(super().__iter__())
+        if len(nodes) < 2:
+            yield from nodes
+            return
+
+        paths = {}
+        closure_model = self.queryset.model.get_closure_model()
+        for ids in batched([node.pk for node in nodes], settings.TREE_BATCH_SIZE):
+            links = (
+                closure_model.objects.filter(descendant_id__in=ids)
+                .order_by("-depth")
+                .values_list("descendant_id", "ancestor__position", "ancestor_id")
+            )
+            for descendant_id, position, ancestor_id in links:
+                paths.setdefault(descendant_id, []).append((position or 0, ancestor_id))
+        yield from sorted(nodes, key=lambda node: paths.get(node.pk, []))
+
+
+class ClosureTreeMixin(BaseTreeMixin):
+    """
+    Closure table tree mixin.
+    --------------------------
+    Links of nodes with every upper node are rows of closure model (TreeClosureMixin),
+    so lower and upper nodes are got by one index lookup of closure table.
+    Nodes are got in depth-first order (ClosureTreeIterable), the order of nested set and materialized path.
+    Links of a new node are created on save.
+    Attributes:
+        parent (ForeignKey by self): parent node id
+        level (SmallIntegerField): node level
+        position (SmallIntegerField): position node in children set
+        tree_closure_model (type | str): closure model or "<app_label>.<ModelName>"
+    Properties:
+        with_lower: get self with lower nodes
+        lower: get lower nodes
+        parents: get node parents
+        branch: get branch of node (parents, self and lower nodes)
+    Methods:
+        get_all (class method): get tree nodes
+        get_closure_model (class method): get closure model
+        get_lower(by_depth: int = 1): get lower nodes by depth
+        get_with_lower(by_depth: int = 1): get self with lower nodes by depth
+        create_tree_node: create node
+        update_tree_node: update node
+        delete_tree_node: delete node
+    Admin:
+        tree_fieldsets: parent, position fieldsets
+    """
+
+    tree_closure_model = None
+
+    class Meta(BaseTreeMixin.Meta):
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        """Save node, and create links of new node"""
+        is_new = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                self._create_tree_links()
+
+    @property
+    def with_lower(self):
+        """Get self with lower"""
+        return self.get_with_lower(by_depth=None)
+
+    @property
+    def lower(self):
+        """Get lower"""
+        return self.get_lower(by_depth=None)
+
+    @property
+    def parents(self):
+        """Get parents nodes of node"""
+        return (
+            type(self)
+            .objects.actual()
+            .filter(pk__in=self._get_tree_links(descendant_id=self.pk).values("ancestor_id"))
+            .order_by("level")
+        )
+
+    @property
+    def branch(self):
+        """Get branch of node"""
+        ancestors = self._get_tree_links(descendant_id=self.pk).values("ancestor_id")
+        descendants = self._get_tree_links(ancestor_id=self.pk).values("descendant_id")
+        return type(self)._get_depth_first(
+            type(self).objects.actual().filter(Q(pk__in=ancestors) | Q(pk__in=descendants))
+        )
+
+    @classmethod
+    def get_all(cls):
+        """Get all tree node"""
+        return cls._get_depth_first(cls.objects.actual())
+
+    @classmethod
+    def get_closure_model(cls) -> type:
+        """Get closure model"""
+        if isinstance(cls.tree_closure_model, str):
+            return apps.get_model(cls.tree_closure_model)
+        return cls.tree_closure_model
+
+    @classmethod
+    def _get_depth_first(cls, queryset):
+        """Get queryset of nodes in depth-first order (ClosureTreeIterable)"""
+        queryset = queryset._chain()
+        queryset._iterable_class = ClosureTreeIterable
+        return queryset
+
+    def get_lower(self, by_depth: int | None = 1):
+        """Get lower nodes by depth (default depth is 1, None is all lower nodes)"""
+        links = self._get_tree_links(ancestor_id=self.pk, depth__gt=0)
+        if by_depth is not None:
+            links = links.filter(depth__lte=by_depth)
+        return type(self)._get_depth_first(
+            type(self).objects.actual().filter(pk__in=links.values("descendant_id"))
+        )
+
+    def get_with_lower(self, by_depth: int | None = 1):
+        """Get self with lower nodes by depth (default depth is 1, None is all lower nodes)"""
+        links = self._get_tree_links(ancestor_id=self.pk)
+        if by_depth is not None:
+            links = links.filter(depth__lte=by_depth)
+        return type(self)._get_depth_first(
+            type(self).objects.actual().filter(pk__in=links.values("descendant_id"))
+        )
+
+    def create_tree_node(self):
+        """Create tree node"""
+        parent = type(self).objects.filter(pk=self.parent_id).first() if self.parent_id else None
+        index, count = self._get_tree_place(self.parent_id, self.position)
+        if index < count:
+            self._shift_tree_positions(self.parent_id, index + 1, 1)
+
+        self.level = parent.level + 1 if parent else 1
+        self.position = index + 1
+
+    def update_tree_node(self):
+        """Update tree node"""
+        node = type(self).objects.filter(pk=self.id).first()
+
+        if node.parent_id == self.parent_id and node.position == self.position:
+            # A tree is not updated
+            return
+
+        parent = type(self).objects.filter(pk=self.parent_id).first() if self.parent_id else None
+        if parent and self._get_tree_links(ancestor_id=node.id, descendant_id=parent.id).exists():
+            raise ValueError("A node can not be moved into own branch")
+
+        with transaction.atomic():
+            if node.position:
+                # Close the place of node in old children
+                self._shift_tree_positions(node.parent_id, node.position + 1, -1, exclude_id=node.id)
+            index, count = self._get_tree_place(self.parent_id, self.position, exclude_id=node.id)
+            if index < count:
+                self._shift_tree_positions(self.parent_id, index + 1, 1, exclude_id=node.id)
+
+            if node.parent_id != self.parent_id:
+                self._move_tree_links(node, parent)
+
+        self.level = parent.level + 1 if parent else 1
+        self.position = index + 1
+
+    def delete_tree_node(self):
+        """Delete tree node"""
+        # Ids are got before delete, a subquery of a deleted table is not supported by every database
+        ids = list(self._get_tree_links(ancestor_id=self.pk).values_list("descendant_id", flat=True))
+        with transaction.atomic():
+            type(self).objects.filter(pk__in=ids).delete()
+            if self.position:
+                self._shift_tree_positions(self.parent_id, self.position + 1, -1)
+        transaction.on_commit(type(self)._bump_tree_version)
+
+    def _get_tree_links(self, **filters):
+        """Get links of closure model by filters"""
+        return type(self).get_closure_model().objects.filter(**filters)
+
+    def _create_tree_links(self) -> None:
+        """Create links of new node: with self and with every upper node"""
+        closure_model = type(self).get_closure_model()
+        links = [closure_model(ancestor_id=self.pk, descendant_id=self.pk, depth=0)]
+        if self.parent_id:
+            links += [
+                closure_model(ancestor_id=ancestor_id, descendant_id=self.pk, depth=depth + 1)
+                for ancestor_id, depth in self._get_tree_links(descendant_id=self.parent_id)
+                .values_list("ancestor_id", "depth")
+            ]
+        closure_model.objects.bulk_create(links, batch_size=settings.TREE_BATCH_SIZE)
+
+    def _move_tree_links(self, node, parent) -> None:
+        """Replace links of branch of node with old upper nodes by links with new upper nodes"""
+        closure_model = type(self).get_closure_model()
+        lower = list(self._get_tree_links(ancestor_id=node.id).values_list("descendant_id", "depth"))
+        lower_ids = [descendant_id for descendant_id, _ in lower]
+        upper_ids = list(
+            self._get_tree_links(descendant_id=node.id, depth__gt=0).values_list("ancestor_id", flat=True)
+        )
+        for ids in batched(lower_ids, settings.TREE_BATCH_SIZE):
+            closure_model.objects.filter(descendant_id__in=ids, ancestor_id__in=upper_ids).delete()
+
+        if parent:
+            uppers = list(self._get_tree_links(descendant_id=parent.id).values_list("ancestor_id", "depth"))
+            closure_model.objects.bulk_create(
+                (
+                    closure_model(
+                        ancestor_id=ancestor_id,
+                        descendant_id=descendant_id,
+                        depth=upper_depth + lower_depth + 1,
+                    )
+                    for ancestor_id, upper_depth in uppers
+                    for descendant_id, lower_depth in lower
+                ),
+                batch_size=settings.TREE_BATCH_SIZE,
+            )
+
+        level_offset = (parent.level + 1 if parent else 1) - node.level
+        if level_offset:
+            for ids in batched(lower_ids, settings.TREE_BATCH_SIZE):
+                type(self).objects.filter(pk__in=ids).update(level=F("level") + level_offset)
+
+
 class ThumbMixin(models.Model):
     """
     Thumbnail Mixin. Image file, or svg (html), or None (hidden).
@@ -743,21 +1832,38 @@ class CacheMixin(models.Model):
     """
     Cache mixin.
     ------------
+    Attributes:
+        cache_timeout (int | None): time of freshness of cached value, seconds,
+            default None is settings.CACHE_READ_THROUGH["timeout"]
+        cache_by_language (bool): cached value depends on the current language: the language code is added
+            to keys, values are deleted and warmed up for every language
     Methods:
         get_from_cache (by_key: str, prefix: str, postfix: str, **kwargs):
-            get cache by key, with prefix and postfix
+            get cache by key, with prefix and postfix (set cache if not exist)
             kwargs is parameters for method cache_queryset
         delete_cache (by_key: str, prefix: str, postfix: str):
             delete cache by key with prefix and postfix
+        get_cache_warm_up_kwargs (): get list of parameters of get_from_cache for warm-up
+        warm_cache (force: bool, **kwargs): set cache of parameters of get_from_cache
+        get_cache_tables (): get tables of cache_queryset, generations of which are in keys,
+            so a write of the tables (of models with cache_queries) changes the keys without deletion of cache
     Required:
         In model add class method: cache_queryset(**kwargs) -> queryset for cache
     """
 
+    cache_timeout = None
+    cache_by_language = False
+
     @classmethod
     def get_from_cache(cls, by_key: str = "", prefix: str = "", postfix: str = "", **cache_queryset_kwargs) -> Any:
         """
-        Get result of queryset from cache by key.
-        -----------------------------------------
+        Get result of queryset from cache by key, or set cache if not exist.
+        --------------------------------------------------------------------
+        After time of freshness the stale result is served, while one process sets a new result,
+        None result (e.g. object is not found) is cached for a short time (see get_or_set_cache).
+        Results are kept in the in-process LRU cache (local_cache) in front of the shared cache.
+        Results are encoded by the codec (encode_value), sizes and metrics (cache_metrics)
+        are counted by key without prefix and postfix.
         Parameters:
             by_key (str): cache key, if empty key is class name, default empty str,
             prefix (str): cache key prefix, default empty str
@@ -765,15 +1871,75 @@ class CacheMixin(models.Model):
             **cache_queryset_kwargs: parameters for cache_queryset method
         Methods:
             delete_cache (): delete cache by key
+            delete_cache_of_keys (class method): delete cache of keys
         Returns:
             result from queryset: from class method cache_queryset
         """
-        _by_key = cls._get_cache_key(by_key, prefix, postfix)
-        res = cache.get(_by_key, None)
-        if res is None:
+        _by_key = cls._get_versioned_key(cls._get_cache_key(by_key, prefix, postfix))
+        stats_prefix = cls._get_cache_key(by_key, lang="")
+        time_start = time.perf_counter()
+        res = local_cache.get(_by_key, missing)
+        if res is not missing:
+            cache_metrics.hit(stats_prefix, time.perf_counter() - time_start, local=True)
+            return res
+
+        sizes = []  # size of set value, if the value is set by the process (a miss)
+
+        def get_value():
+            value = encode_value(cls.cache_queryset(**cache_queryset_kwargs), stats_prefix)
+            sizes.append(len(value) if value is not None else 0)
+            return value
+
+        for _ in range(2):
+            res = decode_value(get_or_set_cache(_by_key, get_value, timeout=cls.cache_timeout))
+            if res is not undecodable:
+                break
+            # The value is cached in an unknown format (e.g. by a newer version)
+            delete_cache_entries(_by_key)
+        else:
             res = cls.cache_queryset(**cache_queryset_kwargs)
+        local_cache.set(_by_key, res)
+
+        if sizes:
+            cache_metrics.miss(stats_prefix, time.perf_counter() - time_start)
+            cache_metrics.set(stats_prefix, sizes[-1])
+        else:
+            cache_metrics.hit(stats_prefix, time.perf_counter() - time_start)
         return res
 
+    @classmethod
+    def get_cache_warm_up_kwargs(cls) -> list[dict]:
+        """Get list of parameters of get_from_cache (keys and cache_queryset parameters) for warm-up"""
+        return [{}]
+
+    @classmethod
+    def get_cache_tables(cls) -> list[str]:
+        """Get tables of cache_queryset (of models with cache_queries), generations of which are in cache keys"""
+        return []
+
+    @classmethod
+    def warm_cache(cls, force: bool = False, by_key: str = "", prefix: str = "", postfix: str = "", **kwargs) -> tuple:
+        """
+        Set cache of key (get_from_cache), for warm-up.
+        -----------------------------------------------
+        Parameters:
+            force (bool): set a new value, if the key is cached, default False
+            by_key (str): cache key, if empty key is class name, default empty str,
+            prefix (str): cache key prefix, default empty str
+            postfix (str): cache key postfix, default empty str
+            **kwargs: parameters for cache_queryset method
+        Returns:
+            (tuple[str, int]): cache key, size of cached value in bytes
+        """
+        _by_key = cls._get_versioned_key(cls._get_cache_key(by_key, prefix, postfix))
+        if force:
+            delete_cache_entries(_by_key)
+            local_cache.delete(_by_key)
+        cls.get_from_cache(by_key, prefix, postfix, **kwargs)
+        value = get_cache_entry(_by_key)
+        size = len(value) if isinstance(value, bytes) else 0
+        return _by_key, size
+
     def delete_cache(self, by_key: str = "", prefix: str = "", postfix: str = "") -> None:
         """
         Parameters:
@@ -783,14 +1949,40 @@ class CacheMixin(models.Model):
         Returns:
             _
         """
-        _by_key = type(self)._get_cache_key(by_key, prefix, postfix)
-        cache.delete(_by_key)
+        type(self).delete_cache_of_keys([by_key], prefix, postfix)
+
+    @classmethod
+    def delete_cache_of_keys(cls, by_keys: list[str], prefix: str = "", postfix: str = "") -> None:
+        """
+        Delete cache of keys in all languages, with one change of the version of local cache (local_cache).
+        ---------------------------------------------------------------------------------------------------
+        Parameters:
+            by_keys (list[str]): cache keys, an empty key is class name
+            prefix (str): cache key prefix, default empty str
+            postfix (str): cache key postfix, default empty str
+        """
+        langs = settings.LANGUAGES_CODES if cls.cache_by_language else [""]
+        keys = [
+            cls._get_versioned_key(cls._get_cache_key(by_key, prefix, postfix, lang=lang))
+            for by_key in by_keys
+            for lang in langs
+        ]
+        delete_cache_entries(*keys)
+        local_cache.delete_many(keys)
+        for by_key in by_keys:
+            cache_metrics.delete(cls._get_cache_key(by_key, lang=""))
 
     class Meta:
         abstract = True
 
     @classmethod
-    def _get_cache_key(cls, by_key: str | None = None, prefix: str | None = None, postfix: str | None = None) -> str:
+    def _get_cache_key(
+        cls,
+        by_key: str | None = None,
+        prefix: str | None = None,
+        postfix: str | None = None,
+        lang: str | None = None,
+    ) -> str:
         """
         Get cache key. if by_key is empty, key is class name.
         -----------------------------------------------------
@@ -798,10 +1990,22 @@ class CacheMixin(models.Model):
             by_key (str): cache key, if empty key is class name, default empty str,
             prefix (str): cache key prefix, default empty str
             postfix (str): cache key postfix, default empty str
+            lang (str | None): language code of key (if cache_by_language), default None is the current language,
+                empty str is a key without language
         Returns:
-            (str): prefix + _ + cache_key + _ + postfix
+            (str): prefix + _ + cache_key + _ + postfix (+ _ + language code, if cache_by_language)
         """
         _by_key = by_key or cls.__name__.upper()
         _prefix = f"{prefix}_" if prefix else ""
         _postfix = f"_{postfix}" if postfix else ""
-        return f"{_prefix}{_by_key}{_postfix}"
\ No newline at end of file
+        if cls.cache_by_language and lang != "":
+            _postfix = f"{_postfix}_{lang or get_language() or settings.LANGUAGE_CODE}"
+        return f"{_prefix}{_by_key}{_postfix}"
+
+    @classmethod
+    def _get_versioned_key(cls, key: str) -> str:
+        """Get cache key with generations of tables of cache_queryset (get_cache_tables)"""
+        tables = cls.get_cache_tables()
+        if not tables:
+            return key
+        return "_".join([key, *get_table_generations(tables, local=True)])
\ No newline at end of file
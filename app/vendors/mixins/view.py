@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.urls import reverse_lazy
+from asgiref.sync import async_to_sync
 from app.vendors.base.context import ContexData
 from django.views.generic.base import ContextMixin
 from django.contrib.auth.mixins import (
@@ -14,13 +15,22 @@ from typing import (
 _context: ContexData[str, Callable] = ContexData({})
 
 
+def register_context_provider(key: str, provider: Callable, lazy: bool = False, **options: Any) -> None:
+    """
+    Register provider of common context data of views (ContextDataMixin), options of ContexData.register.
+    A lazy provider (lazy=True) runs on first access to the value in a template (or view), not for every view.
+    """
+    _context.register(key, provider, lazy=lazy, **options)
+
+
 class ContextDataMixin(ContextMixin):
     """
     Get common data mixin
     Attributes:
         company (Any | dict | None): company data
     Methods:
-        get_context_data: get dict of context with common data from apps
+        get_context_data: get dict of context with common data from apps (providers run once per request and kwargs,
+            concurrently, if settings.CONTEXT_PROVIDERS["concurrent"])
     """
     company: Any | None = None  # company instance, default company dict from settings or None
 
@@ -28,7 +38,11 @@ class ContextDataMixin(ContextMixin):
         """Get common context data"""
         kwargs["request_path"] = self.request.path
         context = super().get_context_data(**kwargs)
-        context = {**context, **_context.get_data(**kwargs)}
+        if settings.CONTEXT_PROVIDERS["concurrent"]:
+            data = async_to_sync(_context.aget_data)(self.request, **kwargs)
+        else:
+            data = _context.get_data(self.request, **kwargs)
+        context = {**context, **data}
         self.company = context.get("company", None)
         return context
 
@@ -0,0 +1,99 @@
+import os
+import logging
+from pathlib import Path
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+
+
+task_logger = logging.getLogger("task")
+
+
+def delete_media_on_commit(*paths: str) -> None:
+    """
+    Delete media paths (files or directories, relative to settings.MEDIA_ROOT) in background,
+    after commit of the current transaction (at once, if there is no transaction).
+    """
+    paths = [str(path) for path in paths if path]
+    if paths:
+        # robust: an error of sending does not break the response and the next on_commit callbacks
+        transaction.on_commit(lambda: _send_media_deletion(paths), robust=True)
+
+
+def _send_media_deletion(paths: list[str]) -> None:
+    """Send the task of deletion of media paths, an error of broker is logged (paths are left for clean_media)"""
+    try:
+        delete_media_paths.delay(paths)
+    except Exception as exc:
+        task_logger.error(f"Media deletion: sending of {paths} is failed: {exc.__class__.__name__}: {exc}")
+
+
+@shared_task(
+    bind=True,
+    autoretry_for=(OSError,),
+    retry_backoff=True,
+    max_retries=settings.MEDIA_DELETION["max_retries"],
+)
+def delete_media_paths(self, paths: list[str]) -> int:
+    """
+    Delete media paths (relative to settings.MEDIA_ROOT), by batches of files.
+    ---------------------------------------------------------------------------
+    At most settings.MEDIA_DELETION["batch_size"] files are deleted by a run, the task is sent again
+    for the rest of paths, so a worker is not blocked by a large tree. Paths out of MEDIA_ROOT are skipped.
+    Parameters:
+        paths (list[str]): paths of files or directories, relative to settings.MEDIA_ROOT
+    Returns:
+        (int): number of deleted files
+    """
+    batch_size = settings.MEDIA_DELETION["batch_size"]
+    deleted = 0
+    rest = []
+    for path in paths:
+        full_path = get_media_path(path)
+        if full_path is None:
+            task_logger.error(f"Media deletion: path {path} is out of MEDIA_ROOT")
+            continue
+        if deleted >= batch_size:
+            rest.append(path)
+            continue
+        deleted, is_done = _delete_tree(full_path, deleted, batch_size)
+        if not is_done:
+            rest.append(path)
+
+    if rest:
+        self.apply_async(args=[rest])
+    task_logger.info(f"Media deletion: {deleted} files deleted, {len(rest)} paths left")
+    return deleted
+
+
+def get_media_path(path: str) -> Path | None:
+    """Get absolute path in settings.MEDIA_ROOT, or None if path is out of it"""
+    media_root = Path(settings.MEDIA_ROOT).resolve()
+    full_path = (media_root / path).resolve()
+    if full_path == media_root or not full_path.is_relative_to(media_root):
+        return None
+    return full_path
+
+
+def _delete_tree(path: Path, deleted: int, batch_size: int) -> tuple[int, bool]:
+    """Delete files and empty directories of path, until deleted is batch_size: (deleted, path is deleted)"""
+    if not path.is_dir():
+        if path.exists() or path.is_symlink():
+            path.unlink(missing_ok=True)
+            deleted += 1
+        return deleted, True
+
+    for root, dirs, files in os.walk(path, topdown=False):
+        for name in files:
+            if deleted >= batch_size:
+                return deleted, False
+            Path(root, name).unlink(missing_ok=True)
+            deleted += 1
+        for name in dirs:
+            dir_path = Path(root, name)
+            if dir_path.is_symlink():
+                dir_path.unlink(missing_ok=True)
+            else:
+                dir_path.rmdir()
+    path.rmdir()
+    return deleted, True
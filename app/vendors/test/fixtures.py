@@ -104,6 +104,23 @@ def doc_file_docx():
     return SimpleUploadedFile("test.docx", content_docx, content_type=_content_type)
 
 
+@pytest.fixture
+def locmem_cache(settings):
+    """Set in-memory caches (default and shared) for a test, clear the in-process cache"""
+    from django.core.cache import cache
+    from app.vendors.base.cache import local_cache
+
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "test-default"},
+        "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "test-shared"},
+    }
+    cache.clear()
+    local_cache.clear()
+    yield cache
+    cache.clear()
+    local_cache.clear()
+
+
 @pytest.fixture(autouse=True)
 def set_test_media_root():
     """Set settings.MEDIA_ROOT before each tests"""
@@ -0,0 +1,109 @@
+import os
+import time
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.utils import translation
+from app.vendors.mixins.model import CacheMixin
+
+
+app_logger = logging.getLogger("app")
+
+# Id of process, which has started warm-up of cache (start_process_cache_warm_up)
+_warm_up_pid = None
+_warm_up_lock = threading.Lock()
+
+# Result of warm-up of a cache key: model label, language (None if the key does not depend on it),
+# cache key, time of setting in seconds, size of cached value in bytes, error message
+WarmUpResult = namedtuple("WarmUpResult", ["model", "lang", "key", "seconds", "size", "error"])
+
+
+def get_cache_models() -> list[type[CacheMixin]]:
+    """Get models with cache_queryset (CacheMixin)"""
+    return [model for model in apps.get_models() if issubclass(model, CacheMixin)]
+
+
+def warm_up_cache(
+    models: list[type[CacheMixin]] | None = None,
+    workers: int | None = None,
+    force: bool = False,
+) -> list[WarmUpResult]:
+    """
+    Set cache of models with cache_queryset (CacheMixin) for every key of warm-up, in parallel.
+    -------------------------------------------------------------------------------------------
+    Keys are got by get_cache_warm_up_kwargs of model, keys of models with cache_by_language
+    are set for every language of settings.LANGUAGES_CODES.
+    Parameters:
+        models (list[type[CacheMixin]] | None): models, default all models with CacheMixin
+        workers (int | None): number of threads, default settings.CACHE_WARM_UP["workers"]
+        force (bool): set new values of cached keys, default False
+    Returns:
+        (list[WarmUpResult]): results of keys
+    """
+    models = get_cache_models() if models is None else models
+    workers = workers or settings.CACHE_WARM_UP["workers"]
+    tasks = []
+    for model in models:
+        langs = settings.LANGUAGES_CODES if model.cache_by_language else [None]
+        for kwargs in model.get_cache_warm_up_kwargs():
+            tasks.extend((model, lang, kwargs) for lang in langs)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda task: _warm_cache(*task, force=force), tasks))
+
+
+def start_cache_warm_up() -> threading.Thread:
+    """Start warm-up of cache (warm_up_cache) in a background thread, the results are logged"""
+    thread = threading.Thread(target=_log_cache_warm_up, daemon=True)
+    thread.start()
+    return thread
+
+
+def start_process_cache_warm_up(**kwargs) -> threading.Thread | None:
+    """
+    Start warm-up of cache (start_cache_warm_up) once per process.
+    ----------------------------------------------------------------
+    It is a receiver of request_started (settings.CACHE_WARM_UP["on_startup"]), so the cache is warmed up
+    by every server process (e.g. a worker after fork) on its first request, not by management commands,
+    and it can be called by a post-fork hook of a server.
+    Returns:
+        (threading.Thread | None): thread of warm-up, None if it is started before
+    """
+    global _warm_up_pid
+    with _warm_up_lock:
+        if _warm_up_pid == os.getpid():
+            return None
+        _warm_up_pid = os.getpid()
+    return start_cache_warm_up()
+
+
+def _warm_cache(model: type[CacheMixin], lang: str | None, kwargs: dict, force: bool) -> WarmUpResult:
+    """Set cache of model by parameters of get_from_cache, in language"""
+    time_start = time.perf_counter()
+    key, size, error = "", 0, ""
+    try:
+        with translation.override(lang):
+            key, size = model.warm_cache(force=force, **kwargs)
+    except Exception as exc:
+        error = f"{exc.__class__.__name__}: {exc}"
+    finally:
+        # Connections are opened per thread
+        connections.close_all()
+    return WarmUpResult(model._meta.label, lang, key, time.perf_counter() - time_start, size, error)
+
+
+def _log_cache_warm_up() -> None:
+    """Warm up cache and log the results"""
+    time_start = time.perf_counter()
+    results = warm_up_cache()
+    for result in results:
+        if result.error:
+            app_logger.error(f"Cache warm-up: {result.model} {result.key}: {result.error}")
+    app_logger.info(
+        f"Cache warm-up: {len(results)} keys, {sum(result.size for result in results)} bytes, "
+        f"{time.perf_counter() - time_start:.3f} s"
+    )
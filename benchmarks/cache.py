@@ -0,0 +1,103 @@
+"""
+Benchmark of cache backends: FileBasedCache, LocMemCache, ShardedFileCache and MmapCache (app.vendors.caches).
+-------------------------------------------------------------------------------------------------------------
+Measured: mean time of set and get of a read-mostly value (like company settings), in microseconds,
+and gets per second of processes reading the same keys together (prefork workers).
+LocMemCache is a cache per process, so its readers do not share values (every worker sets its own copy).
+Run:
+    python -m benchmarks.cache --keys 100 --gets 20000 --processes 4
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+from statistics import mean
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+import django
+from django.conf import settings
+
+settings.LOGGING_CONFIG = None
+django.setup()
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.filebased import FileBasedCache
+from app.vendors.caches import (
+    MmapCache,
+    ShardedFileCache,
+)
+
+
+def get_backends(directory: str) -> dict:
+    """Get cache backends by name"""
+    return {
+        "file": lambda: FileBasedCache(os.path.join(directory, "file"), {"OPTIONS": {"MAX_ENTRIES": 100_000}}),
+        "sharded": lambda: ShardedFileCache(os.path.join(directory, "sharded"), {"OPTIONS": {"MAX_ENTRIES": 100_000}}),
+        "locmem": lambda: LocMemCache("benchmark", {"OPTIONS": {"MAX_ENTRIES": 100_000}}),
+        "mmap": lambda: MmapCache(os.path.join(directory, "mmap.cache"), {}),
+    }
+
+
+def get_value(i: int) -> dict:
+    """Get value like company settings"""
+    return {
+        "alias": f"company-{i}",
+        "settings": {f"key_{j}": {"value": j, "title": f"Title {j}"} for j in range(30)},
+        "langs": ["en", "de", "fr", "es"],
+    }
+
+
+def read(args: tuple) -> int:
+    """Get number of gets of process in seconds"""
+    name, directory, keys, seconds = args
+    backend = get_backends(directory)[name]()
+    rng = random.Random(os.getpid())
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        if backend.get(rng.choice(keys)) is None:
+            backend.set(rng.choice(keys), get_value(0))
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache backends: file, sharded file, locmem, mmap")
+    parser.add_argument("--keys", type=int, default=100)
+    parser.add_argument("--gets", type=int, default=20_000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    keys = [f"KEY_{i}" for i in range(args.keys)]
+    print(f"{'backend':>8} {'set, us':>10} {'get, us':>10} {f'gets/s x {args.processes}':>16}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, factory in get_backends(directory).items():
+            backend = factory()
+            sets = []
+            for i, key in enumerate(keys):
+                value = get_value(i)
+                time_start = time.perf_counter()
+                backend.set(key, value)
+                sets.append((time.perf_counter() - time_start) * 1_000_000)
+
+            rng = random.Random(1)
+            gets = []
+            for _ in range(args.gets):
+                key = rng.choice(keys)
+                time_start = time.perf_counter()
+                backend.get(key)
+                gets.append((time.perf_counter() - time_start) * 1_000_000)
+
+            context = multiprocessing.get_context("fork")
+            with context.Pool(args.processes) as pool:
+                counts = pool.map(read, [(name, directory, keys, args.seconds)] * args.processes)
+            throughput = sum(counts) / args.seconds
+            print(f"{name:>8} {mean(sets):>10.1f} {mean(gets):>10.1f} {throughput:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
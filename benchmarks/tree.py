@@ -0,0 +1,109 @@
+"""
+Benchmark of inserts into a nested set tree: dense keys vs sparse (gap-based) keys.
+-----------------------------------------------------------------------------------
+The trees are models of TreeMixin (keys of WideTreeMixin, so large trees fit into the field)
+in an in-memory SQLite database, a random tree is created by import_tree, then nodes are inserted
+as last children of random nodes by create_tree_node and save, as the views do.
+Measured: rows written by an insert (inserted rows and rowcount of UPDATE queries), number of inserts
+that renumber keys (more than one row is written) and mean time of insert.
+Dense: the new row, the rows right of the insert point and the parent branch.
+Sparse: the new row, or the renumbered nearest upper branch (the whole tree at the top level) when the gap is exhausted.
+Run:
+    python -m benchmarks.tree --sizes 1000 10000 100000 --inserts 200 --gap 64
+    python -m benchmarks.tree --sizes 1000 10000 --gap 2
+"""
+import os
+import time
+import random
+import argparse
+from statistics import mean
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+import django
+from django.conf import settings
+
+settings.DATABASES["default"]["NAME"] = ":memory:"
+settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+settings.LOGGING_CONFIG = None
+django.setup()
+
+from django.db import connection
+from app.vendors.base.model import BaseModel
+from app.vendors.mixins.model import WideTreeMixin
+from benchmarks.tree_storage import create_model
+
+
+_payload = {"is_valid": True, "is_blocked": False}
+
+
+class RowCounter:
+    """Execute wrapper of connection, it counts rows written by INSERT and UPDATE queries"""
+
+    def __init__(self):
+        self.rows = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        statement = sql.lstrip()[:6].upper()
+        if statement == "INSERT":
+            # rowcount of INSERT ... RETURNING is not known before the rows are fetched
+            self.rows += len(params) if many else 1
+        elif statement == "UPDATE":
+            self.rows += max(context["cursor"].rowcount, 0)
+        return result
+
+
+def get_percentile(values: list[int], percent: int) -> int:
+    """Get percentile of values"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, len(ordered) * percent // 100)]
+
+
+def get_random_records(size: int, rng: random.Random) -> list[tuple]:
+    """Get import records of random tree, the parent of node is one of previous nodes"""
+    return [
+        (key, rng.randrange(key) if key and rng.random() > 0.001 else None, None, _payload)
+        for key in range(size)
+    ]
+
+
+def insert(model: type, parent_id: int, counter: RowCounter) -> tuple[int, float]:
+    """Insert last child of parent, get rows written and time of insert, ms"""
+    rows = counter.rows
+    time_start = time.perf_counter()
+    node = model(parent_id=parent_id, **_payload)
+    node.create_tree_node()
+    node.save()
+    return counter.rows - rows, (time.perf_counter() - time_start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inserts into nested set, dense vs sparse keys")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--inserts", type=int, default=200)
+    parser.add_argument("--gap", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'nodes':>10} {'mode':>8} {'mean rows':>12} {'p99 rows':>10} {'max rows':>10} {'renumbers':>10} {'insert, ms':>11}")
+    for size in args.sizes:
+        for mode, gap in (("dense", 1), (f"gap {args.gap}", args.gap)):
+            model = create_model(f"BenchNode{gap}x{size}", (WideTreeMixin, BaseModel), tree_key_gap=gap)
+            rng = random.Random(args.seed)
+            model.import_tree(get_random_records(size, rng))
+            ids = list(model.objects.values_list("id", flat=True))
+
+            counter = RowCounter()
+            with connection.execute_wrapper(counter):
+                results = [insert(model, rng.choice(ids), counter) for _ in range(args.inserts)]
+            written = [rows for rows, _ in results]
+            renumbers = sum(1 for rows in written if rows > 1) if gap > 1 else "-"
+            print(
+                f"{size:>10} {mode:>8} {mean(written):>12.1f} {get_percentile(written, 99):>10}"
+                f" {max(written):>10} {renumbers:>10} {mean(elapsed for _, elapsed in results):>11.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
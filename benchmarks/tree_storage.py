@@ -0,0 +1,139 @@
+"""
+Benchmark of tree storages: nested set (dense and sparse keys), materialized path and closure table.
+----------------------------------------------------------------------------------------------------
+Every storage is a model with the same API (create_tree_node, update_tree_node, lower, parents),
+the models are created in an in-memory SQLite database, so the numbers compare queries of storages,
+not a network or a database server.
+Measured (mean time of operation, ms): insert of a last child of a random node, move of a node
+to a random parent, read of lower nodes and read of parents nodes of a random node.
+Run:
+    python -m benchmarks.tree_storage --size 2000 --moves 200 --reads 500
+"""
+import os
+import time
+import random
+import argparse
+from statistics import mean
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+import django
+from django.conf import settings
+
+settings.DATABASES["default"]["NAME"] = ":memory:"
+settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+settings.LOGGING_CONFIG = None
+django.setup()
+
+from django.db import (
+    models,
+    connection,
+)
+from app.vendors.base.model import BaseModel
+from app.vendors.mixins.model import (
+    TreeMixin,
+    PathTreeMixin,
+    ClosureTreeMixin,
+    TreeClosureMixin,
+)
+
+
+def create_model(name: str, bases: tuple, **attrs) -> type:
+    """Create model and its table"""
+    attrs.update({
+        "__module__": __name__,
+        "Meta": type("Meta", (), {"app_label": "company"}),
+    })
+    model = type(name, bases, attrs)
+    with connection.schema_editor() as schema_editor:
+        schema_editor.create_model(model)
+    return model
+
+
+def get_models(gap: int) -> dict[str, type]:
+    """Get tree models by name of storage"""
+    closure = create_model("BenchClosureNode", (ClosureTreeMixin, BaseModel), tree_closure_model="company.BenchClosureLink")
+    create_model(
+        "BenchClosureLink",
+        (TreeClosureMixin, models.Model),
+        ancestor=models.ForeignKey(closure, related_name="descendant_links", on_delete=models.CASCADE),
+        descendant=models.ForeignKey(closure, related_name="ancestor_links", on_delete=models.CASCADE),
+    )
+    return {
+        "nested set": create_model("BenchDenseNode", (TreeMixin, BaseModel)),
+        f"gap {gap}": create_model("BenchSparseNode", (TreeMixin, BaseModel), tree_key_gap=gap),
+        "path": create_model("BenchPathNode", (PathTreeMixin, BaseModel)),
+        "closure": closure,
+    }
+
+
+def timed(func, *args) -> float:
+    """Get time of call, ms"""
+    time_start = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - time_start) * 1000
+
+
+def insert(model: type, parent_id: int | None, position: int | None) -> None:
+    """Insert node"""
+    node = model(parent_id=parent_id, position=position, is_valid=True, is_blocked=False)
+    node.create_tree_node()
+    node.save()
+
+
+def move(model: type, node_id: int, parent_id: int | None, position: int | None) -> None:
+    """Move node, a move into own branch is skipped"""
+    if issubclass(model, TreeMixin) and not model.is_sparse_tree():
+        # A dense nested set is moved by the batch API (keys of the whole tree are computed in memory)
+        try:
+            model.move_tree_nodes([(node_id, parent_id, position)])
+        except ValueError:
+            pass
+        return
+
+    node = model.objects.get(pk=node_id)
+    node.parent_id, node.position = parent_id, position
+    try:
+        node.update_tree_node()
+    except ValueError:
+        return
+    node.save()
+
+
+def read_lower(model: type, node_id: int) -> None:
+    """Read lower nodes"""
+    list(model.objects.get(pk=node_id).lower)
+
+
+def read_parents(model: type, node_id: int) -> None:
+    """Read parents nodes"""
+    list(model.objects.get(pk=node_id).parents)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tree storages: nested set, materialized path, closure table")
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--moves", type=int, default=200)
+    parser.add_argument("--reads", type=int, default=500)
+    parser.add_argument("--gap", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'storage':>12} {'insert, ms':>12} {'move, ms':>10} {'lower, ms':>10} {'parents, ms':>12}")
+    for name, model in get_models(args.gap).items():
+        rng = random.Random(args.seed)
+        inserts = [
+            timed(insert, model, rng.randrange(1, i + 1) if i and rng.random() > 0.01 else None, None)
+            for i in range(args.size)
+        ]
+        moves = [
+            timed(move, model, rng.randrange(1, args.size + 1), rng.randrange(1, args.size + 1), rng.choice([None, 1]))
+            for _ in range(args.moves)
+        ]
+        lowers = [timed(read_lower, model, rng.randrange(1, args.size + 1)) for _ in range(args.reads)]
+        parents = [timed(read_parents, model, rng.randrange(1, args.size + 1)) for _ in range(args.reads)]
+        print(f"{name:>12} {mean(inserts):>12.2f} {mean(moves):>10.2f} {mean(lowers):>10.2f} {mean(parents):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
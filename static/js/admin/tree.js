@@ -0,0 +1,120 @@
+function getCookie(name) {
+    let cookieValue = null;
+    if (document.cookie && document.cookie !== '') {
+        const cookies = document.cookie.split(';');
+        for (let i = 0; i < cookies.length; i++) {
+            const cookie = cookies[i].trim();
+            if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                break;
+            }
+        }
+    }
+    return cookieValue;
+}
+
+// Drag and drop of changelist rows by handles (AdminTreeMixin.tree_handle).
+// A row dropped on the upper half of other row is placed before it, on the lower half it is moved into it.
+// Moves are collected and saved by one request of tree-move/ (one transaction for the batch).
+class TreeMoveManager {
+    constructor(options) {
+        this.url = options.url;
+        this.handles = document.querySelectorAll(".tree-handle");
+        this.operations = [];
+        this.dragged = null;
+        this.saveButton = null;
+        this.setup();
+    }
+    setup() {
+        this.handles.forEach(handle => {
+            const row = handle.closest("tr");
+            handle.addEventListener("dragstart", event => {
+                this.dragged = handle;
+                event.dataTransfer.effectAllowed = "move";
+                event.dataTransfer.setData("text/plain", handle.dataset.id);
+            });
+            row.addEventListener("dragover", event => {
+                if (this.dragged && this.dragged !== handle) {
+                    event.preventDefault();
+                }
+            });
+            row.addEventListener("drop", event => {
+                event.preventDefault();
+                if (!this.dragged || this.dragged === handle) {
+                    return;
+                }
+                const rect = row.getBoundingClientRect();
+                if (event.clientY < rect.top + rect.height / 2) {
+                    this.move(this.dragged, handle.dataset.parent, Number(handle.dataset.position) || null);
+                    row.before(this.dragged.closest("tr"));
+                } else {
+                    this.move(this.dragged, handle.dataset.id, null);
+                    this.dragged.closest("tr").classList.add("hidden");
+                }
+                this.dragged = null;
+            });
+        });
+    }
+    move(handle, parent, position) {
+        // Positions of visible rows are changed as on the server: the node leaves old children, then it is inserted
+        const oldParent = handle.dataset.parent;
+        const oldPosition = Number(handle.dataset.position) || null;
+        if (position && oldPosition && parent === oldParent && oldPosition < position) {
+            position -= 1;
+        }
+        this.handles.forEach(item => {
+            const itemPosition = Number(item.dataset.position);
+            if (item === handle || !itemPosition) {
+                return;
+            }
+            if (item.dataset.parent === oldParent && oldPosition && itemPosition > oldPosition) {
+                item.dataset.position = itemPosition - 1;
+            }
+            if (item.dataset.parent === parent && position && Number(item.dataset.position) >= position) {
+                item.dataset.position = Number(item.dataset.position) + 1;
+            }
+        });
+        handle.dataset.parent = parent;
+        handle.dataset.position = position || "";
+        this.operations.push([Number(handle.dataset.id), parent ? Number(parent) : null, position]);
+        this.showSaveButton();
+    }
+    showSaveButton() {
+        if (this.saveButton) {
+            this.saveButton.value = `${this.saveButton.dataset.label} (${this.operations.length})`;
+            return;
+        }
+        this.saveButton = document.createElement("input");
+        this.saveButton.type = "button";
+        this.saveButton.className = "default";
+        this.saveButton.dataset.label = "Save tree";
+        this.saveButton.value = `Save tree (${this.operations.length})`;
+        this.saveButton.addEventListener("click", () => this.save());
+        document.querySelector("#changelist-form").prepend(this.saveButton);
+    }
+    save() {
+        this.saveButton.disabled = true;
+        fetch(this.url, {
+            method: "POST",
+            headers: {"Content-Type": "application/json", "X-CSRFToken": getCookie("csrftoken")},
+            body: JSON.stringify({operations: this.operations}),
+        })
+            .then(response => response.json().then(data => ({ok: response.ok, data: data})))
+            .then(({ok, data}) => {
+                if (!ok) {
+                    throw new Error(data.error);
+                }
+                window.location.reload();
+            })
+            .catch(error => {
+                alert(error.message);
+                window.location.reload();
+            });
+    }
+}
+
+document.addEventListener("DOMContentLoaded", () => {
+    if (document.querySelector(".tree-handle")) {
+        new TreeMoveManager({url: "tree-move/"});
+    }
+});